@@ -0,0 +1,199 @@
+"""
+Throughput and latency benchmarks of the client against the local mock server.
+
+    python benchmarks/bench_client.py [--matches 10000] [--latency 0.01] [--json results.json]
+
+With --cassette the traffic of a run is recorded to a file (--mode record),
+or served back from it without a server (--mode replay), so a run can be
+repeated offline with the same responses and latencies.
+
+--error-rate, --throttle-rate and --rate-limit make the server answer some
+requests with 500 or 429, to measure the client while it retries and backs
+off, e.g. --throttle-rate 0.05 --rate-limit 200.
+
+Every scenario reports wall time, requests per second, p50/p99 request latency
+and the peak of the memory it traced. --rss skips tracing, which slows the
+client down, and reports how much the scenario raised the peak resident size
+of the process instead. Save results with --json and compare them between
+revisions to spot regressions.
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tourny import API
+from tourny.cassette import Cassette
+from tourny.mock_server import MockServer
+from tourny.TournamentItems import Match
+
+
+class Recorder():
+    """
+    Times every request sent through an API's session
+    """
+    def __init__(self, api):
+        self.latencies = []
+        self._lock = threading.Lock()
+        request = api.session.request
+
+        def timed_request(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return request(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self.latencies.append(elapsed)
+
+        api.session.request = timed_request
+
+    def reset(self):
+        with self._lock:
+            self.latencies = []
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def measure(name, func, recorder=None, rss=False):
+    """
+    Runs func once and returns its measurements.
+
+    Memory is the traced peak of the scenario, or with rss how much it raised
+    the peak resident size of the process. That only grows, so a scenario
+    staying below the peak of an earlier one reports 0.
+    """
+    if recorder is not None:
+        recorder.reset()
+    if rss:
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    else:
+        tracemalloc.start()
+    start = time.perf_counter()
+    count = func()
+    wall = time.perf_counter() - start
+    if rss:
+        memory_key, memory_label = 'rss_growth_mib', 'MiB RSS growth'
+        memory = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) * 1024
+    else:
+        memory_key, memory_label = 'peak_mib', 'MiB peak'
+        _, memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    latencies = recorder.latencies if recorder is not None else []
+    result = {'scenario': name,
+              'wall_s': wall,
+              'requests': len(latencies),
+              'requests_per_s': len(latencies) / wall if wall else 0.0,
+              'items': count,
+              'items_per_s': count / wall if wall else 0.0,
+              'p50_ms': percentile(latencies, 0.50) * 1000,
+              'p99_ms': percentile(latencies, 0.99) * 1000,
+              memory_key: memory / 2 ** 20}
+    print(f"{name:<24} {wall:8.3f} s {result['requests']:7d} req {result['requests_per_s']:9.1f} req/s "
+          f"{result['p50_ms']:8.2f} p50 ms {result['p99_ms']:8.2f} p99 ms {result[memory_key]:8.1f} {memory_label} "
+          f"{result['items_per_s']:11.0f} items/s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--matches', type=int, default=10000)
+    parser.add_argument('--teams', type=int, default=256)
+    parser.add_argument('--latency', type=float, default=0.01, help="seconds added to each response")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of requests answered with 500")
+    parser.add_argument('--throttle-rate', type=float, default=0.0,
+                        help="share of requests answered with 429 and Retry-After")
+    parser.add_argument('--rate-limit', type=int, default=None,
+                        help="requests per second above which the server answers 429")
+    parser.add_argument('--threads', type=int, default=32, help="callers for the by-id scenario")
+    parser.add_argument('--lookups', type=int, default=2000)
+    parser.add_argument('--patches', type=int, default=1000)
+    parser.add_argument('--rss', action='store_true',
+                        help="report the growth of the process's peak resident size instead of tracing memory")
+    parser.add_argument('--json', help="file to write the results to")
+    parser.add_argument('--cassette', help="file to record the traffic to or replay it from")
+    parser.add_argument('--mode', choices=('record', 'replay'), default='replay',
+                        help="what to do with the cassette")
+    args = parser.parse_args()
+
+    replaying = args.cassette is not None and args.mode == 'replay'
+    if replaying:
+        server = contextlib.nullcontext()
+    else:
+        server = MockServer(teams=args.teams, matches=args.matches, games_per_match=0, latency=args.latency,
+                            error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+                            rate_limit=args.rate_limit)
+
+    results = []
+    with server:
+        api = _offline_api()
+        if not replaying:
+            server.mount(api)
+        cassette = Cassette(args.cassette, mode=args.mode).mount(api) if args.cassette else None
+        recorder = Recorder(api)
+
+        # Warm up the token and connection pool
+        tournament = api.get.tournaments((0, 0))[0]
+
+        matches = []
+        results.append(measure('all_matches', lambda: len(matches.extend(api.get.all_matches(tournament))
+                                                           or matches), recorder, args.rss))
+        raw = [m.to_dict() for m in matches]
+
+        ids = [m.id for m in matches]
+        rand = random.Random(0)
+        lookups = [rand.choice(ids) for _ in range(args.lookups)]
+
+        def by_id():
+            with ThreadPoolExecutor(max_workers=args.threads) as executor:
+                return sum(1 for m in executor.map(lambda i: api.get.match_by_id(tournament.id, i), lookups)
+                           if m is not None)
+        results.append(measure(f"match_by_id x{args.threads}", by_id, recorder, args.rss))
+
+        to_patch = matches[:args.patches]
+        for match in to_patch:
+            match.private_note = f"Checked at {time.time()}"
+        results.append(measure('bulk patch_matches', lambda: len(api.bulk.patch_matches(tournament, to_patch).succeeded),
+                               recorder, args.rss))
+
+        if cassette is not None and args.mode == 'record':
+            cassette.save()
+
+    results.append(measure('Match.from_dict', lambda: len([Match.from_dict(m) for m in raw]),
+                           rss=args.rss))
+
+    if args.json:
+        with open(args.json, 'w') as savefile:
+            json.dump({'args': vars(args), 'results': results}, savefile, indent=2)
+
+
+def _offline_api():
+    """
+    Builds an API with placeholder credentials, the mock server accepts any
+    """
+    import tempfile
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as apidata:
+        json.dump({'api_key': 'mock', 'client_id': 'mock', 'client_secret': 'mock'}, apidata)
+    try:
+        return API(filepath=apidata.name)
+    finally:
+        os.remove(apidata.name)
+
+
+if __name__ == '__main__':
+    main()
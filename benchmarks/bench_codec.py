@@ -0,0 +1,102 @@
+"""
+Compares the JSON codecs on realistic pages of matches.
+
+    python benchmarks/bench_codec.py [--pages 200] [--page-size 100]
+
+Decoding is measured from the raw response bytes, encoding from Match objects
+to the bytes of a PATCH body.
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tourny import JSONCodec, OrjsonCodec
+from tourny.TournamentItems import Match
+
+
+def make_match(number, team_count=2, lineup_size=5):
+    """
+    Builds the JSON of a match as returned by the organizer API
+    """
+    opponents = []
+    for position in range(1, team_count + 1):
+        participant_id = f"{number * 10 + position:018d}"
+        opponents.append({
+            'number': position,
+            'position': position,
+            'result': 'win' if position == 1 else 'loss',
+            'rank': None,
+            'forfeit': False,
+            'score': 16 - position * 3,
+            'participant': {
+                'id': participant_id,
+                'name': f"Team {participant_id[-4:]}",
+                'custom_fields': {'country': 'FR', 'seed': position},
+                'lineup': [{'name': f"Player {participant_id[-4:]}-{p}",
+                            'custom_fields': {'steam_id': f"STEAM_0:1:{number}{p}"}}
+                           for p in range(lineup_size)],
+            },
+        })
+    return {
+        'id': f"{number:018d}",
+        'stage_id': '618983668512789648',
+        'group_id': '618983668663784497',
+        'round_id': f"{618983668663784500 + number % 8}",
+        'number': number,
+        'type': 'duel',
+        'status': 'completed',
+        'scheduled_datetime': '2020-05-31T18:00:00+02:00',
+        'played_at': '2020-05-31T18:42:17+02:00',
+        'public_note': 'Best of three',
+        'private_note': None,
+        'report_closed': True,
+        'opponents': opponents,
+    }
+
+
+def bench(label, func, number, baseline=None):
+    seconds = min(timeit.repeat(func, number=number, repeat=3)) / number
+    speedup = f"{baseline / seconds:6.2f}x" if baseline else ''
+    print(f"  {label:<28} {seconds * 1000:9.3f} ms/page {speedup}")
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--page-size', type=int, default=100)
+    args = parser.parse_args()
+
+    page = [make_match(n) for n in range(args.page_size)]
+    content = json.dumps(page).encode('utf-8')
+    matches = [Match.from_dict(m) for m in page]
+    whitelist = Match().patch_fields()
+
+    codecs = [JSONCodec()]
+    try:
+        codecs.append(OrjsonCodec())
+    except ImportError:
+        print("orjson is not installed, only the standard library is measured")
+
+    print(f"{args.page_size} matches per page, {len(content) / 1024:.1f} KiB per page\n")
+
+    print("decode")
+    baseline = bench('json.loads(response.text)', lambda: json.loads(content.decode('utf-8')), args.pages)
+    for codec in codecs:
+        bench(f"{codec.name}.loads(content)", lambda: codec.loads(content), args.pages, baseline)
+
+    print("\nencode PATCH bodies")
+    baseline = bench('json.dumps(dict)', lambda: [json.dumps({k: v for k, v in m.to_dict().items()
+                                                              if not callable(v) and k in whitelist})
+                                                  for m in matches], args.pages)
+    for codec in codecs:
+        bench(f"{codec.name} Match.dumps", lambda: [m.dumps(whitelist=whitelist, codec=codec)
+                                                    for m in matches], args.pages, baseline)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+import json
+import os
+import tempfile
+import uuid
+
+from tourny.toornament_api import API
+
+
+def write_apidata(directory=None):
+    """
+    Writes API information with a key of its own, so no rate limiter is shared between tests
+    """
+    directory = directory or tempfile.mkdtemp(prefix='tourny-test-')
+    path = os.path.join(directory, f"apidata-{uuid.uuid4().hex[:8]}.json")
+    with open(path, 'w') as savefile:
+        json.dump({'api_key': f"key-{uuid.uuid4().hex}", 'client_id': f"client-{uuid.uuid4().hex[:8]}",
+                   'client_secret': 'secret'}, savefile)
+    return path
+
+
+def make_api(server=None, api_class=API, **settings):
+    """
+    Returns an API sending its requests to a MockServer
+    """
+    api = api_class(filepath=write_apidata(), **settings)
+    if server is not None:
+        server.mount(api)
+    return api
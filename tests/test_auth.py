@@ -0,0 +1,141 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from tourny._auth import TokenManager
+from tourny.mock_server import MockServer
+
+from _support import make_api
+
+
+class GetAuthTokenTest(unittest.TestCase):
+
+    def test_unknown_scope(self):
+        api = make_api()
+        with self.assertRaisesRegex(ValueError, "organizer:nothing"):
+            api.get_auth_token("organizer:nothing")
+        with self.assertRaisesRegex(ValueError, "organizer:nothing"):
+            api.get_auth_token(["organizer:view", "organizer:nothing"])
+
+    def test_unknown_scope_async(self):
+        try:
+            from tourny.async_api import AsyncAPI
+            api = make_api(api_class=AsyncAPI)
+        except ImportError:
+            self.skipTest("aiohttp is not installed")
+        with self.assertRaisesRegex(ValueError, "organizer:nothing"):
+            asyncio.run(api.get_auth_token("organizer:nothing"))
+
+    def test_known_scopes_share_a_token(self):
+        with MockServer(teams=4, matches=4, games_per_match=0) as server:
+            api = make_api(server)
+            token = api.get_auth_token(["organizer:view", "organizer:result"])
+        self.assertIsNotNone(token)
+        self.assertEqual(api.auth_tokens["organizer:view"], api.auth_tokens["organizer:result"])
+
+
+
+class _TokenEndpoint():
+    """
+    Stands in for the token request of an API, slow enough for refreshes to overlap
+    """
+    def __init__(self, expires_in=3600):
+        self.expires_in = expires_in
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, requested):
+        with self._lock:
+            self.calls.append(list(requested))
+            number = len(self.calls)
+        time.sleep(0.05)
+        return 200, {'access_token': f"token-{number}", 'expires_in': self.expires_in, 'scope': ' '.join(requested)}
+
+
+def _store_token(cache_file, cache_key, scope):
+    manager = TokenManager(lambda requested: (200, {'access_token': f"{cache_key}-{scope}", 'expires_in': 3600}),
+                           cache_file=cache_file)
+    manager.cache_key = cache_key
+    manager.token(scope)
+
+
+class TokenManagerTest(unittest.TestCase):
+
+    def test_concurrent_refreshes_share_a_request(self):
+        endpoint = _TokenEndpoint()
+        manager = TokenManager(endpoint)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            tokens = set(executor.map(lambda _: manager.token("organizer:view"), range(16)))
+        self.assertEqual(tokens, {'token-1'})
+        self.assertEqual(len(endpoint.calls), 1)
+
+    def test_scopes_of_a_bundle_share_a_request(self):
+        endpoint = _TokenEndpoint()
+        bundle = ["organizer:view", "organizer:result", "organizer:participant"]
+        manager = TokenManager(endpoint, bundle=bundle)
+        with ThreadPoolExecutor(max_workers=9) as executor:
+            tokens = set(executor.map(manager.token, bundle * 3))
+        self.assertEqual(tokens, {'token-1'})
+        self.assertEqual(endpoint.calls, [bundle])
+
+    def test_refreshed_before_expiry(self):
+        endpoint = _TokenEndpoint(expires_in=60.2)
+        manager = TokenManager(endpoint, refresh_margin=60)
+        self.assertEqual(manager.token("organizer:view"), 'token-1')
+        time.sleep(0.2)
+        self.assertEqual(manager.token("organizer:view"), 'token-2')
+
+    def test_rejected_token_is_replaced_once(self):
+        endpoint = _TokenEndpoint()
+        manager = TokenManager(endpoint)
+        rejected = manager.token("organizer:view")
+        self.assertEqual(manager.token("organizer:view", rejected=rejected), 'token-2')
+        # A thread that saw the same token rejected gets the replacement, not a third token
+        self.assertEqual(manager.token("organizer:view", rejected=rejected), 'token-2')
+
+    def test_cache_file_is_shared(self):
+        cache_file = os.path.join(tempfile.mkdtemp(prefix='tourny-test-'), 'tokens.json')
+        endpoint = _TokenEndpoint()
+        first = TokenManager(endpoint, cache_file=cache_file)
+        first.cache_key = 'client'
+        first.token("organizer:view")
+        second = TokenManager(endpoint, cache_file=cache_file)
+        second.cache_key = 'client'
+        self.assertEqual(second.token("organizer:view"), 'token-1')
+        self.assertEqual(len(endpoint.calls), 1)
+        self.assertEqual(os.stat(cache_file).st_mode & 0o777, 0o600)
+
+    def test_concurrent_processes_keep_each_others_tokens(self):
+        cache_file = os.path.join(tempfile.mkdtemp(prefix='tourny-test-'), 'tokens.json')
+        jobs = [(cache_file, f"client-{i % 2}", scope) for i, scope in
+                enumerate(["organizer:view", "organizer:result", "organizer:participant", "organizer:admin"] * 3)]
+        with multiprocessing.get_context('spawn').Pool(4) as pool:
+            pool.starmap(_store_token, jobs)
+        with open(cache_file) as loadfile:
+            cached = json.load(loadfile)
+        for cache_file, cache_key, scope in jobs:
+            self.assertEqual(cached[cache_key][scope][0], f"{cache_key}-{scope}")
+
+
+class APITokenTest(unittest.TestCase):
+
+    def test_one_token_request_for_a_bundle(self):
+        with MockServer(teams=8, matches=20, games_per_match=0) as server:
+            api = make_api(server, token_scopes=["organizer:result", "organizer:participant"])
+            tournament = server.tournament
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                matches = executor.submit(api.get.all_matches, tournament)
+                teams = executor.submit(api.get.all_teams, tournament)
+                self.assertEqual(len(matches.result()), 20)
+                self.assertEqual(len(teams.result()), 8)
+            self.assertEqual(server.requests[('POST', 'token')], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
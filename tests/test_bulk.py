@@ -0,0 +1,93 @@
+import threading
+import time
+import unittest
+
+import requests
+
+from tourny.TournamentItems import Team
+from tourny._ratelimit import RateLimiter
+from tourny.mock_server import MockServer
+
+from _support import make_api
+
+
+class _Response():
+    def __init__(self, status_code=200, content=b'{}'):
+        self.status_code = status_code
+        self.content = content
+
+
+class BulkRunTest(unittest.TestCase):
+
+    def setUp(self):
+        self.api = make_api()
+
+    def test_same_resource_in_order_others_in_parallel(self):
+        sent = []
+        lock = threading.Lock()
+        running = [0, 0]
+
+        def send(key, number):
+            def run():
+                with lock:
+                    running[0] += 1
+                    running[1] = max(running[1], running[0])
+                    sent.append((key, number))
+                time.sleep(0.01)
+                with lock:
+                    running[0] -= 1
+                return _Response()
+            return run
+
+        jobs = [(key, (key, number), send(key, number)) for number in range(5) for key in 'abcd']
+        report = self.api.bulk.run(jobs, concurrency=4)
+        self.assertEqual([r.item for r in report], [(key, number) for number in range(5) for key in 'abcd'])
+        for key in 'abcd':
+            self.assertEqual([n for k, n in sent if k == key], list(range(5)))
+        self.assertGreater(running[1], 1)
+
+    def test_partial_failure(self):
+        def failing():
+            raise requests.ConnectionError("Connection refused")
+        jobs = [('a', 'ok', lambda: _Response(200)),
+                ('b', 'missing', lambda: _Response(404, b'{"message": "Not found"}')),
+                ('c', 'unchanged', lambda: None),
+                ('d', 'down', failing)]
+        report = self.api.bulk.run(jobs)
+        self.assertFalse(report.ok)
+        self.assertEqual([r.item for r in report.succeeded], ['ok', 'unchanged'])
+        self.assertEqual([r.item for r in report.skipped], ['unchanged'])
+        self.assertEqual([(r.item, r.error) for r in report.failed],
+                         [('missing', 'HTTP 404'), ('down', 'Connection refused')])
+        self.assertEqual(report[1].data, {'message': 'Not found'})
+
+
+class BulkWriteTest(unittest.TestCase):
+
+    def test_patch_matches(self):
+        with MockServer(teams=8, matches=40, games_per_match=0, error_rate=0.2) as server:
+            api = make_api(server, rate_limiter=RateLimiter(retries=20, backoff=0.001, max_backoff=0.01))
+            tournament = server.tournament
+            matches = api.get.all_matches(tournament)
+            for match in matches[:30]:
+                match.private_note = f"Note {match.id}"
+            report = api.bulk.patch_matches(tournament, matches)
+            self.assertTrue(report.ok)
+            self.assertEqual(len(report.skipped), 10)
+            self.assertEqual([r.item for r in report], matches)
+            self.assertTrue(any(r.attempts > 1 for r in report))
+            self.assertTrue(all(r.sent == ['private_note'] for r in report[:30]))
+            for match in matches[:30]:
+                self.assertEqual(server.matches[tournament.id][match.id]['private_note'], f"Note {match.id}")
+
+    def test_post_teams(self):
+        with MockServer(teams=8, matches=0, games_per_match=0) as server:
+            api = make_api(server)
+            tournament = server.tournament
+            report = api.bulk.post_teams(tournament, [Team(name=f"New {i}") for i in range(5)])
+            self.assertEqual([r.status for r in report], [201] * 5)
+            self.assertEqual(len(server.participants[tournament.id]), 13)
+
+
+if __name__ == '__main__':
+    unittest.main()
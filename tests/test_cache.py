@@ -0,0 +1,95 @@
+import time
+import unittest
+
+from tourny import ResponseCache
+from tourny.mock_server import MockServer
+
+from _support import make_api
+
+
+class ResponseCacheTest(unittest.TestCase):
+
+    def test_fresh_and_stale(self):
+        cache = ResponseCache(ttl={'match': 0.05})
+        self.assertEqual(cache.get('a'), (None, False))
+        cache.store('a', 'match', b'{}', {'etag': '"1"'})
+        entry, fresh = cache.get('a')
+        self.assertTrue(fresh)
+        self.assertEqual(cache.validators(entry), {'if-none-match': '"1"'})
+        time.sleep(0.06)
+        entry, fresh = cache.get('a')
+        self.assertFalse(fresh)
+        cache.revalidate('a', 'match', entry)
+        self.assertTrue(cache.get('a')[1])
+
+    def test_least_recently_used_are_evicted(self):
+        cache = ResponseCache(max_bytes=30)
+        for key in 'abc':
+            cache.store(key, 'match', b'x' * 10, {})
+        cache.get('a')
+        cache.store('d', 'match', b'x' * 10, {})
+        self.assertIsNone(cache.get('b')[0])
+        self.assertIsNotNone(cache.get('a')[0])
+        self.assertEqual(cache.stats()['evictions'], 1)
+        self.assertEqual(cache.stats()['bytes'], 30)
+        # Bodies larger than the whole cache are not kept
+        cache.store('e', 'match', b'x' * 31, {})
+        self.assertIsNone(cache.get('e')[0])
+
+    def test_invalidate(self):
+        cache = ResponseCache()
+        cache.store('a', 'match', b'{}', {})
+        cache.invalidate('a')
+        cache.invalidate('a')
+        self.assertIsNone(cache.get('a')[0])
+        self.assertEqual(cache.stats()['invalidations'], 1)
+
+
+class CachedLookupTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = MockServer(teams=8, matches=10, games_per_match=0).start()
+        self.addCleanup(self.server.stop)
+        self.tournament = self.server.tournament
+        self.match_id = next(iter(self.server.matches[self.tournament.id]))
+
+    def sent(self):
+        return self.server.requests.get(('GET', 'match'), 0)
+
+    def test_fresh_entry_is_served_without_a_request(self):
+        api = make_api(self.server, cache=ResponseCache())
+        first = api.get.match_by_id(self.tournament.id, self.match_id)
+        second = api.get.match_by_id(self.tournament.id, self.match_id)
+        self.assertEqual(self.sent(), 1)
+        self.assertEqual(first.to_dict(), second.to_dict())
+        # Items handed out are not shared, changing one leaves the cache as it was
+        second.private_note = "Changed"
+        self.assertNotEqual(api.get.match_by_id(self.tournament.id, self.match_id).private_note, "Changed")
+
+    def test_stale_entry_is_revalidated(self):
+        api = make_api(self.server, cache=ResponseCache(ttl={'match': 0}))
+        api.get.match_by_id(self.tournament.id, self.match_id)
+        match = api.get.match_by_id(self.tournament.id, self.match_id)
+        self.assertEqual(self.sent(), 2)
+        self.assertEqual(api.cache.stats()['revalidations'], 1)
+        self.assertEqual(match.id, self.match_id)
+
+    def test_changed_object_is_fetched_again(self):
+        api = make_api(self.server, cache=ResponseCache(ttl={'match': 0}))
+        api.get.match_by_id(self.tournament.id, self.match_id)
+        self.server.matches[self.tournament.id][self.match_id]['private_note'] = "Changed on the server"
+        match = api.get.match_by_id(self.tournament.id, self.match_id)
+        self.assertEqual(match.private_note, "Changed on the server")
+        self.assertEqual(api.cache.stats()['revalidations'], 0)
+
+    def test_patch_invalidates(self):
+        api = make_api(self.server, cache=ResponseCache())
+        match = api.get.match_by_id(self.tournament.id, self.match_id)
+        match.private_note = "Patched"
+        self.assertEqual(api.patch.match(self.tournament, match).status_code, 200)
+        self.assertEqual(api.get.match_by_id(self.tournament.id, self.match_id).private_note, "Patched")
+        self.assertEqual(self.sent(), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
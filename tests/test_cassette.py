@@ -0,0 +1,67 @@
+import gzip
+import json
+import os
+import tempfile
+import unittest
+
+from tourny.cassette import Cassette, CassetteMiss, RECORDED_TOKEN
+from tourny.mock_server import MockServer
+from tourny._ratelimit import RateLimiter
+
+from _support import make_api
+
+
+def _fast_limiter():
+    return RateLimiter(retries=10, backoff=0.001, max_backoff=0.01)
+
+
+class CassetteTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(prefix='tourny-test-'), 'run.cassette')
+
+    def record(self, stream=False, **server_settings):
+        with MockServer(teams=16, matches=1500, games_per_match=0, **server_settings) as server:
+            api = make_api(server, rate_limiter=_fast_limiter(), stream=stream)
+            tournament = server.tournament
+            with Cassette(self.path, mode='record').mount(api) as cassette:
+                matches = api.get.all_matches(tournament)
+                match = api.get.match_by_id(tournament.id, matches[0].id)
+        return tournament, matches, match, cassette
+
+    def test_replays_without_a_server(self):
+        tournament, matches, match, _ = self.record()
+        api = make_api(rate_limiter=_fast_limiter())
+        with Cassette(self.path, latency=None).mount(api) as cassette:
+            self.assertEqual([m.id for m in api.get.all_matches(tournament)], [m.id for m in matches])
+            self.assertEqual(api.get.match_by_id(tournament.id, match.id).to_dict(), match.to_dict())
+            self.assertGreater(cassette.hits, 0)
+            with self.assertRaises(CassetteMiss):
+                api.get.match_by_id(tournament.id, 'unknown')
+
+    def test_replays_streamed_pages_and_retried_failures(self):
+        tournament, matches, _, cassette = self.record(stream=True, error_rate=0.3, throttle_rate=0.1)
+        statuses = [interaction['status'] for interaction in cassette._recorded]
+        self.assertIn(500, statuses)
+        self.assertIn(429, statuses)
+
+        api = make_api(rate_limiter=_fast_limiter(), stream=True)
+        with Cassette(self.path, latency=None).mount(api):
+            self.assertEqual([m.id for m in api.get.all_matches(tournament)], [m.id for m in matches])
+            self.assertEqual(len(list(api.get.iter_matches(tournament))), len(matches))
+
+    def test_no_secret_or_token_is_recorded(self):
+        self.record()
+        with gzip.open(self.path, 'rt', encoding='utf-8') as loadfile:
+            interactions = [json.loads(line) for line in loadfile]
+        tokens = [i for i in interactions if '/oauth/v2/token' in i['key']]
+        self.assertTrue(tokens)
+        for interaction in tokens:
+            self.assertEqual(json.loads(interaction['body'])['access_token'], RECORDED_TOKEN)
+            self.assertEqual(int(interaction['headers']['Content-Length']), len(interaction['body'].encode('utf-8')))
+        for interaction in interactions:
+            self.assertNotIn('secret', interaction['key'])
+
+
+if __name__ == '__main__':
+    unittest.main()
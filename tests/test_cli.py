@@ -0,0 +1,116 @@
+import contextlib
+import csv
+import io
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from tourny import cli
+from tourny.mock_server import MockServer
+from tourny.toornament_api import API
+
+from _support import write_apidata
+
+
+class CommandsTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockServer(teams=8, matches=40, games_per_match=0).start()
+        cls.tournament_id = cls.server.tournament.id
+        cls.apidata = write_apidata()
+        init = API.__init__
+
+        def mounted(api, *args, **kwargs):
+            init(api, *args, **kwargs)
+            cls.server.mount(api)
+        cls.patched = mock.patch.object(API, '__init__', mounted)
+        cls.patched.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.patched.stop()
+        cls.server.stop()
+
+    def run_cli(self, *argv):
+        out, err = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            code = cli.main(['--apidata', self.apidata, *argv])
+        return code, out.getvalue(), err.getvalue()
+
+    def test_export_json(self):
+        code, out, _ = self.run_cli('--no-daemon', 'export', 'matches', '--tournament', self.tournament_id,
+                                    '--status', 'running', '--status', 'completed')
+        self.assertEqual(code, 0)
+        expected = [m['id'] for m in self.server.matches[self.tournament_id].values()
+                    if m['status'] in ('running', 'completed')]
+        self.assertEqual(sorted(m['id'] for m in json.loads(out)), sorted(expected))
+
+    def test_export_csv(self):
+        path = os.path.join(tempfile.mkdtemp(prefix='tourny-test-'), 'matches.csv')
+        code, out, _ = self.run_cli('--no-daemon', 'export', 'matches', '--tournament', self.tournament_id,
+                                    '--format', 'csv', '--output', path)
+        self.assertEqual((code, out), (0, ''))
+        with open(path, newline='') as loadfile:
+            rows = list(csv.DictReader(loadfile))
+        self.assertEqual(len(rows), 40)
+        self.assertIn('opponent1_name', rows[0])
+
+    def test_errors(self):
+        code, _, err = self.run_cli('--no-daemon', 'export', 'matches')
+        self.assertEqual(code, 1)
+        self.assertIn("needs --tournament", err)
+        code, _, err = self.run_cli('--no-daemon', 'report', self.tournament_id, '1234', '1-0')
+        self.assertEqual(code, 1)
+        self.assertIn("No match 1234", err)
+
+    def test_report(self):
+        match = next(m for m in self.server.matches[self.tournament_id].values()
+                     if m['status'] == 'pending' and len(m['opponents']) == 2)
+        code, out, _ = self.run_cli('--no-daemon', 'report', self.tournament_id, match['id'], '3-1')
+        self.assertEqual((code, out), (0, f"Match {match['id']}: 3 - 1\n"))
+        opponents = sorted(match['opponents'], key=lambda o: o['number'])
+        self.assertEqual([(o['score'], o['result']) for o in opponents], [(3, 'win'), (1, 'loss')])
+
+    def test_standings(self):
+        code, out, _ = self.run_cli('--no-daemon', 'standings', self.tournament_id, '--format', 'json')
+        self.assertEqual(code, 0)
+        rows = json.loads(out)
+        self.assertEqual(rows[0]['rank'], 1)
+        code, out, _ = self.run_cli('--no-daemon', 'standings', self.tournament_id)
+        self.assertTrue(out.startswith('rank'))
+
+    @unittest.skipUnless(hasattr(socket, 'AF_UNIX'), "The daemon listens on a Unix socket")
+    def test_daemon(self):
+        path = os.path.join(tempfile.mkdtemp(prefix='tourny-test-'), 'daemon.sock')
+        daemon = cli.Daemon(path)
+        thread = threading.Thread(target=daemon.run, daemon=True)
+        thread.start()
+        deadline = time.monotonic() + 5
+        while cli.send(path, {'command': 'status'}) is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        for _ in range(2):
+            code, out, _ = self.run_cli('--socket', path, 'export', 'teams', '--tournament', self.tournament_id)
+            self.assertEqual((code, len(json.loads(out))), (0, 8))
+        self.assertEqual(daemon.commands, 2)
+        # One warm API served both commands
+        self.assertEqual(len(daemon._apis), 1)
+        code, _, err = self.run_cli('--socket', path, 'report', self.tournament_id, '1234', '1-0')
+        self.assertEqual(code, 1)
+        self.assertIn("No match 1234", err)
+        self.assertIn("3 commands", self.run_cli('--socket', path, 'daemon', 'status')[1])
+
+        self.assertEqual(self.run_cli('--socket', path, 'daemon', 'stop')[1], "Daemon stopped\n")
+        thread.join(5)
+        self.assertFalse(os.path.exists(path))
+        self.assertIn("No daemon", self.run_cli('--socket', path, 'daemon', 'status')[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
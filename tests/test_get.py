@@ -0,0 +1,47 @@
+import unittest
+
+from tourny import PageError
+from tourny.mock_server import MockServer
+
+from _support import make_api
+
+
+class CollectionTest(unittest.TestCase):
+
+    def test_all_iter_and_stream_agree(self):
+        with MockServer(teams=16, matches=250, games_per_match=0) as server:
+            expected = sorted(server.matches[server.tournament.id])
+            for stream in (False, True):
+                api = make_api(server, stream=stream)
+                tournament = server.tournament
+                self.assertEqual(sorted(m.id for m in api.get.all_matches(tournament)), expected)
+                self.assertEqual(sorted(m.id for m in api.get.iter_matches(tournament)), expected)
+
+    def test_server_capping_the_range(self):
+        with MockServer(teams=16, matches=250, games_per_match=0, page_limits={'matches': 37}) as server:
+            api = make_api(server)
+            tournament = server.tournament
+            # Ranges longer than the server accepts are refused, not an empty collection
+            with self.assertRaises(PageError) as raised:
+                api.get.all_matches(tournament)
+            self.assertEqual(raised.exception.status, 416)
+            with self.assertRaises(PageError):
+                list(api.get.iter_matches(tournament))
+
+    def test_empty_collection(self):
+        with MockServer(teams=16, matches=0, games_per_match=0) as server:
+            api = make_api(server)
+            self.assertEqual(api.get.all_matches(server.tournament), [])
+            self.assertEqual(list(api.get.iter_matches(server.tournament)), [])
+
+    def test_failed_page(self):
+        with MockServer(teams=16, matches=250, games_per_match=0, error_rate=1.0) as server:
+            api = make_api(server)
+            api.rate_limiter.configure(retries=0)
+            with self.assertRaises(PageError) as raised:
+                api.get.all_matches(server.tournament)
+            self.assertEqual(raised.exception.status, 500)
+
+
+if __name__ == '__main__':
+    unittest.main()
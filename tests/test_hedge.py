@@ -0,0 +1,106 @@
+import contextvars
+import datetime
+import threading
+import time
+import unittest
+
+from tourny import Hedging
+from tourny._hedge import lost
+from tourny._ratelimit import RateLimiter
+from tourny.mock_server import MockServer
+
+from _support import make_api
+
+_attempt = contextvars.ContextVar('attempt', default=None)
+
+
+class _Response():
+    def __init__(self, name, status_code=200):
+        self.name = name
+        self.status_code = status_code
+        self.elapsed = datetime.timedelta(milliseconds=1)
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class HedgingTest(unittest.TestCase):
+
+    def hedging(self, **settings):
+        hedging = Hedging(**settings)
+        self.addCleanup(hedging.close)
+        return hedging
+
+    def test_no_hedge_before_enough_samples(self):
+        hedging = self.hedging(min_samples=3)
+        for _ in range(2):
+            hedging.run('/matches', lambda: _Response('only'))
+        self.assertIsNone(hedging.delay('/matches'))
+        hedging.run('/matches', lambda: _Response('only'))
+        self.assertIsNotNone(hedging.delay('/matches'))
+        self.assertEqual(hedging.hedged, 0)
+
+    def test_slow_attempt_loses(self):
+        hedging = self.hedging(min_samples=1, budget=1.0, min_delay=0.01)
+        hedging.observe('/matches', 0.01)
+        responses = []
+        released = threading.Event()
+        lost_seen = []
+
+        def send():
+            response = _Response('slow' if not responses else 'fast')
+            responses.append(response)
+            _attempt.set(response.name)
+            if response.name == 'slow':
+                released.wait(5)
+                lost_seen.append(lost())
+            return response
+
+        response = hedging.run('/matches', send)
+        self.assertEqual(response.name, 'fast')
+        # The winner's context variables are carried back to the caller
+        self.assertEqual(_attempt.get(), 'fast')
+        self.assertEqual(hedging.hedges_won, 1)
+        released.set()
+        deadline = time.monotonic() + 5
+        while not responses[0].closed and time.monotonic() < deadline:
+            time.sleep(0.001)
+        self.assertTrue(responses[0].closed)
+        self.assertEqual(lost_seen, [True])
+
+    def test_budget(self):
+        hedging = self.hedging(min_samples=1, budget=0.1, min_delay=0.001)
+        hedging.observe('/matches', 0.001)
+
+        def send():
+            time.sleep(0.005)
+            return _Response('slow')
+        for _ in range(50):
+            hedging.run('/matches', send)
+        self.assertEqual(hedging.requests, 50)
+        self.assertEqual(hedging.hedged, 5)
+
+    def test_failed_responses_are_not_observed(self):
+        hedging = self.hedging()
+        hedging.run('/matches', lambda: _Response('failed', 503))
+        self.assertIsNone(hedging._latencies.get('/matches'))
+
+    def test_latency_leaves_out_retries(self):
+        hedging = self.hedging(min_samples=1000)
+        with MockServer(teams=8, matches=40, games_per_match=0, error_rate=0.5) as server:
+            api = make_api(server, hedging=hedging,
+                           rate_limiter=RateLimiter(retries=20, backoff=0.1, max_backoff=0.1))
+            tournament = server.tournament
+            started = time.perf_counter()
+            for match_id in server.matches[tournament.id]:
+                api.get.match_by_id(tournament.id, match_id)
+            spent = time.perf_counter() - started
+        (latencies,) = hedging._latencies.values()
+        self.assertEqual(len(latencies), 40)
+        # Backing off took most of the time, the observed latencies are those of single attempts
+        self.assertLess(sum(latencies), spent / 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
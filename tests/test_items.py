@@ -0,0 +1,107 @@
+import copy
+import pickle
+import unittest
+
+from tourny.TournamentItems import Match, Team, Game
+from tourny.mock_server import MockServer
+
+from _support import make_api
+
+MATCH = {'id': '1', 'number': 1, 'status': 'pending', 'private_note': None, 'public_note': None,
+         'scheduled_datetime': None, 'stage_id': 's', 'group_id': 'g', 'round_id': 'r',
+         'opponents': [{'number': 1, 'score': None, 'participant': {'id': 'a', 'name': 'A'}},
+                       {'number': 2, 'score': None, 'participant': {'id': 'b', 'name': 'B'}}],
+         'unknown_field': {'kept': True}}
+
+
+def _loaded():
+    return Match.from_dict(copy.deepcopy(MATCH))
+
+
+class DirtyTrackingTest(unittest.TestCase):
+
+    def test_loaded_item_is_clean(self):
+        match = _loaded()
+        self.assertEqual(match.changed_fields(), [])
+        self.assertFalse(match.is_dirty)
+        # Reading fields, nested ones included, changes nothing
+        self.assertEqual(match.opponents[0]['number'], 1)
+        self.assertEqual(match.to_dict(), MATCH)
+        self.assertEqual(match.changed_fields(), [])
+
+    def test_set_fields(self):
+        match = _loaded()
+        match.private_note = "Note"
+        match.public_note = None
+        self.assertEqual(match.changed_fields(), ['private_note'])
+        match.private_note = None
+        self.assertEqual(match.changed_fields(), [])
+
+    def test_nested_fields_changed_in_place(self):
+        match = _loaded()
+        match.opponents[0]['score'] = 2
+        self.assertEqual(match.changed_fields(), ['opponents'])
+        match.opponents[0]['score'] = None
+        self.assertEqual(match.changed_fields(), [])
+
+    def test_replaced_nested_field(self):
+        match = _loaded()
+        match.opponents = copy.deepcopy(MATCH['opponents'])
+        self.assertEqual(match.changed_fields(), [])
+        match.opponents = match.opponents[:1]
+        self.assertEqual(match.changed_fields(), ['opponents'])
+
+    def test_mark_clean(self):
+        match = _loaded()
+        match.private_note = "Note"
+        match.opponents[1]['score'] = 1
+        match.mark_clean(['private_note'])
+        self.assertEqual(match.changed_fields(), ['opponents'])
+        match.mark_clean()
+        self.assertEqual(match.changed_fields(), [])
+
+    def test_item_not_loaded_from_the_api(self):
+        team = Team(name="New", custom_fields={})
+        self.assertIn('name', team.changed_fields())
+        team.mark_clean()
+        self.assertEqual(team.changed_fields(), [])
+
+    def test_loaded_state_survives_pickling(self):
+        match = _loaded()
+        game = Game.from_dict({'number': 1, 'status': 'pending', 'opponents': [], 'properties': {}})
+        match.private_note = "Note"
+        for item in (pickle.loads(pickle.dumps(match)), copy.deepcopy(match)):
+            self.assertEqual(item.changed_fields(), ['private_note'])
+            item.opponents[0]['score'] = 3
+            self.assertEqual(item.changed_fields(), ['private_note', 'opponents'])
+        unpickled = pickle.loads(pickle.dumps(game))
+        unpickled.properties['map'] = 'Dust'
+        self.assertEqual(unpickled.changed_fields(), ['properties'])
+        self.assertEqual(match.changed_fields(), ['private_note'])
+
+    def test_unknown_fields_are_kept(self):
+        self.assertEqual(_loaded().unknown_field, {'kept': True})
+        self.assertEqual(_loaded()['unknown_field'], {'kept': True})
+
+
+class PatchTest(unittest.TestCase):
+
+    def test_only_changed_fields_are_sent(self):
+        with MockServer(teams=8, matches=10, games_per_match=0) as server:
+            api = make_api(server)
+            tournament = server.tournament
+            match = api.get.all_matches(tournament)[0]
+            self.assertIsNone(api.patch.match(tournament, match))
+            match.opponents[0]['score'] = 7
+            response = api.patch.match(tournament, match)
+            self.assertEqual(response.sent_fields, ['opponents'])
+            self.assertEqual(server.matches[tournament.id][match.id]['opponents'][0]['score'], 7)
+            # Sent changes are clean again
+            self.assertEqual(match.changed_fields(), [])
+            self.assertIsNone(api.patch.match(tournament, match))
+            self.assertEqual(api.patch.match(tournament, match, only_changed=False).sent_fields,
+                             match.patch_fields())
+
+
+if __name__ == '__main__':
+    unittest.main()
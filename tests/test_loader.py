@@ -0,0 +1,110 @@
+import asyncio
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from tourny import Loader, AsyncLoader
+from tourny.TournamentItems import Match
+from tourny.mock_server import MockServer
+
+from _support import make_api
+
+
+class LoaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = MockServer(teams=20, matches=250, games_per_match=0).start()
+        self.addCleanup(self.server.stop)
+        self.api = make_api(self.server)
+        self.tournament = self.server.tournament
+        self.match_ids = list(self.server.matches[self.tournament.id])
+
+    def test_load_many_is_one_request(self):
+        loader = Loader(self.api)
+        ids = self.match_ids[:30][::-1]
+        matches = loader.load_many('match', self.tournament.id, ids)
+        self.assertEqual([m.id for m in matches], ids)
+        self.assertEqual(loader.batches, 1)
+        self.assertEqual(self.server.requests[('GET', 'matches')], 1)
+        self.assertNotIn(('GET', 'match'), self.server.requests)
+
+    def test_lookups_from_many_threads_are_batched(self):
+        loader = Loader(self.api, window=0.05)
+        ids = [team_id for team_id in self.server.participants[self.tournament.id]]
+        with ThreadPoolExecutor(max_workers=len(ids)) as executor:
+            teams = list(executor.map(lambda i: loader.team(self.tournament.id, i), ids))
+        self.assertEqual([t.id for t in teams], ids)
+        self.assertEqual(loader.batches, 1)
+        self.assertEqual(loader.lookups, 20)
+
+    def test_same_id_shares_a_lookup(self):
+        loader = Loader(self.api, window=0.05)
+        first = loader.load('match', self.tournament.id, self.match_ids[0])
+        second = loader.load('match', self.tournament.id, self.match_ids[0])
+        self.assertIs(first, second)
+        self.assertEqual(first.result().id, self.match_ids[0])
+
+    def test_batches_are_split_by_page_length(self):
+        loader = Loader(self.api)
+        matches = loader.load_many('match', self.tournament.id, self.match_ids[:150])
+        self.assertEqual(len(matches), 150)
+        self.assertEqual(self.server.requests[('GET', 'matches')], 2)
+
+    def test_missing_ids_are_looked_up_one_by_one(self):
+        loader = Loader(self.api)
+        matches = loader.load_many('match', self.tournament.id, [self.match_ids[0], '1234'])
+        self.assertEqual(matches[0].id, self.match_ids[0])
+        self.assertIsNone(matches[1])
+        self.assertEqual(self.server.requests[('GET', 'match')], 1)
+
+    def test_errors_reach_every_lookup(self):
+        loader = Loader(_FailingAPI(), window=0.05)
+        futures = [loader.load('match', 't', match_id) for match_id in self.match_ids[:3]]
+        for future in futures:
+            with self.assertRaisesRegex(RuntimeError, "Server down"):
+                future.result()
+
+
+class _FailingGET():
+    def matches(self, tournament, range_values, params=None):
+        raise RuntimeError("Server down")
+
+
+class _FailingAPI():
+    def __init__(self):
+        self.get = _FailingGET()
+
+
+class _AsyncGET():
+    def __init__(self):
+        self.pages = []
+
+    async def matches(self, tournament, range_values, params=None):
+        ids = params['ids'].split(',')
+        self.pages.append(ids)
+        return [Match(id=i) for i in ids if i != 'missing']
+
+    async def match_by_id(self, tournament_id, match_id):
+        return None
+
+
+class _AsyncAPI():
+    def __init__(self):
+        self.get = _AsyncGET()
+
+
+class AsyncLoaderTest(unittest.TestCase):
+
+    def test_same_tick_is_one_batch(self):
+        api = _AsyncAPI()
+        loader = AsyncLoader(api)
+
+        async def load():
+            return await asyncio.gather(*(loader.match('t', i) for i in ['1', '2', '1', 'missing']))
+        matches = asyncio.run(load())
+        self.assertEqual([m.id if m else None for m in matches], ['1', '2', '1', None])
+        self.assertEqual(api.get.pages, [['1', '2', 'missing']])
+        self.assertEqual(loader.batches, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
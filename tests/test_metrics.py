@@ -0,0 +1,67 @@
+import unittest
+
+from tourny import Metrics, RateLimiter, Scheduler
+from tourny.mock_server import MockServer
+
+from _support import make_api
+
+MATCHES = "/organizer/v2/tournaments/{tournament_id}/matches"
+MATCH = "/organizer/v2/tournaments/{tournament_id}/matches/{match_id}"
+
+
+class HooksTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = MockServer(teams=8, matches=150, games_per_match=0).start()
+        self.addCleanup(self.server.stop)
+        self.tournament = self.server.tournament
+
+    def test_records(self):
+        records = []
+        api = make_api(self.server, hooks=[records.append])
+        api.get.all_matches(self.tournament)
+        token, *pages = records
+        self.assertEqual((token.method, token.endpoint, token.status), ("POST", "/oauth/v2/token", 200))
+        self.assertEqual([(r.method, r.endpoint, r.status) for r in pages], [("GET", MATCHES, 206)] * 2)
+        # The token was requested on behalf of the first page
+        self.assertEqual([r.token_refreshes for r in pages], [1, 0])
+        self.assertTrue(all(r.bytes_in > 0 and r.latency > 0 and r.attempts == 1 for r in pages))
+        self.assertEqual(pages[0].url, f"https://api.toornament.com{MATCHES}".format(tournament_id=self.tournament.id))
+
+    def test_retries_and_failures(self):
+        records = []
+        self.server.error_rate = 1.0
+        api = make_api(self.server, hooks=[records.append],
+                       rate_limiter=RateLimiter(retries=2, backoff=0.001, max_backoff=0.01))
+        api.get.match_by_id(self.tournament.id, next(iter(self.server.matches[self.tournament.id])))
+        record = records[-1]
+        self.assertEqual((record.status, record.attempts, record.retries, record.error), (500, 3, 2, None))
+
+    def test_scheduler_priority(self):
+        records = []
+        api = make_api(self.server, hooks=[records.append], scheduler=Scheduler())
+        api.get.match_by_id(self.tournament.id, next(iter(self.server.matches[self.tournament.id])))
+        with api.scheduler.priority('background'):
+            api.get.tournament_by_id(self.tournament.id)
+        self.assertEqual([r.priority for r in records if r.method == "GET"], ['interactive', 'background'])
+
+    def test_prometheus_metrics(self):
+        metrics = Metrics(prefix='test')
+        api = make_api(self.server, hooks=[metrics])
+        api.get.all_matches(self.tournament)
+        match_id = next(iter(self.server.matches[self.tournament.id]))
+        api.get.match_by_id(self.tournament.id, match_id)
+        self.assertEqual(metrics.requests(), 4)
+        self.assertEqual(metrics.requests("GET", MATCHES), 2)
+        text = metrics.render()
+        self.assertIn(f'test_requests_total{{method="GET",endpoint="{MATCH}",status="200"}} 1', text)
+        self.assertIn(f'test_request_duration_seconds_count{{method="GET",endpoint="{MATCHES}"}} 2', text)
+        self.assertIn(f'test_token_refreshes_total{{method="GET",endpoint="{MATCHES}"}} 1', text)
+        for line in text.splitlines():
+            self.assertTrue(line.startswith('#') or line.startswith('test_'), line)
+        metrics.reset()
+        self.assertEqual(metrics.requests(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+
+from tourny import Mirror
+from tourny.mock_server import MockServer
+
+from _support import make_api
+
+
+class MirrorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = MockServer(teams=12, matches=60, games_per_match=2).start()
+        self.addCleanup(self.server.stop)
+        self.api = make_api(self.server)
+        self.tournament = self.server.tournament
+        self.served = self.server.matches[self.tournament.id]
+
+    def open_match(self, status):
+        return next(m for m in self.served.values() if m['status'] == status)
+
+    def test_first_sync_is_full(self):
+        with Mirror(self.api) as mirror:
+            report = mirror.sync(self.tournament)
+            self.assertTrue(report.full)
+            self.assertEqual((report.participants, report.matches), (12, 60))
+            self.assertEqual(len(mirror.matches(self.tournament.id)), 60)
+            self.assertEqual(len(mirror.teams(self.tournament.id)), 12)
+            self.assertEqual(mirror.tournaments()[0].id, self.tournament.id)
+
+            running = [m['id'] for m in self.served.values() if m['status'] == 'running']
+            self.assertEqual(sorted(m.id for m in mirror.matches(self.tournament.id, status='running')),
+                             sorted(running))
+            match = self.open_match('completed')
+            self.assertEqual(len(mirror.games(self.tournament.id, match['id'])),
+                             len(self.server.games[(self.tournament.id, match['id'])]))
+            participant_id = match['opponents'][0]['participant']['id']
+            self.assertIn(match['id'], [m.id for m in mirror.matches(self.tournament.id,
+                                                                     participant_id=participant_id)])
+
+    def test_incremental_sync_only_fetches_what_changed(self):
+        with Mirror(self.api) as mirror:
+            mirror.sync(self.tournament)
+            self.server.requests.clear()
+            report = mirror.sync(self.tournament, teams=False)
+            self.assertFalse(report.full)
+            self.assertEqual((report.matches, report.games), (0, 0))
+            self.assertNotIn(('GET', 'match'), self.server.requests)
+            self.assertNotIn(('GET', 'games'), self.server.requests)
+
+            # A running match completes, another one gets a new score
+            closed = self.open_match('running')
+            closed['status'] = 'completed'
+            changed = self.open_match('running')
+            changed['opponents'][0]['score'] = 99
+            report = mirror.sync(self.tournament, teams=False)
+            self.assertEqual(report.matches, 2)
+            self.assertEqual(self.server.requests[('GET', 'match')], 1)
+            self.assertEqual(self.server.requests[('GET', 'games')], 2)
+            self.assertEqual(mirror.match(self.tournament.id, closed['id']).status, 'completed')
+            self.assertEqual(mirror.match(self.tournament.id, changed['id']).opponents[0]['score'], 99)
+
+    def test_full_sync_removes_deleted_matches(self):
+        with Mirror(self.api) as mirror:
+            mirror.sync(self.tournament)
+            removed = self.open_match('completed')['id']
+            del self.served[removed]
+            self.assertEqual(mirror.sync(self.tournament).removed, 0)
+            self.assertEqual(mirror.sync(self.tournament, full=True).removed, 1)
+            self.assertIsNone(mirror.match(self.tournament.id, removed))
+            self.assertEqual(mirror.games(self.tournament.id, removed), [])
+
+    def test_kept_between_runs(self):
+        path = os.path.join(tempfile.mkdtemp(prefix='tourny-test-'), 'mirror.db')
+        with Mirror(self.api, path) as mirror:
+            mirror.sync(self.tournament.id)
+        with Mirror(self.api, path) as mirror:
+            self.assertEqual(len(mirror.matches(self.tournament.id)), 60)
+            self.assertFalse(mirror.sync(self.tournament).full)
+        with Mirror(self.api) as mirror, self.assertRaises(LookupError):
+            mirror.sync('123')
+
+
+if __name__ == '__main__':
+    unittest.main()
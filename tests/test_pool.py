@@ -0,0 +1,93 @@
+import time
+import unittest
+
+from tourny import APIPool
+from tourny._ratelimit import RateLimiter
+from tourny.mock_server import MockServer
+
+from _support import make_api
+
+
+def _key(api):
+    return api._API__key
+
+
+class APIPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = MockServer(teams=8, matches=30, games_per_match=0).start()
+        self.addCleanup(self.server.stop)
+        self.tournament = self.server.tournament
+        self.match_ids = list(self.server.matches[self.tournament.id])
+
+    def accounts(self, count=2, **settings):
+        return [make_api(self.server, rate_limiter=RateLimiter(retries=2, backoff=0.001, max_backoff=0.01),
+                         **settings) for _ in range(count)]
+
+    def throttle(self, *accounts):
+        keys = {_key(account) for account in accounts}
+        self.server._MockServer__throttled = lambda api_key: api_key in keys
+
+    def test_throttled_account_fails_over_at_once(self):
+        pool = APIPool(self.accounts())
+        self.throttle(pool.accounts[0])
+        started = time.monotonic()
+        matches = [pool.get.match_by_id(self.tournament.id, match_id) for match_id in self.match_ids[:4]]
+        # The Retry-After of the throttled account is not waited for
+        self.assertLess(time.monotonic() - started, 0.9)
+        self.assertTrue(all(match is not None for match in matches))
+        # Once throttled, the account comes last
+        self.assertEqual(pool.sent, [1, 4])
+
+    def test_every_account_throttled(self):
+        pool = APIPool(self.accounts())
+        for account in pool.accounts:
+            account.rate_limiter.configure(retries=0)
+        self.throttle(*pool.accounts)
+        response = pool._request("GET", "organizer:view",
+                                 f"https://api.toornament.com/organizer/v2/tournaments/{self.tournament.id}")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(pool.sent, [1, 1])
+
+    def test_spreads_requests(self):
+        for strategy in ('least_loaded', 'round_robin'):
+            # Known to be served by every account, otherwise the first to serve it keeps it
+            pool = APIPool(self.accounts(3), strategy=strategy).discover()
+            pool.sent = [0, 0, 0]
+            for match_id in self.match_ids[:9]:
+                pool.get.match_by_id(self.tournament.id, match_id)
+            self.assertEqual(pool.sent, [3, 3, 3], strategy)
+        with self.assertRaises(ValueError):
+            APIPool(self.accounts(), strategy='random')
+
+    def test_forbidden_account_is_revoked(self):
+        pool = APIPool(self.accounts()).discover()
+        self.assertEqual(len(pool.owners(self.tournament.id)), 2)
+        handle = self.server.handle
+        forbidden = _key(pool.accounts[0])
+
+        def answer(method, path, headers, body):
+            if headers.get('x-api-key') == forbidden and '/tournaments/' in path:
+                return 403, {}, {'message': 'Forbidden'}
+            return handle(method, path, headers, body)
+        self.server.handle = answer
+        for match_id in self.match_ids[:3]:
+            self.assertIsNotNone(pool.get.match_by_id(self.tournament.id, match_id))
+        self.assertEqual(pool.owners(self.tournament.id), [pool.accounts[1]])
+
+    def test_hooks_of_ready_made_accounts(self):
+        records = []
+        accounts = self.accounts()
+        pool = APIPool(accounts, hooks=[records.append])
+        APIPool(accounts, hooks=[records.append])
+        self.assertEqual([account.hooks for account in pool.accounts], [[records.append]] * 2)
+        pool.get.match_by_id(self.tournament.id, self.match_ids[0])
+        self.assertEqual([record.method for record in records], ["POST", "GET"])
+
+    def test_collections_through_the_pool(self):
+        pool = APIPool(self.accounts())
+        self.assertEqual(sorted(m.id for m in pool.get.all_matches(self.tournament)), sorted(self.match_ids))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import datetime
+import unittest
+
+from tourny import Query
+from tourny.mock_server import MockServer
+
+from _support import make_api
+
+
+class QueryTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockServer(teams=16, matches=300, games_per_match=0).start()
+        cls.api = make_api(cls.server)
+        cls.tournament = cls.server.tournament
+        cls.matches = list(cls.server.matches[cls.tournament.id].values())
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def query(self):
+        return self.api.get.query('matches', self.tournament)
+
+    def test_params(self):
+        query = self.query().where(status='running', is_scheduled=True,
+                                   scheduled_before=datetime.date(2030, 1, 2)).sort('schedule')
+        self.assertIsInstance(query, Query)
+        self.assertEqual(query.params, {'statuses': 'running', 'is_scheduled': '1',
+                                        'scheduled_before': '2030-01-02', 'sort': 'schedule'})
+        # where() and sort() leave the query they were called on as it was
+        base = self.query()
+        base.where(status='running')
+        self.assertEqual(base.params, {})
+
+    def test_invalid(self):
+        with self.assertRaises(TypeError):
+            self.query().where(colour='red')
+        with self.assertRaises(ValueError):
+            self.query().where(status='finished')
+        with self.assertRaises(ValueError):
+            self.query().where(is_scheduled='yes')
+        with self.assertRaises(ValueError):
+            self.query().where(statuses=[])
+        with self.assertRaises(ValueError):
+            self.query().sort('alphabetic')
+        with self.assertRaises(ValueError):
+            self.api.get.query('brackets', self.tournament)
+
+    def test_filtered_on_the_server(self):
+        expected = sorted(m['id'] for m in self.matches if m['status'] in ('running', 'completed'))
+        query = self.query().where(statuses=['running', 'completed'])
+        self.assertEqual(sorted(m.id for m in query.all()), expected)
+        self.assertEqual(sorted(m.id for m in query.iter()), expected)
+        self.assertEqual([m.id for m in query.page((0, 9))], [m.id for m in query.all()[:10]])
+
+    def test_participant_filter(self):
+        participant_id = next(o['participant']['id'] for o in self.matches[0]['opponents'] if o.get('participant'))
+        matches = self.query().where(participant_id=participant_id).all()
+        self.assertTrue(matches)
+        self.assertTrue(all(any((o.get('participant') or {}).get('id') == participant_id for o in m.opponents)
+                            for m in matches))
+
+
+if __name__ == '__main__':
+    unittest.main()
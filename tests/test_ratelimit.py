@@ -0,0 +1,122 @@
+import time
+import unittest
+from email.utils import formatdate
+
+from tourny import RateLimiter
+from tourny._ratelimit import retry_after
+from tourny.mock_server import MockServer
+
+from _support import make_api
+
+
+class _Response():
+    def __init__(self, headers):
+        self.headers = {k.lower(): v for k, v in headers.items()}
+
+
+class RateLimiterTest(unittest.TestCase):
+
+    def test_token_bucket(self):
+        limiter = RateLimiter(rate=100, burst=5)
+        started = time.monotonic()
+        for _ in range(15):
+            with limiter():
+                pass
+        # The burst goes at once, the other ten at the rate
+        self.assertGreater(time.monotonic() - started, 0.08)
+
+    def test_window_halves_when_throttled_and_grows_back(self):
+        limiter = RateLimiter(max_concurrency=16)
+        with limiter() as slot:
+            slot.throttled = True
+        self.assertEqual(limiter.concurrency, 8)
+        self.assertEqual(limiter.throttled, 1)
+        for _ in range(5):
+            with limiter() as slot:
+                slot.throttled = True
+        self.assertEqual(limiter.concurrency, 1)
+        for _ in range(3):
+            with limiter():
+                pass
+        self.assertEqual(limiter.concurrency, 2)
+
+    def test_failed_request_counts_as_throttled(self):
+        limiter = RateLimiter(max_concurrency=4)
+        with self.assertRaises(RuntimeError):
+            with limiter():
+                raise RuntimeError()
+        self.assertEqual(limiter.concurrency, 2)
+
+    def test_pause(self):
+        limiter = RateLimiter()
+        limiter.pause(0.1)
+        self.assertGreater(limiter.paused, 0)
+        started = time.monotonic()
+        with limiter():
+            pass
+        self.assertGreater(time.monotonic() - started, 0.09)
+
+    def test_delay(self):
+        limiter = RateLimiter(backoff=0.5, max_backoff=4.0)
+        self.assertEqual(limiter.delay(1, retry_after=2), 2)
+        self.assertEqual(limiter.delay(1, retry_after=60), 4.0)
+        for attempt in range(1, 10):
+            self.assertLessEqual(limiter.delay(attempt), min(4.0, 0.5 * 2 ** (attempt - 1)))
+
+    def test_retry_after(self):
+        self.assertEqual(retry_after(_Response({'Retry-After': '3'})), 3.0)
+        self.assertIsNone(retry_after(_Response({})))
+        self.assertIsNone(retry_after(_Response({'Retry-After': 'soon'})))
+        self.assertAlmostEqual(retry_after(_Response({'Retry-After': formatdate(time.time() + 30, usegmt=True)})),
+                               30, delta=2)
+
+    def test_shared_per_key(self):
+        first = RateLimiter.for_key('test-shared-key', rate=10)
+        self.assertIs(RateLimiter.for_key('test-shared-key'), first)
+        RateLimiter.for_key('test-shared-key', max_concurrency=4)
+        self.assertEqual(first.concurrency, 4)
+        with self.assertRaises(TypeError):
+            first.configure(colour='red')
+
+
+class RetryTest(unittest.TestCase):
+
+    def test_transient_failures_are_retried(self):
+        with MockServer(teams=8, matches=30, games_per_match=0, error_rate=0.3) as server:
+            api = make_api(server, rate_limiter=RateLimiter(retries=20, backoff=0.001, max_backoff=0.01))
+            tournament = server.tournament
+            for match_id in server.matches[tournament.id]:
+                self.assertIsNotNone(api.get.match_by_id(tournament.id, match_id))
+            self.assertGreater(server.requests[('GET', 'match')], 30)
+
+    def test_retry_after_pauses_the_key(self):
+        with MockServer(teams=8, matches=3, games_per_match=0, rate_limit=1) as server:
+            limiter = RateLimiter(retries=5, backoff=0.001, max_backoff=2.0)
+            api = make_api(server, rate_limiter=limiter)
+            tournament = server.tournament
+            started = time.monotonic()
+            for match_id in server.matches[tournament.id]:
+                self.assertIsNotNone(api.get.match_by_id(tournament.id, match_id))
+            # Throttled after a request in a second, then held back for Retry-After
+            self.assertGreater(time.monotonic() - started, 0.5)
+            self.assertGreaterEqual(limiter.throttled, 1)
+            self.assertLess(limiter.concurrency, limiter.max_concurrency)
+
+    def test_gives_up_after_retries(self):
+        with MockServer(teams=8, matches=4, games_per_match=0, error_rate=1.0) as server:
+            api = make_api(server, rate_limiter=RateLimiter(retries=2, backoff=0.001, max_backoff=0.01))
+            tournament = server.tournament
+            response = api._request("GET", "organizer:view",
+                                    f"https://api.toornament.com/organizer/v2/tournaments/{tournament.id}")
+            self.assertEqual((response.status_code, response.attempts), (500, 3))
+
+    def test_failed_post_is_not_retried(self):
+        with MockServer(teams=8, matches=4, games_per_match=0, error_rate=1.0) as server:
+            api = make_api(server, rate_limiter=RateLimiter(retries=2, backoff=0.001, max_backoff=0.01))
+            url = f"https://api.toornament.com/organizer/v2/tournaments/{server.tournament.id}/participants"
+            response = api._request("POST", "organizer:participant", url, data='{"name": "New"}')
+            self.assertEqual((response.status_code, response.attempts), (500, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
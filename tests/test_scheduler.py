@@ -0,0 +1,106 @@
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from tourny._ratelimit import RateLimiter
+from tourny._scheduler import Scheduler, carry_priority
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Timed out")
+        time.sleep(0.001)
+
+
+class RateLimiterOrderTest(unittest.TestCase):
+
+    def queue(self, limiter, order, name, rank, max_wait=None):
+        def run():
+            with limiter(rank, max_wait):
+                order.append(name)
+        waiting = len(limiter._waiting)
+        thread = threading.Thread(target=run)
+        thread.start()
+        _wait_for(lambda: len(limiter._waiting) > waiting)
+        return thread
+
+    def test_lower_rank_goes_first_once_the_window_is_full(self):
+        limiter = RateLimiter(max_concurrency=1)
+        order = []
+        limiter.acquire()
+        threads = [self.queue(limiter, order, f"page {i}", 2) for i in range(3)]
+        threads.append(self.queue(limiter, order, 'write', 0))
+        limiter.release()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(order, ['write', 'page 0', 'page 1', 'page 2'])
+
+    def test_same_rank_in_arrival_order(self):
+        limiter = RateLimiter(max_concurrency=1)
+        order = []
+        limiter.acquire()
+        threads = [self.queue(limiter, order, i, 1) for i in range(5)]
+        limiter.release()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(order, list(range(5)))
+
+    def test_request_waiting_too_long_is_promoted(self):
+        limiter = RateLimiter(max_concurrency=1)
+        order = []
+        limiter.acquire()
+        threads = [self.queue(limiter, order, 'page', 2, max_wait=0.05)]
+        time.sleep(0.1)
+        threads.append(self.queue(limiter, order, 'write', 0, max_wait=0.05))
+        limiter.release()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(order, ['page', 'write'])
+
+
+class SchedulerTest(unittest.TestCase):
+
+    def test_classify(self):
+        scheduler = Scheduler()
+        self.assertEqual(scheduler.classify("PATCH"), 'live')
+        self.assertEqual(scheduler.classify("GET", {'Range': 'matches=0-99'}), 'background')
+        self.assertEqual(scheduler.classify("GET"), 'interactive')
+        with scheduler.priority('live'):
+            self.assertEqual(scheduler.classify("GET", {'Range': 'matches=0-99'}), 'live')
+        with self.assertRaises(ValueError):
+            scheduler.priority('urgent').__enter__()
+
+    def test_most_urgent_class_goes_first(self):
+        scheduler = Scheduler(max_concurrency=1)
+        order = []
+        scheduler.acquire('background')
+
+        def run(name):
+            with scheduler.slot(name):
+                order.append(name)
+        threads = []
+        for name in ('background', 'interactive', 'live'):
+            threads.append(threading.Thread(target=run, args=(name,)))
+            threads[-1].start()
+            _wait_for(lambda: len(scheduler._waiting) == len(threads))
+        scheduler.release('background')
+        for thread in threads:
+            thread.join()
+        self.assertEqual(order, ['live', 'interactive', 'background'])
+        self.assertEqual(scheduler.stats()['live'].granted, 1)
+
+    def test_priority_reaches_worker_threads(self):
+        scheduler = Scheduler()
+        with scheduler.priority('live'):
+            classify = carry_priority(lambda method: scheduler.classify(method, {'Range': 'matches=0-99'}))
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            self.assertEqual(list(executor.map(classify, ["GET", "GET"])), ['live', 'live'])
+            # The worker threads themselves are left as they were
+            self.assertEqual(executor.submit(scheduler.classify, "GET").result(), 'interactive')
+
+
+if __name__ == '__main__':
+    unittest.main()
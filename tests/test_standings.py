@@ -0,0 +1,113 @@
+import random
+import unittest
+
+from tourny import Standings
+from tourny.TournamentItems import Match, Game
+from tourny.mock_server import MockServer
+
+from _support import make_api
+
+
+def _match(match_id, a, b, score_a, score_b, status='completed', group='g1'):
+    return Match.from_dict({'id': match_id, 'number': int(match_id), 'status': status, 'stage_id': 's1',
+                            'group_id': group,
+                            'opponents': [{'number': 1, 'score': score_a, 'participant': {'id': a, 'name': a.upper()}},
+                                          {'number': 2, 'score': score_b, 'participant': {'id': b, 'name': b.upper()}}]})
+
+
+def _rows(standings, group='g1'):
+    return [(row.rank, row.participant_id, row.points) for row in standings.ranking('s1', group)]
+
+
+class StandingsTest(unittest.TestCase):
+
+    def test_ranking(self):
+        standings = Standings().load([_match('1', 'a', 'b', 2, 0), _match('2', 'b', 'c', 1, 1),
+                                      _match('3', 'a', 'c', 0, 3), _match('4', 'a', 'b', 1, 0, status='running')])
+        self.assertEqual(_rows(standings), [(1, 'c', 4), (2, 'a', 3), (3, 'b', 1)])
+        row = standings.record('a', 's1', 'g1')
+        self.assertEqual((row.played, row.wins, row.losses, row.score_for, row.score_against, row.name),
+                         (2, 1, 1, 2, 3, 'A'))
+        self.assertEqual(standings.groups(), [('s1', 'g1')])
+        # The stage ranks every group together
+        self.assertEqual(_rows(standings, None), _rows(standings))
+
+    def test_running_matches_count_when_asked(self):
+        standings = Standings(include_running=True).load([_match('1', 'a', 'b', 1, 0, status='running')])
+        self.assertEqual(standings.record('a', 's1', 'g1').points, 3)
+
+    def test_head_to_head(self):
+        # a and b are level on points, a won their match but b has the better score difference
+        ranked = Standings(tiebreakers=('points', 'score_difference')).load(
+            [_match('1', 'a', 'b', 1, 0), _match('2', 'b', 'c', 9, 0), _match('3', 'a', 'c', 0, 0),
+             _match('4', 'b', 'c', 0, 0)])
+        self.assertEqual(ranked.ranking('s1', 'g1')[0].participant_id, 'b')
+        ranked = Standings(tiebreakers=('points', 'head_to_head', 'score_difference')).load(
+            [_match('1', 'a', 'b', 1, 0), _match('2', 'b', 'c', 9, 0), _match('3', 'a', 'c', 0, 0),
+             _match('4', 'b', 'c', 0, 0)])
+        self.assertEqual(ranked.ranking('s1', 'g1')[0].participant_id, 'a')
+
+    def test_update_and_remove(self):
+        standings = Standings().load([_match('1', 'a', 'b', 2, 0), _match('2', 'b', 'c', 1, 0)])
+        standings.update(_match('1', 'a', 'b', 0, 2))
+        self.assertEqual(standings.record('b', 's1', 'g1').points, 6)
+        self.assertEqual(standings.record('a', 's1', 'g1').losses, 1)
+        standings.remove('2')
+        self.assertEqual(standings.record('b', 's1', 'g1').played, 1)
+        self.assertIsNone(standings.record('c', 's1', 'g1'))
+
+    def test_games(self):
+        match = _match('1', 'a', 'b', 2, 1)
+        games = [Game.from_dict({'number': n, 'status': 'completed',
+                                 'opponents': [{'number': 1, 'score': x}, {'number': 2, 'score': y}]})
+                 for n, (x, y) in enumerate([(16, 10), (5, 16), (16, 14)], 1)]
+        standings = Standings().load([match], {'1': games})
+        row = standings.record('a', 's1', 'g1')
+        self.assertEqual((row.games_won, row.games_lost, row.game_difference), (2, 1, 1))
+        standings.update_game(match, Game.from_dict({'number': 2, 'status': 'completed',
+                                                     'opponents': [{'number': 1, 'score': 16},
+                                                                   {'number': 2, 'score': 5}]}))
+        self.assertEqual(standings.record('a', 's1', 'g1').games_won, 3)
+
+    def test_incremental_updates_match_a_full_recount(self):
+        rand = random.Random(0)
+        teams = [f"t{i}" for i in range(8)]
+        matches = {str(i): _match(str(i), *rand.sample(teams, 2), rand.randint(0, 3), rand.randint(0, 3),
+                                  group=rand.choice(['g1', 'g2']))
+                   for i in range(1, 60)}
+        standings = Standings().load(matches.values())
+        for _ in range(200):
+            match_id = rand.choice(list(matches))
+            old = matches[match_id]
+            a, b = (o['participant']['id'] for o in old.opponents)
+            matches[match_id] = _match(match_id, a, b, rand.randint(0, 3), rand.randint(0, 3),
+                                       status=rand.choice(['completed', 'running']), group=old.group_id)
+            standings.update(matches[match_id])
+            standings.ranking('s1', 'g1')
+        recount = Standings().load(matches.values())
+        for group in ('g1', 'g2', None):
+            self.assertEqual(standings.ranking('s1', group), recount.ranking('s1', group))
+
+
+class AttachTest(unittest.TestCase):
+
+    def test_patched_matches_update_the_standings(self):
+        with MockServer(teams=8, matches=40, games_per_match=0) as server:
+            api = make_api(server)
+            tournament = server.tournament
+            matches = api.get.all_matches(tournament)
+            standings = Standings().attach(api).load(matches)
+            match = next(m for m in matches if m.status == 'pending' and
+                         all(o.get('participant') for o in m.opponents))
+            winner = match.opponents[0]['participant']['id']
+            before = standings.record(winner, match.stage_id, match.group_id)
+            # The status is not a patch field, the match is closed on the server
+            server.matches[tournament.id][match.id]['status'] = 'completed'
+            match.opponents[0]['score'], match.opponents[1]['score'] = 3, 0
+            api.patch.match(tournament, match)
+            after = standings.record(winner, match.stage_id, match.group_id)
+            self.assertEqual(after.wins, (before.wins if before else 0) + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import json
+import random
+import unittest
+
+from tourny._stream import ArrayStream, iter_array
+
+DOCUMENTS = [
+    '[]',
+    ' [ ] ',
+    '[1]',
+    '[1.5, -2, 3e10, -4.25E-3, 0, 10]',
+    '[true, false, null, "x"]',
+    '["café", "éèê", "漢字", "emoji \U0001f3c6", "escaped \\" \\\\ \\u00e9"]',
+    '[{"id": "1", "opponents": [{"number": 1, "score": 2.5}, {"number": 2, "score": null}]}, {"id": "2"}]',
+    '[[1, [2, [3]]], {"a": {"b": [1e-3]}}, 12345678901234567890]',
+    '\n[\n  {"name": "Team 1", "custom_fields": {}},\n  {"name": "Team 2", "custom_fields": {"x": 1}}\n]\n',
+]
+
+
+def _split(data, rng):
+    """
+    Cuts bytes into chunks at random positions, including inside multi-byte characters
+    """
+    cuts = sorted(rng.sample(range(1, len(data)), min(len(data) - 1, rng.randint(0, 8)))) if len(data) > 1 else []
+    bounds = [0] + cuts + [len(data)]
+    return [data[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+class _Response():
+    def __init__(self, body):
+        self.body = body
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), chunk_size):
+            yield self.body[start:start + chunk_size]
+
+    def close(self):
+        self.closed = True
+
+
+class IterArrayTest(unittest.TestCase):
+
+    def test_whole_documents(self):
+        for document in DOCUMENTS:
+            self.assertEqual(list(iter_array([document.encode('utf-8')])), json.loads(document))
+
+    def test_every_single_split(self):
+        for document in DOCUMENTS:
+            data = document.encode('utf-8')
+            for cut in range(1, len(data)):
+                self.assertEqual(list(iter_array([data[:cut], data[cut:]])), json.loads(document),
+                                 f"{document!r} cut at {cut}")
+
+    def test_random_splits(self):
+        rng = random.Random(0)
+        for _ in range(2000):
+            document = rng.choice(DOCUMENTS)
+            chunks = _split(document.encode('utf-8'), rng)
+            self.assertEqual(list(iter_array(chunks)), json.loads(document), f"{chunks!r}")
+
+    def test_byte_by_byte(self):
+        for document in DOCUMENTS:
+            data = document.encode('utf-8')
+            self.assertEqual(list(iter_array(data[i:i + 1] for i in range(len(data)))), json.loads(document))
+
+    def test_numbers_cut_after_sign_point_or_exponent(self):
+        self.assertEqual(list(iter_array([b'[1.', b'5]'])), [1.5])
+        self.assertEqual(list(iter_array([b'[1', b'e', b'3]'])), [1000.0])
+        self.assertEqual(list(iter_array([b'[2,', b'-', b'7]'])), [2, -7])
+        self.assertEqual(list(iter_array([b'[1E-', b'2]'])), [0.01])
+
+    def test_yields_before_the_end(self):
+        chunks = iter([b'[{"id": 1}, ', b'{"id": 2}', b']'])
+        items = iter_array(chunks)
+        self.assertEqual(next(items), {'id': 1})
+        self.assertEqual(next(chunks), b'{"id": 2}')
+
+    def test_malformed(self):
+        for document in ('{"id": 1}', '[1, 2', '[1 2]', '[1,]', '', '[1.]'):
+            with self.assertRaises(ValueError, msg=document):
+                list(iter_array([document.encode('utf-8')]))
+
+
+class ArrayStreamTest(unittest.TestCase):
+
+    def test_closes_when_read(self):
+        response = _Response(json.dumps([{'id': str(i)} for i in range(100)]).encode('utf-8'))
+        self.assertEqual(len(list(ArrayStream(response, chunk_size=7))), 100)
+        self.assertTrue(response.closed)
+
+    def test_closes_when_abandoned(self):
+        response = _Response(b'[1, 2, 3]')
+        items = iter(ArrayStream(response, chunk_size=1))
+        self.assertEqual(next(items), 1)
+        items.close()
+        self.assertTrue(response.closed)
+
+
+if __name__ == '__main__':
+    unittest.main()
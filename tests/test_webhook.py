@@ -0,0 +1,140 @@
+import json
+import threading
+import unittest
+import urllib.error
+import urllib.request
+
+from tourny import ResponseCache, WebhookReceiver
+from tourny._webhook import MatchEvent, GameEvent, sign
+from tourny.mock_server import MockServer
+
+from _support import make_api
+
+
+def _body(*notifications):
+    return json.dumps(list(notifications)).encode('utf-8')
+
+
+class _Target():
+    def __init__(self):
+        self.updated = []
+        self.removed = []
+
+    def update(self, match):
+        self.updated.append(match)
+
+    def remove(self, match_id):
+        self.removed.append(match_id)
+
+
+class WebhookReceiverTest(unittest.TestCase):
+
+    def test_signature(self):
+        receiver = WebhookReceiver(secret='s3cret')
+        body = _body({'id': '1', 'name': 'match.updated', 'object_id': 'm'})
+        self.assertEqual(receiver.handle(body, {'X-Webhook-Signature': sign(body, 's3cret')})[0], 200)
+        self.assertEqual(receiver.handle(body, {'x-webhook-signature': 'sha256=' + sign(body, 's3cret')})[0], 200)
+        self.assertEqual(receiver.handle(body, {'X-Webhook-Signature': sign(body, 'other')})[0], 401)
+        self.assertEqual(receiver.handle(body)[0], 401)
+        self.assertEqual(receiver.rejected, 2)
+
+    def test_typed_events_and_handlers(self):
+        receiver = WebhookReceiver()
+        seen = []
+        receiver.on('match.updated', lambda event: seen.append(('name', event.object_id)))
+        receiver.on('match_game', lambda event: seen.append(('type', event.object_id)))
+        status, events = receiver.handle(_body(
+            {'id': '1', 'name': 'match.updated', 'object_id': 'm', 'scope': 'tournament', 'scope_id': 't'},
+            {'id': '2', 'name': 'match_game.created', 'object': {'id': 'g', 'match_id': 'm', 'number': 1}}))
+        self.assertEqual(status, 200)
+        self.assertIsInstance(events[0], MatchEvent)
+        self.assertEqual(events[0].tournament_id, 't')
+        self.assertIsInstance(events[1], GameEvent)
+        self.assertEqual(seen, [('name', 'm'), ('type', 'g')])
+        self.assertEqual(receiver.handle(b'not json')[0], 400)
+
+    def test_duplicates_are_dropped(self):
+        receiver = WebhookReceiver()
+        calls = []
+        receiver.on('*', calls.append)
+        body = _body({'id': '1', 'name': 'match.updated', 'object_id': 'm'})
+        receiver.handle(body)
+        self.assertEqual(receiver.handle(body), (200, []))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(receiver.duplicates, 1)
+
+    def test_failed_dispatch_is_delivered_again(self):
+        receiver = WebhookReceiver()
+        failures = [RuntimeError("database down")]
+
+        def handler(event):
+            if failures:
+                raise failures.pop()
+        receiver.on('*', handler)
+        body = _body({'id': '1', 'name': 'match.updated', 'object_id': 'm'})
+        self.assertEqual(receiver.handle(body)[0], 500)
+        status, events = receiver.handle(body)
+        self.assertEqual((status, len(events)), (200, 1))
+
+    def test_delivery_during_dispatch_is_a_duplicate(self):
+        receiver = WebhookReceiver()
+        entered = threading.Event()
+        proceed = threading.Event()
+        calls = []
+
+        def handler(event):
+            calls.append(event.id)
+            entered.set()
+            proceed.wait(5)
+        receiver.on('*', handler)
+        body = _body({'id': '1', 'name': 'match.updated', 'object_id': 'm'})
+        first = threading.Thread(target=receiver.handle, args=(body,))
+        first.start()
+        entered.wait(5)
+        self.assertEqual(receiver.handle(body), (200, []))
+        proceed.set()
+        first.join()
+        self.assertEqual(calls, ['1'])
+        self.assertEqual(receiver.handle(body), (200, []))
+
+    def test_serve(self):
+        with WebhookReceiver(secret='s3cret').serve(path='/hooks') as receiver:
+            body = _body({'id': '1', 'name': 'match.updated', 'object_id': 'm'})
+            request = urllib.request.Request(receiver.url, data=body,
+                                             headers={'X-Webhook-Signature': sign(body, 's3cret')})
+            with urllib.request.urlopen(request) as response:
+                self.assertEqual(response.status, 200)
+            with self.assertRaises(urllib.error.HTTPError) as raised:
+                urllib.request.urlopen(urllib.request.Request(receiver.url, data=body))
+            self.assertEqual(raised.exception.code, 401)
+        self.assertEqual(receiver.received, 1)
+
+
+class AttachTest(unittest.TestCase):
+
+    def test_invalidates_cache_and_updates_targets(self):
+        with MockServer(teams=8, matches=20, games_per_match=0) as server:
+            api = make_api(server, cache=ResponseCache())
+            tournament = server.tournament
+            match_id = next(iter(server.matches[tournament.id]))
+            url = f"https://api.toornament.com/organizer/v2/tournaments/{tournament.id}/matches/{match_id}"
+            api.get.match_by_id(tournament.id, match_id)
+            self.assertIsNotNone(api.cache.get(url)[0])
+
+            target = _Target()
+            receiver = WebhookReceiver()
+            receiver.attach(api, target)
+            receiver.handle(_body({'id': '1', 'name': 'match.updated', 'object_id': match_id,
+                                   'scope': 'tournament', 'scope_id': tournament.id}))
+            self.assertEqual([m.id for m in target.updated], [match_id])
+            # Looked up again from the server, then cached anew
+            self.assertEqual(api.cache.invalidations, 1)
+
+            receiver.handle(_body({'id': '2', 'name': 'match.deleted', 'object_id': match_id,
+                                   'scope': 'tournament', 'scope_id': tournament.id}))
+            self.assertEqual(target.removed, [match_id])
+            self.assertIsNone(api.cache.get(url)[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
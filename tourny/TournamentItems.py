@@ -1,42 +1,303 @@
 __all__ = ["Tournament", "Team", "Match", "Game"]
 
+import hashlib
 from collections import abc
 from abc import abstractmethod
 from copy import deepcopy
 from typing import List
-import json
+from ._codec import default_codec
+
+# Codec used to serialize items, the fastest one available
+codec = default_codec()
+
+class _Sentinel():
+    '''
+    Marker that stays the same object through pickling
+    '''
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __reduce__(self):
+        return self.name
+
+    def __repr__(self):
+        return self.name
+
+# Marks a field without a value
+_MISSING = _Sentinel('_MISSING')
+
+def _fingerprint(val):
+    '''
+    Identifies the value of a field: immutable values are kept as they are,
+    lists and dicts are replaced by a digest of their JSON encoding that stays
+    the same across processes, as loaded states are pickled with the items.
+    '''
+    if type(val) in (list, dict):
+        return _Digest.from_bytes(hashlib.blake2b(codec.dumps(val), digest_size=8).digest(), 'little')
+    return val
+
+
+class _Digest(int):
+    '''
+    Digest standing in for a list or dict in a loaded state
+    '''
+    __slots__ = ()
+
+
+# Loaded state of an item from the API none of whose fields was read in place or set yet
+_LOADED = _Sentinel('_LOADED')
+
 
 class BaseItem(abc.MappingView):
+    """
+    Mapping-like object built from the JSON of an API object.
+
+    Fields every object of a class is known to have are stored in __slots__,
+    anything else the API sends is kept in a single overflow dict.
+
+    Objects loaded with from_dict() keep track of the state they were loaded
+    with, so changed_fields() can tell which patch fields were modified since.
+    That state is only taken field by field when needed, so items that are
+    never modified cost next to nothing more to build: the lists and dicts of
+    nested fields are held back from their slots until first read, and
+    fingerprinted then, before they can be changed in place; other fields
+    are fingerprinted when first set.
+
+    _snapshot is None for objects not loaded from the API, _LOADED until a
+    field is held or fingerprinted, then a dict of field to held list or dict,
+    or to fingerprint (never a list or dict) of the value it was loaded with.
+    """
+    __slots__ = ('_extra', '_snapshot')
+
+    # Known fields, stored in slots
+    _fields = ()
+    # Patch fields holding lists or dicts, which may be changed in place once read
+    _nested = ()
+    # Defaults of fields that are always set, a callable default is called for every new object
+    _defaults = {}
+
     def __init__(self, **kwargs):
         '''
         Makes all keys in kwargs an attribute of the object with its respective value in kwargs
         '''
-        for key, val in kwargs.items():
-            self.__setattr__(key, val)
+        self._load(kwargs)
+
+    @classmethod
+    def from_dict(cls, data):
+        '''
+        Builds an object straight from a decoded JSON dict, without copying it into kwargs
+        '''
+        item = cls.__new__(cls)
+        item._load(data)
+        state = _LOADED
+        for key in cls._nested:
+            val = data.get(key)
+            if type(val) in (list, dict):
+                if state is _LOADED:
+                    state = dict()
+                state[key] = val
+                object.__delattr__(item, key)
+        object.__setattr__(item, '_snapshot', state)
+        return item
+
+    def _load(self, data):
+        setter = object.__setattr__
+        defaults = self._defaults
+        known = 0
+        for key in self._fields:
+            if key in data:
+                setter(self, key, data[key])
+                known += 1
+            elif key in defaults:
+                default = defaults[key]
+                setter(self, key, default() if callable(default) else default)
+
+        extra = None
+        if known < len(data):
+            fields = self._fields
+            extra = {key: val for key, val in data.items() if key not in fields}
+        setter(self, '_extra', extra)
+        setter(self, '_snapshot', None)
+
+    def _set_fields(self):
+        '''
+        Yields the known fields that have a value
+        '''
+        state = self._snapshot
+        for key in self._fields:
+            try:
+                yield key, object.__getattribute__(self, key)
+            except AttributeError:
+                if type(state) is dict and type(state.get(key)) in (list, dict):
+                    yield key, state[key]
+
+    def to_dict(self, whitelist=None):
+        '''
+        Returns the fields of the object as a dict, only those in whitelist if it is given
+        '''
+        if whitelist is None:
+            data = dict(self._set_fields())
+            if self._extra:
+                data.update(self._extra)
+            return data
+
+        data = dict()
+        for key in whitelist:
+            val = getattr(self, key, _MISSING)
+            if val is not _MISSING:
+                data[key] = val
+        return data
+
+    def dumps(self, whitelist=None, codec=codec):
+        '''
+        Serialize object straight into JSON bytes
+        '''
+        return codec.dumps(self.to_dict(whitelist=whitelist))
     
     def json(self, whitelist=None):
         '''
         Convert object into JSON serializable string
         '''
-        if whitelist is None:
-            return json.dumps({k: v for k, v in self.__dict__.items() 
-                                    if not callable(v)})
-        else:
-            return json.dumps({k: v for k, v in self.__dict__.items()
-                                    if not callable(v)
-                                    and k in whitelist})
+        return self.dumps(whitelist=whitelist).decode('utf-8')
 
     def patch_fields(self):
         return []
 
+    def changed_fields(self):
+        '''
+        Returns the patch fields modified since the object was loaded.
+
+        Every patch field with a value counts as changed for objects that were
+        not loaded from the API.
+        '''
+        state = self._snapshot
+        changed = []
+        for key in self.patch_fields():
+            if state is None:
+                then = _MISSING
+            elif type(state) is dict and key in state:
+                then = state[key]
+                if type(then) in (list, dict):
+                    # Still held, as loaded
+                    continue
+            else:
+                # Neither read nor set since it was loaded
+                continue
+            now = getattr(self, key, _MISSING)
+            if now is _MISSING:
+                continue
+            now = _fingerprint(now)
+            if type(now) is not type(then) or now != then:
+                changed.append(key)
+        return changed
+
+    def mark_clean(self, fields=None):
+        '''
+        Takes the current value of the patch fields (or only 'fields') as the loaded state
+        '''
+        whitelist = self.patch_fields()
+        if self._snapshot is None:
+            # Fields not marked clean stay changed, as if they were loaded without a value
+            object.__setattr__(self, '_snapshot', {key: _MISSING for key in whitelist})
+        state = self.__state()
+        for key in (whitelist if fields is None else fields):
+            if type(state.get(key)) not in (list, dict):
+                state[key] = _fingerprint(getattr(self, key, _MISSING))
+
+    def __state(self):
+        state = self._snapshot
+        if state is _LOADED:
+            state = dict()
+            object.__setattr__(self, '_snapshot', state)
+        return state
+
+    def __track(self, key):
+        '''
+        Fingerprints the loaded value of a field about to be set or deleted
+        '''
+        if self._snapshot is None:
+            return
+        state = self.__state()
+        if key not in state:
+            state[key] = _fingerprint(getattr(self, key, _MISSING))
+        elif type(state[key]) in (list, dict):
+            state[key] = _fingerprint(state[key])
+
+    @property
+    def is_dirty(self):
+        return bool(self.changed_fields())
+
+    def __getattr__(self, key):
+        # Only called when key is not one of the known fields, or one held back since loading
+        if key in BaseItem.__slots__:
+            raise AttributeError(key)
+        state = self._snapshot
+        if type(state) is dict and type(state.get(key)) in (list, dict):
+            val = state[key]
+            state[key] = _fingerprint(val)
+            object.__setattr__(self, key, val)
+            return val
+        extra = self._extra
+        if extra is not None and key in extra:
+            val = extra[key]
+            if state is not None and type(val) in (list, dict):
+                state = self.__state()
+                if key not in state:
+                    state[key] = _fingerprint(val)
+            return val
+        raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{key}'")
+
+    def __setattr__(self, key, val):
+        self.__track(key)
+        if key in self._fields or key in BaseItem.__slots__:
+            object.__setattr__(self, key, val)
+        else:
+            if self._extra is None:
+                object.__setattr__(self, '_extra', dict())
+            self._extra[key] = val
+
+    def __delattr__(self, key):
+        self.__track(key)
+        if self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            object.__delattr__(self, key)
+
+    def __getstate__(self):
+        state = self._snapshot
+        if type(state) is dict:
+            # Held values are pickled with the fields, only their names with the state
+            state = {key: (_MISSING if type(val) in (list, dict) else val) for key, val in state.items()}
+        return self.to_dict(), state
+
+    def __setstate__(self, state):
+        data, state = state
+        self._load(data)
+        if type(state) is dict:
+            for key, val in state.items():
+                if val is _MISSING and key in self._nested and type(data.get(key)) in (list, dict):
+                    state[key] = data[key]
+                    object.__delattr__(self, key)
+        object.__setattr__(self, '_snapshot', state)
+
     def __contains__(self, key):
-        return key in self.__dict__
+        if key in self._fields:
+            return any(key == k for k, _ in self._set_fields())
+        return self._extra is not None and key in self._extra
 
     def __getitem__(self, key):
-        return self.__getattribute__(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        for key, _ in self._set_fields():
+            yield key
+        if self._extra:
+            yield from self._extra
 
     def __len__(self):
-        return self.__dict__.__len__()
+        return sum(1 for _ in self)
     
     def __repr__(self):
         return f'{self.__class__} (id={id(self)})'
@@ -55,18 +316,17 @@ class Tournament(BaseItem):
     participant_type: str
     platforms: List[str]
 
-    def __init__(self, **kwargs):
-        self.name = None
-        self.timezone = None
-        self.size = None
-        self.discipline = None
-        self.participant_type = 'team' # Currently this use-case for this API wrapper is to 
-                                       # work for team-based tournaments as this guarentees
-                                       # a 'lineup' attribute in the Team object
-        self.platforms = []
-
-        self.__dict__.update(kwargs)
-        super().__init__(**self.__dict__)
+    _defaults = {'name': None,
+                 'timezone': None,
+                 'size': None,
+                 'discipline': None,
+                 'participant_type': 'team', # Currently this use-case for this API wrapper is to 
+                                             # work for team-based tournaments as this guarentees
+                                             # a 'lineup' attribute in the Team object
+                 'platforms': list}
+    _fields = ('id', *_defaults, 'full_name', 'status', 'scheduled_date_start', 
+               'scheduled_date_end', 'public', 'online', 'archived')
+    __slots__ = _fields
 
     def patch_fields(self):
         # As dictated by 
@@ -97,11 +357,12 @@ class Team(BaseItem):
     name: str
     lineup: List[dict]
 
-    def __init__(self, **kwargs):
-        self.name = None
-        self.lineup = []
-        self.__dict__.update(**kwargs)
-        super().__init__(**self.__dict__)
+    _defaults = {'name': None,
+                 'lineup': list}
+    _fields = ('id', *_defaults, 'email', 'custom_user_identifier', 'checked_in', 
+               'custom_fields')
+    __slots__ = _fields
+    _nested = ('lineup', 'custom_fields')
 
     def patch_fields(self):
         # As dictated by
@@ -119,11 +380,21 @@ class Match(BaseItem):
     number: int
     opponents: List[dict]
 
-    def __init__(self, **kwargs):
-        self.number = None
-        self.opponents = []
-        self.__dict__.update(**kwargs)
-        super().__init__(**self.__dict__)
+    _defaults = {'number': None,
+                 'opponents': list}
+    _fields = ('id', *_defaults, 'stage_id', 'group_id', 'round_id', 'type', 'status', 
+               'scheduled_datetime', 'played_at', 'public_note', 'private_note', 
+               'report_closed')
+    __slots__ = _fields
+    _nested = ('opponents',)
+
+    @property
+    def participants(self):
+        '''
+        Team objects of the opponents' participants, only built when asked for
+        '''
+        return [Team.from_dict(team['participant']) for team in self.opponents 
+                if team.get('participant') is not None]
 
     def summary(self, top_n = 3):
         sorted_list = [team for team in self.opponents if team['score'] is not None]
@@ -149,13 +420,21 @@ class Game(BaseItem):
     number: int
     properties: dict
 
-    def __init__(self, **kwargs):
-        self.status = None
-        self.opponents = []
-        self.number = None
-        self.properties = dict()
-        self.__dict__.update(**kwargs)
-        super().__init__(**self.__dict__)
+    _defaults = {'status': None,
+                 'opponents': list,
+                 'number': None,
+                 'properties': dict}
+    _fields = tuple(_defaults)
+    __slots__ = _fields
+    _nested = ('opponents', 'properties')
+
+    @property
+    def participants(self):
+        '''
+        Team objects of the opponents' participants, only built when asked for
+        '''
+        return [Team.from_dict(team['participant']) for team in self.opponents 
+                if team.get('participant') is not None]
 
     def patch_fields(self):
         # As dictated by 
@@ -1,6 +1,42 @@
-__all__ = ["API"]
+__all__ = ["API", "AsyncAPI", "ResponseCache", "JSONCodec", "OrjsonCodec", "RateLimiter", "PageError",
+           "Metrics", "OpenTelemetryHook", "RequestRecord", "Mirror",
+           "Standings", "WebhookReceiver", "WebhookEvent",
+           "Loader", "AsyncLoader", "APIPool", "TournamentTree", "ParticipantIndex",
+           "Hedging", "Query", "Scheduler"]
 
-from ._get import GET
-from ._post import POST
-from ._patch import PATCH
-from .toornament_api import API
+import importlib
+
+# Module each name is imported from on first use, so importing the package
+# does not pull in requests, aiohttp and the rest until they are needed
+_LAZY = {
+    'GET': '._get', 'PageError': '._get',
+    'POST': '._post',
+    'PATCH': '._patch',
+    'BULK': '._bulk',
+    'API': '.toornament_api',
+    'AsyncAPI': '.async_api',
+    'ResponseCache': '._cache',
+    'JSONCodec': '._codec', 'OrjsonCodec': '._codec',
+    'RateLimiter': '._ratelimit',
+    'Metrics': '._metrics', 'OpenTelemetryHook': '._metrics', 'RequestRecord': '._metrics',
+    'Mirror': '._mirror',
+    'Standings': '._standings',
+    'WebhookReceiver': '._webhook', 'WebhookEvent': '._webhook',
+    'Loader': '._loader', 'AsyncLoader': '._loader',
+    'APIPool': '._pool',
+    'TournamentTree': '._tree', 'ParticipantIndex': '._tree',
+    'Hedging': '._hedge',
+    'Query': '._query',
+    'Scheduler': '._scheduler',
+}
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module 'tourny' has no attribute '{name}'")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
@@ -0,0 +1,461 @@
+import asyncio
+from .TournamentItems import Tournament, Team, Match, Game
+from ._get import (MAX_RANGE_LENGTH, check_page, content_range_total, range_request, tournaments_request,
+                   matches_request, games_request, teams_request)
+from ._query import Query
+
+class AsyncGET():
+    """
+    Handle API GET requests for the toornament.com API on an event loop
+    """
+    def __init__(self, api):
+        self._api = api
+
+
+    #####################################
+    #                                   #
+    #             GET BY ID             #
+    #                                   #
+    #####################################
+
+    async def tournament_by_id(self, tournament_id):
+        """
+        Get a tournament by a known id
+        """
+        scope = 'organizer:view'
+        url = "https://api.toornament.com/organizer/v2/tournaments/{tournament_id}"
+        url_kwargs = {'tournament_id': tournament_id}
+        _, data = await self.__get_by_id(scope, url, **url_kwargs)
+        if data is None:
+            return None
+        return Tournament.from_dict(data)
+
+
+    async def team_by_id(self, tournament_id, team_id):
+        """
+        Get a team by a known id
+        """
+        scope = 'organizer:participant'
+        url = "https://api.toornament.com/organizer/v2/tournaments/{tournament_id}/participants/{team_id}"
+        url_kwargs = {'tournament_id': tournament_id,
+                      'team_id': team_id}
+        _, data = await self.__get_by_id(scope, url, **url_kwargs)
+        if data is None:
+            return None
+        return Team.from_dict(data)
+
+
+    async def match_by_id(self, tournament_id, match_id):
+        """
+        Get a match by a known id
+        """
+        scope = 'organizer:result'
+        url = 'https://api.toornament.com/organizer/v2/tournaments/{tournament_id}/matches/{match_id}'
+        url_kwargs = {'tournament_id': tournament_id,
+                      'match_id': match_id}
+        _, data = await self.__get_by_id(scope, url, **url_kwargs)
+        if data is None:
+            return None
+        return Match.from_dict(data)
+
+
+    async def game_by_id(self, tournament_id, match_id, game_number):
+        """
+        Get a game by a known id
+        """
+        scope = 'organizer:result'
+        url = 'https://api.toornament.com/organizer/v2/tournaments/{tournament_id}/matches/{match_id}/games/{game_number}'
+        url_kwargs = {'tournament_id': tournament_id,
+                      'match_id': match_id,
+                      'game_number': game_number}
+        _, data = await self.__get_by_id(scope, url, **url_kwargs)
+        if data is None:
+            return None
+        return Game.from_dict(data)
+
+
+    #####################################
+    #                                   #
+    #           GET BY RANGE            #
+    #                                   #
+    #####################################
+
+    async def tournaments(self, range_values = (0, 49), params=None):
+        """
+        Gets a list of tournaments connected to the account
+        """
+        return await self.__get_page(tournaments_request(), range_values, params=params)
+
+
+    async def matches(self, tournament, range_values = (0, 99), params=None):
+        """
+        Gets a list of matches for a specified tournament
+        """
+        return await self.__get_page(matches_request(tournament), range_values, params=params)
+
+
+    async def games(self, tournament, match, range_values = (0, 49), params=None):
+        """
+        Get a list of games belonging to the specified match in the specified tournament
+        """
+        return await self.__get_page(games_request(tournament, match), range_values, params=params)
+
+
+    async def teams(self, tournament, range_values = (0, 49), params=None):
+        """
+        Gets a list of participants
+        """
+        return await self.__get_page(teams_request(tournament), range_values, params=params)
+
+
+    def query(self, resource, tournament=None, match=None):
+        """
+        Returns a Query of a collection to filter and sort on the server, its
+        all() and page() are awaited and iter() is an async iterator
+        """
+        return Query(self, range_request(resource, tournament, match))
+
+
+    #####################################
+    #                                   #
+    #              GET ALL              #
+    #                                   #
+    #####################################
+
+    async def all_tournaments(self, params=None):
+        """
+        Returns a list of all tournaments
+        """
+        return await self.__get_all(tournaments_request(), params=params)
+
+    async def all_matches(self, tournament, params=None):
+        """
+        Returns a list of all matches for a given tournament
+        """
+        return await self.__get_all(matches_request(tournament), params=params)
+
+    async def all_games(self, tournament, match, params=None):
+        """
+        Returns a list of all games for a match in a given tournament
+        """
+        return await self.__get_all(games_request(tournament, match), params=params)
+
+    async def all_teams(self, tournament, params=None):
+        """
+        Returns a list of all participants in a given tournament.
+        """
+        return await self.__get_all(teams_request(tournament), params=params)
+
+
+    #####################################
+    #                                   #
+    #              ITERATE              #
+    #                                   #
+    #####################################
+
+    def iter_tournaments(self, params=None):
+        """
+        Yields every tournament, one page at a time
+        """
+        return self.__iter_all(tournaments_request(), params=params)
+
+    def iter_matches(self, tournament, params=None):
+        """
+        Yields every match for a given tournament, one page at a time
+        """
+        return self.__iter_all(matches_request(tournament), params=params)
+
+    def iter_games(self, tournament, match, params=None):
+        """
+        Yields every game for a match in a given tournament, one page at a time
+        """
+        return self.__iter_all(games_request(tournament, match), params=params)
+
+    def iter_teams(self, tournament, params=None):
+        """
+        Yields every participant in a given tournament, one page at a time
+        """
+        return self.__iter_all(teams_request(tournament), params=params)
+
+
+    #####################################
+    #                                   #
+    #          CLASS UTILITIES          #
+    #                                   #
+    #####################################
+
+    def _run(self, query, mode, range_values=None):
+        """
+        Fetches what a Query asks for: 'all' items, an 'iter'ator or one 'page'
+        """
+        if mode == 'all':
+            return self.__get_all(query.request, params=query.params)
+        if mode == 'iter':
+            return self.__iter_all(query.request, params=query.params)
+        if range_values is None:
+            range_values = (0, MAX_RANGE_LENGTH.get(query.request.range_unit, 50) - 1)
+        return self.__get_page(query.request, range_values, params=query.params, strict=True)
+
+    async def __get_by_id(self, scope, url, params=None, **url_kwargs):
+        """
+        Generalized coroutine for getting specified objects by their id
+        """
+        data = None
+
+        status, body, _ = await self._api.request("GET", scope, url.format(**url_kwargs), params=params,
+                                                  endpoint=url)
+
+        if status in (200, 206, 416):
+            data = self._api.codec.loads(body)
+
+        return status, data
+
+
+    async def __get_by_range(self, range_values, request, params=None):
+        """
+        Generalized coroutine for getting a collection of specified objects.
+
+        Returns the status code, the decoded page and the total size of the
+        collection as reported by the Content-Range header (None if unknown).
+        """
+        data = None
+        total = None
+
+        headers = {
+            'range': f"{request.range_unit}={range_values[0]}-{range_values[1]}"
+        }
+        status, body, response_headers = await self._api.request("GET", request.scope,
+                                                                 request.url.format(**request.url_kwargs),
+                                                                 headers=headers, params=params,
+                                                                 endpoint=request.url)
+
+        if status in (200, 206, 416):
+            total = content_range_total(response_headers.get('content-range'))
+        if status in (200, 206):
+            data = self._api.codec.loads(body)
+
+        return status, data, total
+
+    async def __get_page(self, request, range_values, params=None, strict=False):
+        """
+        Gets one page of a collection and converts it into item objects.
+
+        When strict, a page that could not be fetched raises a PageError
+        instead of returning None (a range past the end still returns None).
+        """
+        status, data, total = await self.__get_by_range(range_values, request, params=params)
+        if data is None:
+            if strict:
+                check_page(status, request, range_values, total)
+            return None
+        return [request.item_class.from_dict(d) for d in data]
+
+    async def __get_all(self, request, params=None):
+        """
+        Generalized coroutine for getting all instances of specified objects.
+
+        The first page reports the size of the collection, the remaining pages
+        are then requested concurrently and reassembled in order.
+        """
+        page_length = MAX_RANGE_LENGTH.get(request.range_unit, 50)
+
+        status, first_page, total = await self.__get_by_range((0, page_length - 1), request, params=params)
+        if first_page is None:
+            check_page(status, request, (0, page_length - 1), total)
+            return []
+
+        data = [request.item_class.from_dict(d) for d in first_page]
+
+        if total is None:
+            # No Content-Range to go by, walk the pages until one comes back short
+            current_range = (0, page_length - 1)
+            response_data = data
+            while response_data is not None and len(response_data) == page_length:
+                current_range = tuple((v+page_length for v in current_range))
+                response_data = await self.__get_page(request, current_range, params=params, strict=True)
+                data += response_data or []
+            return data
+
+        if len(data) >= total:
+            return data
+        if len(data) < page_length:
+            # The server capped the range below what was asked for
+            page_length = max(1, len(data))
+
+        ranges = [(start, min(start + page_length, total) - 1)
+                  for start in range(len(data), total, page_length)]
+
+        semaphore = asyncio.Semaphore(max(1, self._api.max_workers))
+
+        async def get_page(range_values):
+            async with semaphore:
+                return await self.__get_page(request, range_values, params=params, strict=True)
+
+        for page in await asyncio.gather(*(get_page(r) for r in ranges)):
+            data += page or []
+
+        return data
+
+    async def __iter_all(self, request, params=None):
+        """
+        Generalized async generator for streaming all instances of specified objects.
+
+        The next page is requested as a background task while the items of the
+        current one are being consumed, so at most two pages are held at once.
+        """
+        page_length = MAX_RANGE_LENGTH.get(request.range_unit, 50)
+
+        def get_range(start):
+            range_values = (start, start + page_length - 1)
+            return asyncio.ensure_future(self.__get_by_range(range_values, request, params=params))
+
+        start = 0
+        next_page = get_range(start)
+        try:
+            while next_page is not None:
+                status, page, total = await next_page
+                if not page:
+                    check_page(status, request, (start, start + page_length - 1), total)
+                    return
+
+                start += len(page)
+                if total is None:
+                    more = len(page) == page_length
+                else:
+                    more = start < total
+                    if more and len(page) < page_length:
+                        # The server capped the range below what was asked for
+                        page_length = len(page)
+
+                next_page = get_range(start) if more else None
+                for d in page:
+                    yield request.item_class.from_dict(d)
+        finally:
+            if next_page is not None and not next_page.done():
+                next_page.cancel()
+
+
+
+class AsyncPOST():
+    """
+    Handle API POST requests for the toornament.com API on an event loop
+    """
+    def __init__(self, api):
+        self._api = api
+
+    async def tournament(self, tournament):
+        """
+        Posts in a tournament object
+        """
+        scope = 'organizer:admin'
+        url = "https://api.toornament.com/organizer/v2/tournaments"
+        url_kwargs = {}
+        return await self.__post(tournament.dumps(codec=self._api.codec), scope, url, **url_kwargs)
+
+    async def team(self, tournament, team):
+        """
+        Posts in a team object
+        """
+        scope = 'organizer:participant'
+        url = "https://api.toornament.com/organizer/v2/tournaments/{tournament_id}/participants"
+        url_kwargs = {'tournament_id': tournament.id}
+        return await self.__post(team.dumps(codec=self._api.codec), scope, url, **url_kwargs)
+
+
+    async def __post(self, data, scope, url, **url_kwargs):
+        """
+        Generalized coroutine for sending POST requests, returns the status code and body
+        """
+        status, body, _ = await self._api.request("POST", scope, url.format(**url_kwargs), data=data,
+                                                  endpoint=url)
+        return status, body
+
+
+
+class AsyncPATCH():
+    """
+    Handle API PATCH requests for the toornament.com API on an event loop
+
+    Only the fields changed since an object was loaded are sent, unless
+    only_changed is False. Nothing is sent for an unchanged object.
+    Listeners are called after a successful PATCH as they are by PATCH.
+    """
+    def __init__(self, api):
+        self._api = api
+        self.listeners = []
+
+
+    async def tournament(self, tournament, only_changed=True):
+        """
+        Patches in a tournament object
+        """
+        scope = 'organizer:admin'
+        url = "https://api.toornament.com/organizer/v2/tournaments/{id}"
+        url_kwargs = {'id': tournament.id}
+        return await self.__patch(tournament, scope, url, only_changed, (tournament, None), **url_kwargs)
+
+
+    async def team(self, tournament, team, only_changed=True):
+        """
+        Patches in a team object
+        """
+        scope = 'organizer:participant'
+        url = 'https://api.toornament.com/organizer/v2/tournaments/{tournament_id}/participants/{id}'
+        url_kwargs = {'tournament_id': tournament.id,
+                      'id': team.id}
+        return await self.__patch(team, scope, url, only_changed, (tournament, None), **url_kwargs)
+
+
+    async def match(self, tournament, match, only_changed=True):
+        """
+        Patches in a match object
+        """
+        scope = 'organizer:result'
+        url = 'https://api.toornament.com/organizer/v2/tournaments/{tournament_id}/matches/{id}'
+        url_kwargs = {'tournament_id': tournament.id,
+                      'id': match.id}
+        return await self.__patch(match, scope, url, only_changed, (tournament, None), **url_kwargs)
+
+
+    async def game(self, tournament, match, game, only_changed=True):
+        """
+        Patches in a game object
+        """
+        scope = 'organizer:result'
+        url = 'https://api.toornament.com/organizer/v2/tournaments/{tournament_id}/matches/{match_id}/games/{number}'
+        url_kwargs = {'tournament_id': tournament.id,
+                      'match_id': match.id,
+                      'number': game.number}
+        return await self.__patch(game, scope, url, only_changed, (tournament, match), **url_kwargs)
+
+
+    async def __patch(self, item, scope, url, only_changed=True, parents=(None, None), **url_kwargs):
+        """
+        Generalized coroutine for sending PATCH requests, returns the status code and body
+
+        Returns None when there was nothing to send.
+        """
+        fields = item.changed_fields() if only_changed else item.patch_fields()
+        if not fields:
+            return None
+        data = item.dumps(whitelist=fields, codec=self._api.codec)
+
+        status, body, _ = await self._api.request("PATCH", scope, url.format(**url_kwargs), data=data,
+                                                  endpoint=url)
+        if status in (200, 204):
+            item.mark_clean(fields)
+            if self.listeners:
+                self.__notify(item, status, body, parents)
+        return status, body
+
+    def __notify(self, item, status, body, parents):
+        """
+        Passes the patched object to every listener
+        """
+        if status == 200 and body:
+            data = self._api.codec.loads(body)
+            if isinstance(data, dict):
+                item = item.__class__.from_dict(data)
+        tournament, match = parents
+        for listener in self.listeners:
+            listener(item, tournament=tournament, match=match)
@@ -0,0 +1,243 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # Not on Windows, where the cache file is only replaced atomically
+    fcntl = None
+
+class _TokenStore():
+    """
+    Tokens per scope with their expiry, optionally persisted to a local file
+    """
+    def __init__(self, refresh_margin=60, cache_file=None, bundle=None):
+        # Tokens are renewed this many seconds before they expire
+        self.refresh_margin = refresh_margin
+        self.cache_file = cache_file
+        # Scopes that are always requested together, in a single token call
+        self.bundle = list(bundle or [])
+        self.cache_key = None
+        self._tokens = dict()
+        self._loaded = False
+
+    def current(self, scope):
+        """
+        Returns the token for a scope if it is still comfortably valid, otherwise None
+        """
+        entry = self._tokens.get(scope)
+        if entry is None:
+            return None
+        token, expires_at = entry
+        if expires_at is not None and expires_at - self.refresh_margin <= time.time():
+            return None
+        return token
+
+    def tokens(self):
+        """
+        Returns a dict of every scope and its token (None if there is none)
+        """
+        return {scope: entry[0] for scope, entry in self._tokens.items()}
+
+    def scopes_for(self, scope):
+        """
+        Returns the scopes to request when a token for 'scope' is needed
+        """
+        if scope in self.bundle:
+            return [s for s in self.bundle if s == scope or self.current(s) is None]
+        return [scope]
+
+    def lock_key(self, scope):
+        """
+        Returns the key of the lock refreshes of a scope share, one for the whole bundle
+        """
+        return tuple(self.bundle) if scope in self.bundle else scope
+
+    def store(self, data, requested):
+        """
+        Stores the token from a token endpoint response for every scope it was granted
+        """
+        granted = data.get('scope', ' '.join(requested)).split()
+        expires_in = data.get('expires_in')
+        expires_at = time.time() + float(expires_in) if expires_in is not None else None
+        for scope in granted:
+            self._tokens[scope] = (data['access_token'], expires_at)
+
+    def discard(self, scope, token):
+        """
+        Forgets a rejected token, unless it has already been replaced
+        """
+        entry = self._tokens.get(scope)
+        if entry is not None and entry[0] == token:
+            del self._tokens[scope]
+
+    def _load(self):
+        self._merge(self._read())
+
+    def _read(self):
+        """
+        Returns the cached tokens of this client from the cache file
+        """
+        self._loaded = True
+        if self.cache_file is None:
+            return {}
+        try:
+            with open(self.cache_file) as loadfile:
+                return json.load(loadfile).get(self.cache_key, {})
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _merge(self, cached):
+        for scope, (token, expires_at) in cached.items():
+            self._tokens.setdefault(scope, (token, expires_at))
+
+    def _entries(self):
+        return {scope: list(entry) for scope, entry in self._tokens.items()}
+
+    def _save(self):
+        if self.cache_file is not None:
+            self._write(self._entries())
+
+    def _write(self, entries):
+        """
+        Stores the tokens of this client in the cache file, readable by its owner only.
+
+        Tokens other processes stored meanwhile are kept, the file is locked
+        while it is read and written back.
+        """
+        with _locked(self.cache_file):
+            try:
+                with open(self.cache_file) as loadfile:
+                    cached = json.load(loadfile)
+            except (FileNotFoundError, ValueError):
+                cached = dict()
+            cached.setdefault(self.cache_key, {}).update(entries)
+
+            # Write then rename so concurrent processes never read a partial file
+            temp_file = f"{self.cache_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+            descriptor = os.open(temp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with open(descriptor, 'w') as savefile:
+                json.dump(cached, savefile)
+            os.replace(temp_file, self.cache_file)
+
+
+@contextmanager
+def _locked(path):
+    """
+    Holds an exclusive lock on a file for its read-modify-write, across processes
+    """
+    if fcntl is None:
+        yield
+        return
+    descriptor = os.open(f"{path}.lock", os.O_WRONLY | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(descriptor, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(descriptor)
+
+
+
+class TokenManager(_TokenStore):
+    """
+    Thread-safe OAuth token manager.
+
+    Tokens are refreshed before they expire, and concurrent refreshes of the
+    same scope, or of scopes of the same bundle, share a single token request.
+    """
+    def __init__(self, request_token, refresh_margin=60, cache_file=None, bundle=None):
+        super().__init__(refresh_margin=refresh_margin, cache_file=cache_file, bundle=bundle)
+        # Callable taking a list of scopes and returning (status code, response data)
+        self._request_token = request_token
+        self._lock = threading.Lock()
+        self._scope_locks = dict()
+
+    def token(self, scope, rejected=None):
+        """
+        Returns a valid token for a scope, requesting a new one only when needed.
+
+        'rejected' is a token the server refused; it is replaced unless another
+        thread has already done so.
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            if rejected is not None:
+                self.discard(scope, rejected)
+            token = self.current(scope)
+            if token is not None:
+                return token
+            scope_lock = self._scope_locks.setdefault(self.lock_key(scope), threading.Lock())
+
+        with scope_lock:
+            # Another thread may have refreshed the token while we waited
+            token = self.current(scope)
+            if token is None:
+                self.refresh(self.scopes_for(scope))
+                token = self.current(scope)
+            return token
+
+    def refresh(self, scopes):
+        """
+        Requests one token for all the given scopes, returns the status code
+        """
+        status, data = self._request_token(scopes)
+        if status == 200:
+            with self._lock:
+                self.store(data, scopes)
+                self._save()
+        return status
+
+
+
+class AsyncTokenManager(_TokenStore):
+    """
+    OAuth token manager for the event loop.
+
+    Tokens are refreshed before they expire, and concurrent refreshes of the
+    same scope, or of scopes of the same bundle, share a single token request.
+    """
+    def __init__(self, request_token, refresh_margin=60, cache_file=None, bundle=None):
+        super().__init__(refresh_margin=refresh_margin, cache_file=cache_file, bundle=bundle)
+        # Coroutine function taking a list of scopes and returning (status code, response data)
+        self._request_token = request_token
+        self._scope_locks = dict()
+
+    async def token(self, scope, rejected=None):
+        """
+        Returns a valid token for a scope, requesting a new one only when needed.
+
+        'rejected' is a token the server refused; it is replaced unless another
+        task has already done so.
+        """
+        if not self._loaded:
+            # File access stays off the event loop
+            self._merge(await asyncio.get_running_loop().run_in_executor(None, self._read))
+        if rejected is not None:
+            self.discard(scope, rejected)
+        token = self.current(scope)
+        if token is not None:
+            return token
+
+        async with self._scope_locks.setdefault(self.lock_key(scope), asyncio.Lock()):
+            # Another task may have refreshed the token while we waited
+            token = self.current(scope)
+            if token is None:
+                await self.refresh(self.scopes_for(scope))
+                token = self.current(scope)
+            return token
+
+    async def refresh(self, scopes):
+        """
+        Requests one token for all the given scopes, returns the status code
+        """
+        status, data = await self._request_token(scopes)
+        if status == 200:
+            self.store(data, scopes)
+            if self.cache_file is not None:
+                await asyncio.get_running_loop().run_in_executor(None, self._write, self._entries())
+        return status
@@ -0,0 +1,165 @@
+from collections import namedtuple, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from ._scheduler import carry_priority
+
+class BulkResult(namedtuple('BulkResult', ['item', 'status', 'data', 'error', 'attempts', 'sent'])):
+    """
+    Outcome of writing a single item, 'sent' lists the fields a PATCH sent
+    """
+    __slots__ = ()
+
+    @property
+    def skipped(self):
+        '''
+        Whether nothing was sent because the item had no changes
+        '''
+        return self.error is None and self.status is None
+
+    @property
+    def ok(self):
+        return self.skipped or (self.error is None and 200 <= self.status < 300)
+
+
+
+class BulkReport():
+    """
+    Results of a bulk write, in the order the items were given
+    """
+    def __init__(self, results):
+        self.results = results
+
+    @property
+    def succeeded(self):
+        return [r for r in self.results if r.ok]
+
+    @property
+    def failed(self):
+        return [r for r in self.results if not r.ok]
+
+    @property
+    def skipped(self):
+        return [r for r in self.results if r.skipped]
+
+    @property
+    def ok(self):
+        return all(r.ok for r in self.results)
+
+    def __iter__(self):
+        return iter(self.results)
+
+    def __len__(self):
+        return len(self.results)
+
+    def __getitem__(self, index):
+        return self.results[index]
+
+    def __repr__(self):
+        return (f"BulkReport ({len(self.succeeded) - len(self.skipped)} succeeded, "
+                f"{len(self.skipped)} skipped, {len(self.failed)} failed)")
+
+
+
+class BULK():
+    """
+    Send many POST and PATCH requests concurrently for the toornament.com API.
+
+    Writes to the same object are sent one after another in the order they were
+    given, writes to different objects run in parallel. Throttled and failed
+    requests are retried by the API's rate limiter.
+    """
+    def __init__(self, api, concurrency=8):
+        self._api = api
+        # Most requests in flight at once
+        self.concurrency = concurrency
+
+
+    def patch_matches(self, tournament, matches, concurrency=None):
+        """
+        Patches in a list of match objects
+        """
+        jobs = [(('match', tournament.id, m.id), m, lambda m=m: self._api.patch.match(tournament, m))
+                for m in matches]
+        return self.run(jobs, concurrency=concurrency)
+
+
+    def patch_games(self, tournament, match, games, concurrency=None):
+        """
+        Patches in a list of game objects belonging to a match
+        """
+        jobs = [(('game', tournament.id, match.id, g.number), g, lambda g=g: self._api.patch.game(tournament, match, g))
+                for g in games]
+        return self.run(jobs, concurrency=concurrency)
+
+
+    def patch_teams(self, tournament, teams, concurrency=None):
+        """
+        Patches in a list of team objects
+        """
+        jobs = [(('team', tournament.id, t.id), t, lambda t=t: self._api.patch.team(tournament, t))
+                for t in teams]
+        return self.run(jobs, concurrency=concurrency)
+
+
+    def post_teams(self, tournament, teams, concurrency=None):
+        """
+        Posts in a list of team objects
+        """
+        # New teams have no id yet, each one is its own resource
+        jobs = [(('new team', id(t)), t, lambda t=t: self._api.post.team(tournament, t))
+                for t in teams]
+        return self.run(jobs, concurrency=concurrency)
+
+
+    def run(self, jobs, concurrency=None):
+        """
+        Runs (resource key, item, send function) jobs and returns a BulkReport.
+
+        Jobs sharing a resource key are sent sequentially in the given order.
+        """
+        results = [None] * len(jobs)
+
+        queues = OrderedDict()
+        for index, (key, item, send) in enumerate(jobs):
+            queues.setdefault(key, []).append((index, item, send))
+
+        @carry_priority
+        def run_queue(queue):
+            for index, item, send in queue:
+                results[index] = self.__send(item, send)
+
+        workers = max(1, min(concurrency or self.concurrency, len(queues)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for future in [executor.submit(run_queue, queue) for queue in queues.values()]:
+                future.result()
+
+        return BulkReport(results)
+
+
+    def __send(self, item, send):
+        """
+        Sends one request, transient failures are retried by the API's rate limiter
+        """
+        try:
+            response = send()
+        except requests.RequestException as e:
+            return BulkResult(item, None, None, str(e), getattr(e, 'attempts', 1), None)
+
+        if response is None:
+            # A PATCH with nothing to send
+            return BulkResult(item, None, None, None, 0, [])
+
+        status = response.status_code
+        error = None if 200 <= status < 300 else f"HTTP {status}"
+
+        data = None
+        if response.content:
+            try:
+                data = self._api.codec.loads(response.content)
+            except ValueError:
+                data = None
+
+        return BulkResult(item, status, data, error, getattr(response, 'attempts', 1),
+                          getattr(response, 'sent_fields', None))
@@ -0,0 +1,127 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+# Seconds a cached response is served without asking the server again
+DEFAULT_TTL = {
+    'tournament': 300,
+    'team': 60,
+    'match': 10,
+    'game': 10,
+}
+
+CacheEntry = namedtuple('CacheEntry', ['body', 'etag', 'last_modified', 'expires_at'])
+
+class ResponseCache():
+    """
+    In-memory cache for responses of by-id lookups.
+
+    Entries live for a per-resource TTL, after which they are revalidated with
+    a conditional request when the server gave an ETag or Last-Modified. The
+    least recently used entries are evicted once max_bytes is exceeded.
+    """
+    def __init__(self, ttl=None, max_bytes=32 * 1024 * 1024):
+        self.ttl = dict(DEFAULT_TTL)
+        self.ttl.update(ttl or {})
+        self.max_bytes = max_bytes
+
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """
+        Returns (entry, fresh) for a key, entry is None if nothing is cached
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, False
+            self._entries.move_to_end(key)
+            if entry.expires_at > time.monotonic():
+                self.hits += 1
+                return entry, True
+            return entry, False
+
+    def validators(self, entry):
+        """
+        Returns the headers making a conditional request for a stale entry
+        """
+        headers = dict()
+        if entry is not None:
+            if entry.etag is not None:
+                headers['if-none-match'] = entry.etag
+            if entry.last_modified is not None:
+                headers['if-modified-since'] = entry.last_modified
+        return headers
+
+    def store(self, key, resource, body, headers):
+        """
+        Caches a response body, evicting old entries if needed
+        """
+        entry = CacheEntry(body, headers.get('etag'), headers.get('last-modified'),
+                           time.monotonic() + self.ttl.get(resource, 0))
+        with self._lock:
+            if self.__remove(key):
+                # A stale entry the server sent a new version of
+                self.misses += 1
+            if len(body) > self.max_bytes:
+                return
+            self._entries[key] = entry
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.body)
+                self.evictions += 1
+
+    def revalidate(self, key, resource, entry):
+        """
+        Marks a stale entry fresh again after the server answered 304 Not Modified
+        """
+        with self._lock:
+            self.revalidations += 1
+            if key in self._entries:
+                self._entries[key] = entry._replace(expires_at=time.monotonic() + self.ttl.get(resource, 0))
+                self._entries.move_to_end(key)
+
+    def invalidate(self, key):
+        """
+        Drops the entry for a key, e.g. after the resource was modified
+        """
+        with self._lock:
+            if self.__remove(key):
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        """
+        Returns a dict of hit/miss statistics and the current size of the cache
+        """
+        with self._lock:
+            lookups = self.hits + self.misses + self.revalidations
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'revalidations': self.revalidations,
+                    'evictions': self.evictions,
+                    'invalidations': self.invalidations,
+                    'entries': len(self._entries),
+                    'bytes': self._size,
+                    'hit_rate': (self.hits + self.revalidations) / lookups if lookups else 0.0}
+
+    def __remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._size -= len(entry.body)
+        return True
@@ -0,0 +1,55 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class JSONCodec():
+    """
+    Encodes and decodes JSON with the standard library
+    """
+    name = 'json'
+
+    def loads(self, data):
+        '''
+        Parses JSON from bytes (or str)
+        '''
+        return json.loads(data)
+
+    def dumps(self, obj):
+        '''
+        Serializes an object to UTF-8 encoded JSON bytes
+        '''
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+
+class OrjsonCodec():
+    """
+    Encodes and decodes JSON with orjson, parsing straight from the response bytes
+    """
+    name = 'orjson'
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError("OrjsonCodec requires orjson, install it with 'pip install orjson'")
+
+    def loads(self, data):
+        '''
+        Parses JSON from bytes (or str)
+        '''
+        return orjson.loads(data)
+
+    def dumps(self, obj):
+        '''
+        Serializes an object to UTF-8 encoded JSON bytes
+        '''
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+
+def default_codec():
+    """
+    Returns the fastest codec available, orjson when it is installed
+    """
+    return OrjsonCodec() if orjson is not None else JSONCodec()
@@ -1,5 +1,23 @@
-import json
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from .TournamentItems import Tournament, Team, Match, Game
+from ._tree import ParticipantIndex, TournamentTree, NO_GAMES_STATUSES
+from ._query import Query
+from ._stream import ArrayStream
+from ._scheduler import carry_priority
+
+# Largest range each collection accepts in a single request,
+# https://developer.toornament.com/v2/overview/pagination
+MAX_RANGE_LENGTH = {
+    'tournaments': 50,
+    'matches': 100,
+    'games': 50,
+    'participants': 50,
+}
+
+# Everything needed to request a page of a collection
+RangeRequest = namedtuple('RangeRequest', ['item_class', 'range_unit', 'scope', 'url', 'url_kwargs'])
 
 class GET():
     """
@@ -24,11 +42,11 @@ class GET():
         """
         scope = 'organizer:view'
         url = "https://api.toornament.com/organizer/v2/tournaments/{tournament_id}"
-        url_kwargs = {'tournament_id': id}
-        _, data = self.__get_by_id(scope, url, **url_kwargs)
-        if data is not None:
+        url_kwargs = {'tournament_id': tournament_id}
+        _, data = self.__get_by_id('tournament', scope, url, **url_kwargs)
+        if data is None:
             return None
-        return Tournament(**data)
+        return Tournament.from_dict(data)
         
 
     def team_by_id(self, tournament_id, team_id):
@@ -39,10 +57,10 @@ class GET():
         url = "https://api.toornament.com/organizer/v2/tournaments/{tournament_id}/participants/{team_id}"
         url_kwargs = {'tournament_id': tournament_id,
                       'team_id': team_id}
-        _, data = self.__get_by_id(scope, url, **url_kwargs)
+        _, data = self.__get_by_id('team', scope, url, **url_kwargs)
         if data is None:
             return None
-        return Team(**data)
+        return Team.from_dict(data)
 
 
     def match_by_id(self, tournament_id, match_id):
@@ -53,10 +71,10 @@ class GET():
         url = 'https://api.toornament.com/organizer/v2/tournaments/{tournament_id}/matches/{match_id}'
         url_kwargs = {'tournament_id': tournament_id,
                       'match_id': match_id}
-        _, data = self.__get_by_id(scope, url, **url_kwargs)
+        _, data = self.__get_by_id('match', scope, url, **url_kwargs)
         if data is None:
             return None
-        return Match(**data)
+        return Match.from_dict(data)
 
 
     def game_by_id(self, tournament_id, match_id, game_number):
@@ -68,10 +86,10 @@ class GET():
         url_kwargs = {'tournament_id': tournament_id,
                       'match_id': match_id,
                       'game_number': game_number}
-        _, data = self.__get_by_id(scope, url, **url_kwargs)
+        _, data = self.__get_by_id('game', scope, url, **url_kwargs)
         if data is None:
             return None
-        return Game(**data)
+        return Game.from_dict(data)
 
 
 
@@ -82,65 +100,45 @@ class GET():
     #####################################
 
     
-    def tournaments(self, range_values = (0, 49), params=dict()):
+    def tournaments(self, range_values = (0, 49), params=None):
         """
         Gets a list of tournaments connected to the account
         """
-        scope = 'organizer:view'
-        range_unit = 'tournaments'
-        url = "https://api.toornament.com/organizer/v2/tournaments"
-        url_kwargs = dict()
-        
-        _, data = self.__get_by_range(range_values, range_unit, scope, url, params=params, **url_kwargs)
-        if data is None:
-            return None
-        return [Tournament(**t) for t in data]
+        return self.__get_page(tournaments_request(), range_values, params=params)
 
 
-    def matches(self, tournament, range_values = (0, 99), params=dict()):
+    def matches(self, tournament, range_values = (0, 99), params=None):
         """
         Gets a list of matches for a specified tournament
         """
-        scope = 'organizer:result'
-        range_unit = 'matches'
-        url = "https://api.toornament.com/organizer/v2/tournaments/{tournament_id}/matches"
-        url_kwargs = {'tournament_id': tournament.id}
-
-        _, data = self.__get_by_range(range_values, range_unit, scope, url, params=params, **url_kwargs)
-        if data is None:
-            return None
-        return [Match(**m) for m in data]
+        return self.__get_page(matches_request(tournament), range_values, params=params)
 
 
-    def games(self, tournament, match, range_values = (0, 49), params=dict()):
+    def games(self, tournament, match, range_values = (0, 49), params=None):
         """
         Get a list of games belonging to the specified match in the specified tournament
         """
-        scope = 'organizer:result'
-        range_unit = 'games'
-        url = 'https://api.toornament.com/organizer/v2/tournaments/{tournament_id}/matches/{match_id}/games'
-        url_kwargs = {'tournament_id': tournament.id,
-                      'match_id': match.id}
-
-        _, data = self.__get_by_range(range_values, range_unit, scope, url, params=params, **url_kwargs)
-        if data is None:
-            return None
-        return [Game(**g) for g in data]
+        return self.__get_page(games_request(tournament, match), range_values, params=params)
         
 
-    def teams(self, tournament, range_values = (0, 49), params=dict()):
+    def teams(self, tournament, range_values = (0, 49), params=None):
         """
         Gets a list of participants
         """
-        scope = 'organizer:participant'
-        range_unit = 'participants'
-        url = "https://api.toornament.com/organizer/v2/tournaments/{tournament_id}/participants"
-        url_kwargs = {'tournament_id': tournament.id}
+        return self.__get_page(teams_request(tournament), range_values, params=params)
+
 
-        _, data = self.__get_by_range(range_values, range_unit, scope, url, params=params, **url_kwargs)
-        if data is None:
-            return None
-        return [Team(**t) for t in data]
+
+    def query(self, resource, tournament=None, match=None):
+        """
+        Returns a Query of 'tournaments', the 'matches' or 'teams' of a
+        tournament or the 'games' of one of its matches, to filter and sort
+        on the server.
+
+        matches() and the other page methods keep returning a list of items,
+        so queries start here: api.get.query('matches', tournament).where(...)
+        """
+        return Query(self, range_request(resource, tournament, match))
 
 
 
@@ -150,29 +148,122 @@ class GET():
     #                                   #
     #####################################
 
-    def all_tournaments(self, params=dict()):
+    def all_tournaments(self, params=None):
         """
         Returns a list of all tournaments
         """
-        return self.__get_all(self.tournaments, params=params)
+        return self.__get_all(tournaments_request(), params=params)
 
-    def all_matches(self, tournament, params=dict()):
+    def all_matches(self, tournament, params=None, index=None):
         """
-        Returns a list of all matches for a given tournament
+        Returns a list of all matches for a given tournament.
+
+        Given a ParticipantIndex, the opponents of every page are interned as it arrives.
         """
-        return self.__get_all(self.matches, tournament, params=params)
+        return self.__get_all(matches_request(tournament), params=params, on_page=_interning(index))
 
-    def all_games(self, tournament, match, params=dict()):
+    def all_games(self, tournament, match, params=None, index=None):
         """
         Returns a list of all games for a match in a given tournament
         """
-        return self.__get_all(self.games, tournament, match, params=params())
+        return self.__get_all(games_request(tournament, match), params=params, on_page=_interning(index))
 
-    def all_teams(self, tournament, params=dict()):
+    def all_teams(self, tournament, params=None, index=None):
         """
         Returns a list of all participants in a given tournament.
         """
-        return self.__get_all(self.teams, tournament, params=params)
+        return self.__get_all(teams_request(tournament), params=params, on_page=_interning(index, teams=True))
+
+
+    def tournament_tree(self, tournament_id, games=True, progress=None):
+        """
+        Returns a TournamentTree of a tournament, its participants, matches and their games.
+
+        Participants and matches are fetched at the same time, then the games
+        of every match that may have some, max_workers matches at a time.
+        Opponents share one participant dict per participant as pages come in.
+        progress is called as progress(step, done, total) with step
+        'participants', 'matches' or 'games' (total is None until known).
+        """
+        tournament = Tournament(id=tournament_id)
+        index = ParticipantIndex()
+        lock = threading.Lock()
+        counts = {'participants': 0, 'matches': 0, 'games': 0}
+
+        def report(step, count, total):
+            if progress is None:
+                return
+            with lock:
+                counts[step] += count
+                done = counts[step]
+            progress(step, done, total)
+
+        def on_teams(page, total):
+            for team in page:
+                index.add_team(team)
+            report('participants', len(page), total)
+
+        def on_matches(page, total):
+            for match in page:
+                index.intern(match)
+            report('matches', len(page), total)
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            tournament_future = executor.submit(carry_priority(self.tournament_by_id), tournament_id)
+            teams_future = executor.submit(carry_priority(self.__get_all), teams_request(tournament),
+                                           on_page=on_teams)
+            matches = self.__get_all(matches_request(tournament), on_page=on_matches)
+            teams = teams_future.result()
+            tournament = tournament_future.result() or tournament
+
+        games_by_match = dict()
+        if games:
+            with_games = [m for m in matches if getattr(m, 'status', None) not in NO_GAMES_STATUSES]
+
+            def match_games(match):
+                match_games = self.all_games(tournament, match)
+                for game in match_games:
+                    index.intern(game)
+                report('games', 1, len(with_games))
+                return match_games
+
+            workers = max(1, min(self._api.max_workers, len(with_games)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                games_by_match = dict(zip((m.id for m in with_games), executor.map(carry_priority(match_games), with_games)))
+
+        return TournamentTree(tournament, {team.id: team for team in teams}, matches, games_by_match, index)
+
+
+    #####################################
+    #                                   #
+    #              ITERATE              #
+    #                                   #
+    #####################################
+
+    def iter_tournaments(self, params=None):
+        """
+        Yields every tournament, one page at a time
+        """
+        return self.__iter_all(tournaments_request(), params=params)
+
+    def iter_matches(self, tournament, params=None, index=None):
+        """
+        Yields every match for a given tournament, one page at a time,
+        interned by a ParticipantIndex when one is given
+        """
+        return _interned(self.__iter_all(matches_request(tournament), params=params), index)
+
+    def iter_games(self, tournament, match, params=None, index=None):
+        """
+        Yields every game for a match in a given tournament, one page at a time
+        """
+        return _interned(self.__iter_all(games_request(tournament, match), params=params), index)
+
+    def iter_teams(self, tournament, params=None, index=None):
+        """
+        Yields every participant in a given tournament, one page at a time
+        """
+        return _interned(self.__iter_all(teams_request(tournament), params=params), index, teams=True)
 
 
     #####################################
@@ -181,67 +272,352 @@ class GET():
     #                                   #
     #####################################
 
+    def _run(self, query, mode, range_values=None):
+        """
+        Fetches what a Query asks for: 'all' items, an 'iter'ator or one 'page'
+        """
+        if mode == 'all':
+            return self.__get_all(query.request, params=query.params)
+        if mode == 'iter':
+            return self.__iter_all(query.request, params=query.params)
+        if range_values is None:
+            range_values = (0, MAX_RANGE_LENGTH.get(query.request.range_unit, 50) - 1)
+        return self.__get_page(query.request, range_values, params=query.params, strict=True)
+
 
-    def __get_by_id(self, scope, url, params=dict(), **url_kwargs):
+    def __get_by_id(self, resource, scope, url, params=None, **url_kwargs):
         """
         Generalized function for getting specified objects by their id
+
+        When the API has a response cache, fresh entries are served without a
+        request and stale ones are revalidated with a conditional request.
         """
         data = None
+        endpoint, url = url, url.format(**url_kwargs)
+
+        cache = self._api.cache if not params else None
+        entry = None
+        headers = dict()
+        if cache is not None:
+            entry, fresh = cache.get(url)
+            if fresh:
+                return 200, self._api.codec.loads(entry.body)
+            headers = cache.validators(entry)
         
-        if self._api.auth_tokens[scope] is None:
-            self._api.get_auth_token(scope)
+        response = self._api._request("GET", scope, url, data="", headers=headers, params=params,
+                                      endpoint=endpoint)
 
-        headers = {
-            'authorization': "{0}".format(self._api.auth_tokens[scope])
-        }
-        response = self._api.session.request("GET", url.format(**url_kwargs), data="", headers=headers, params=params)
+        if response.status_code == 304 and entry is not None:
+            cache.revalidate(url, resource, entry)
+            return 200, self._api.codec.loads(entry.body)
 
         if response.status_code in (200, 206, 416):
-            data = json.loads(response.text)
+            data = self._api.codec.loads(response.content)
+            if cache is not None and response.status_code == 200:
+                cache.store(url, resource, response.content, response.headers)
 
         return response.status_code, data
 
 
-    def __get_by_range(self, range_values, range_unit, scope, url, params=dict(), **url_kwargs):
+    def __get_by_range(self, range_values, range_unit, scope, url, params=None, **url_kwargs):
         """
         Generalized function for getting a collection of specified objects.
+
+        Returns the status code, the decoded page and the total size of the
+        collection as reported by the Content-Range header (None if unknown).
+        When the API streams, the page is an ArrayStream decoding items as
+        they are iterated over.
         """
         data = None
-
-        if self._api.auth_tokens[scope] is None:
-            self._api.get_auth_token(scope)
+        total = None
 
         headers = {
-            'range': f"{range_unit}={range_values[0]}-{range_values[1]}",
-            'authorization': f"{self._api.auth_tokens[scope]}"
+            'range': f"{range_unit}={range_values[0]}-{range_values[1]}"
         }
 
-        response = self._api.session.request("GET", url.format(**url_kwargs), data="", headers=headers, params=params)
-
-        if response.status_code == 401:
-            self._api.get_auth_token(scope)
-            headers['authorization'] = "{0}".format(self._api.auth_tokens[scope])
-            response = self._api.session.request("GET", url.format(**url_kwargs), data="", headers=headers, params=params)
+        stream = {'stream': True} if self._api.stream else {}
+        response = self._api._request("GET", scope, url.format(**url_kwargs), data="", headers=headers, params=params,
+                                      endpoint=url, **stream)
 
+        if response.status_code in (200, 206, 416):
+            total = content_range_total(response.headers.get('content-range'))
         if response.status_code in (200, 206):
-            data = json.loads(response.text)
+            data = ArrayStream(response) if stream else self._api.codec.loads(response.content)
+        elif stream:
+            response.close()
 
-        return response.status_code, data
+        return response.status_code, data, total
 
-    def __get_all(self, func, *func_args, params=dict()):
+    def __get_page(self, request, range_values, params=None, strict=False):
+        """
+        Gets one page of a collection and converts it into item objects.
+
+        When strict, a page that could not be fetched raises a PageError
+        instead of returning None (a range past the end still returns None).
+        """
+        status, data, total = self.__get_by_range(range_values, request.range_unit, request.scope, 
+                                             request.url, params=params, **request.url_kwargs)
+        if data is None:
+            if strict:
+                check_page(status, request, range_values, total)
+            return None
+        return [request.item_class.from_dict(d) for d in data]
+
+    def __get_all(self, request, params=None, on_page=None):
         """
         Generalized function for getting all instances of specified objects.
+
+        The first page reports the size of the collection, the remaining pages
+        are then requested concurrently and reassembled in order. on_page is
+        called with every page of items, in order, and the collection size.
+        """
+        page_length = MAX_RANGE_LENGTH.get(request.range_unit, 50)
+
+        status, first_page, total = self.__get_by_range((0, page_length - 1), request.range_unit, request.scope,
+                                                   request.url, params=params, **request.url_kwargs)
+        if first_page is None:
+            check_page(status, request, (0, page_length - 1), total)
+            return []
+
+        data = [request.item_class.from_dict(d) for d in first_page]
+        if on_page is not None:
+            on_page(data, total)
+
+        if total is None:
+            # No Content-Range to go by, walk the pages until one comes back short
+            current_range = (0, page_length - 1)
+            response_data = data
+            while response_data is not None and len(response_data) == page_length:
+                current_range = tuple((v+page_length for v in current_range))
+                response_data = self.__get_page(request, current_range, params=params, strict=True)
+                if on_page is not None and response_data:
+                    on_page(response_data, total)
+                data += response_data or []
+            return data
+
+        if len(data) >= total:
+            return data
+        if len(data) < page_length:
+            # The server capped the range below what was asked for
+            page_length = max(1, len(data))
+
+        ranges = [(start, min(start + page_length, total) - 1) 
+                  for start in range(len(data), total, page_length)]
+
+        workers = max(1, min(self._api.max_workers, len(ranges)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pages = executor.map(carry_priority(lambda r: self.__get_page(request, r, params=params, strict=True)),
+                                 ranges)
+            for page in pages:
+                if on_page is not None and page:
+                    on_page(page, total)
+                data += page or []
+
+        return data
+
+    def __iter_all(self, request, params=None):
+        """
+        Generalized generator for streaming all instances of specified objects.
+
+        The next page is requested in the background while the items of the
+        current one are being consumed, so at most two pages are held at once.
+        """
+        if self._api.stream:
+            yield from self.__stream_all(request, params=params)
+            return
+
+        page_length = MAX_RANGE_LENGTH.get(request.range_unit, 50)
+
+        @carry_priority
+        def get_range(start):
+            return self.__get_by_range((start, start + page_length - 1), request.range_unit, request.scope,
+                                       request.url, params=params, **request.url_kwargs)
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            start = 0
+            next_page = executor.submit(get_range, start)
+            while next_page is not None:
+                status, page, total = next_page.result()
+                if not page:
+                    check_page(status, request, (start, start + page_length - 1), total)
+                    return
+
+                start += len(page)
+                if total is None:
+                    more = len(page) == page_length
+                else:
+                    more = start < total
+                    if more and len(page) < page_length:
+                        # The server capped the range below what was asked for
+                        page_length = len(page)
+
+                next_page = executor.submit(get_range, start) if more else None
+                for d in page:
+                    yield request.item_class.from_dict(d)
+
+    def __stream_all(self, request, params=None):
         """
-        MAX_PAGE_LENGTH = 50
-        current_range = (0, MAX_PAGE_LENGTH - 1)
+        Generalized generator for streaming all instances of specified objects
+        while their pages are read.
 
-        data = []
+        Items are built as soon as they are decoded, and the next page is
+        requested once the current one starts arriving, so neither a whole
+        page body nor its decoded list is ever held.
+        """
+        page_length = MAX_RANGE_LENGTH.get(request.range_unit, 50)
+
+        @carry_priority
+        def get_range(start, length):
+            return self.__get_by_range((start, start + length - 1), request.range_unit, request.scope,
+                                       request.url, params=params, **request.url_kwargs)
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            start = 0
+            next_page = executor.submit(get_range, start, page_length)
+            try:
+                while next_page is not None:
+                    status, page, total = next_page.result()
+                    next_page = None
+                    if page is None:
+                        check_page(status, request, (start, start + page_length - 1), total)
+                        return
+
+                    if total is not None and start + page_length < total:
+                        next_page = executor.submit(get_range, start + page_length, page_length)
+                    count = 0
+                    for d in page:
+                        count += 1
+                        yield request.item_class.from_dict(d)
+                    if count == 0:
+                        return
+
+                    start += count
+                    if total is None and count == page_length:
+                        next_page = executor.submit(get_range, start, page_length)
+                    elif total is not None and count < page_length and start < total:
+                        # The server capped the range below what was asked for
+                        page_length = count
+                        if next_page is not None:
+                            _close_page(next_page)
+                        next_page = executor.submit(get_range, start, page_length)
+            finally:
+                if next_page is not None:
+                    _close_page(next_page)
+
+
+
+def range_request(resource, tournament=None, match=None):
+    """
+    Returns the RangeRequest of a collection by name
+    """
+    if resource == 'tournaments':
+        return tournaments_request()
+    if resource == 'matches':
+        return matches_request(tournament)
+    if resource == 'games':
+        return games_request(tournament, match)
+    if resource in ('teams', 'participants'):
+        return teams_request(tournament)
+    raise ValueError(f"Unknown collection '{resource}', expected tournaments, matches, games or teams")
+
+
+def _close_page(future):
+    """
+    Drops a streamed page that was requested but is not needed
+    """
+    _, page, _ = future.result()
+    if page is not None:
+        page.close()
 
-        response_data = func(*func_args, current_range, params=params)
-        
-        while response_data is not None:
-            data += response_data
-            current_range = tuple((v+MAX_PAGE_LENGTH for v in current_range))
-            response_data = func(*func_args, current_range, params=params)
-        
-        return data
\ No newline at end of file
+
+def _interning(index, teams=False):
+    """
+    Returns the on_page hook interning every page in a ParticipantIndex, None without one
+    """
+    if index is None:
+        return None
+    add = index.add_team if teams else index.intern
+
+    def on_page(page, total):
+        for item in page:
+            add(item)
+    return on_page
+
+
+def _interned(items, index, teams=False):
+    """
+    Returns an iterator over items, interned in a ParticipantIndex when one is given
+    """
+    if index is None:
+        return items
+    add = index.add_team if teams else index.intern
+    return (add(item) for item in items)
+
+
+def tournaments_request():
+    scope = 'organizer:view'
+    range_unit = 'tournaments'
+    url = "https://api.toornament.com/organizer/v2/tournaments"
+    url_kwargs = dict()
+    return RangeRequest(Tournament, range_unit, scope, url, url_kwargs)
+
+
+def matches_request(tournament):
+    scope = 'organizer:result'
+    range_unit = 'matches'
+    url = "https://api.toornament.com/organizer/v2/tournaments/{tournament_id}/matches"
+    url_kwargs = {'tournament_id': tournament.id}
+    return RangeRequest(Match, range_unit, scope, url, url_kwargs)
+
+
+def games_request(tournament, match):
+    scope = 'organizer:result'
+    range_unit = 'games'
+    url = 'https://api.toornament.com/organizer/v2/tournaments/{tournament_id}/matches/{match_id}/games'
+    url_kwargs = {'tournament_id': tournament.id,
+                  'match_id': match.id}
+    return RangeRequest(Game, range_unit, scope, url, url_kwargs)
+
+
+def teams_request(tournament):
+    scope = 'organizer:participant'
+    range_unit = 'participants'
+    url = "https://api.toornament.com/organizer/v2/tournaments/{tournament_id}/participants"
+    url_kwargs = {'tournament_id': tournament.id}
+    return RangeRequest(Team, range_unit, scope, url, url_kwargs)
+
+
+class PageError(Exception):
+    """
+    Raised when a page of a collection could not be fetched while getting all of it
+    """
+    def __init__(self, status, range_unit, range_values):
+        super().__init__(f"Could not get {range_unit} {range_values[0]}-{range_values[1]} (HTTP {status})")
+        self.status = status
+        self.range_unit = range_unit
+        self.range_values = range_values
+
+
+def check_page(status, request, range_values, total=None):
+    """
+    Raises a PageError unless the status means the page is past the end of the collection.
+
+    A 416 is only the end when the collection size it reports is not past the
+    start of the range, or without a size when the range is not the first one:
+    a first page refused with 416 is a range the server will not serve.
+    """
+    if status in (200, 206):
+        return
+    if status == 416 and (range_values[0] >= total if total is not None else range_values[0] > 0):
+        return
+    raise PageError(status, request.range_unit, range_values)
+
+
+def content_range_total(content_range):
+    """
+    Reads the collection size from a Content-Range header, e.g. 'matches 0-99/1234'
+    """
+    if not content_range or '/' not in content_range:
+        return None
+    total = content_range.rsplit('/', 1)[1].strip()
+    return int(total) if total.isdigit() else None
@@ -0,0 +1,153 @@
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from ._ratelimit import TRANSIENT_STATUS
+
+# Set once the attempt sent in this context lost to the other one
+_lost = contextvars.ContextVar('hedge_lost', default=None)
+
+class Hedging():
+    """
+    Sends a duplicate of an idempotent request that is slower than usual.
+
+    The latencies of the last 'window' requests are kept per endpoint, each
+    the network time of the attempt that succeeded, leaving out the retries
+    and backoff before it. Once an endpoint has min_samples of them, a
+    request that has not answered after the given latency percentile of its
+    endpoint is sent again; the first response wins and the other one is discarded (closed when it
+    arrives, or never sent if it had not started, and not retried further).
+    Both attempts run in a copy of the caller's context, and the context
+    variables the winner set are carried back to it. Duplicates are capped at
+    'budget' times the number of requests, e.g. 0.05 for at most 5% extra load.
+    """
+    def __init__(self, percentile=0.95, budget=0.05, min_samples=20, window=200, min_delay=0.005,
+                 max_workers=64):
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.window = window
+        # Shortest wait before a duplicate is sent, however fast the endpoint usually is
+        self.min_delay = min_delay
+
+        self._lock = threading.Lock()
+        self._latencies = dict()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='hedge')
+
+        self.requests = 0
+        self.hedged = 0
+        self.hedges_won = 0
+
+
+    def delay(self, endpoint):
+        """
+        Seconds to wait before a request to an endpoint is sent again, None to never send it again
+        """
+        with self._lock:
+            latencies = self._latencies.get(endpoint)
+            if latencies is None or len(latencies) < self.min_samples:
+                return None
+            ordered = sorted(latencies)
+        return max(self.min_delay, ordered[min(len(ordered) - 1, int(self.percentile * len(ordered)))])
+
+    def observe(self, endpoint, latency):
+        with self._lock:
+            latencies = self._latencies.get(endpoint)
+            if latencies is None:
+                latencies = self._latencies[endpoint] = deque(maxlen=self.window)
+            latencies.append(latency)
+
+    def run(self, endpoint, send):
+        """
+        Returns the first response of send(), called a second time if the first call is slow
+        """
+        with self._lock:
+            self.requests += 1
+        delay = self.delay(endpoint)
+        if delay is None:
+            return self.__timed(endpoint, send)
+
+        primary = self.__submit(endpoint, send)
+        done, _ = wait([primary], timeout=delay)
+        if done or not self.__take_budget():
+            return _adopt(primary)
+
+        hedge = self.__submit(endpoint, send)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = error or future.exception()
+                    continue
+                for loser in pending:
+                    _discard(loser)
+                if future is hedge:
+                    with self._lock:
+                        self.hedges_won += 1
+                return _adopt(future)
+        raise error
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+    def __take_budget(self):
+        with self._lock:
+            if self.hedged + 1 > self.budget * self.requests:
+                return False
+            self.hedged += 1
+            return True
+
+    def __submit(self, endpoint, send):
+        """
+        Sends an attempt in a worker thread, within its own copy of the caller's context
+        """
+        context = contextvars.copy_context()
+        lost = threading.Event()
+        future = self._executor.submit(context.run, self.__timed, endpoint, send, lost)
+        future.context, future.lost = context, lost
+        return future
+
+    def __timed(self, endpoint, send, lost=None):
+        if lost is not None:
+            _lost.set(lost)
+        start = time.perf_counter()
+        response = send()
+        if response.status_code not in TRANSIENT_STATUS:
+            elapsed = getattr(response, 'elapsed', None)
+            self.observe(endpoint, elapsed.total_seconds() if elapsed else time.perf_counter() - start)
+        return response
+
+
+
+def lost():
+    """
+    Whether the hedged attempt being sent in this context lost, and need not be retried
+    """
+    event = _lost.get()
+    return event is not None and event.is_set()
+
+
+def _adopt(future):
+    """
+    Returns the result of the winning attempt, with the context variables it set
+    """
+    response = future.result()
+    for var, value in future.context.items():
+        if var is not _lost and var.get(None) is not value:
+            var.set(value)
+    return response
+
+
+def _discard(future):
+    """
+    Drops the attempt that lost, closing its response once it arrives
+    """
+    future.lost.set()
+    if future.cancel():
+        return
+    future.add_done_callback(lambda f: f.exception() is None and f.result().close())
@@ -0,0 +1,209 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+from .TournamentItems import Tournament
+from ._get import MAX_RANGE_LENGTH
+
+# Range unit and page method of every resource the loaders can batch
+RESOURCES = {
+    'match': ('matches', 'matches', 'match_by_id'),
+    'team': ('participants', 'teams', 'team_by_id'),
+}
+
+class Loader():
+    """
+    Batches by-id lookups made close together into filtered range requests.
+
+    Lookups of the same resource in the same tournament made within 'window'
+    seconds of each other are sent as one request for the page of those ids
+    (e.g. matches?ids=1,2,3). Lookups of an id already on its way share the
+    same request. Ids the filtered request did not return are looked up one
+    by one, so a server ignoring the filter only costs extra requests.
+
+        loader = Loader(api)
+        futures = [loader.load('team', tournament.id, team_id) for team_id in ids]
+        teams = [f.result() for f in futures]
+    """
+    def __init__(self, api, window=0.002):
+        self._api = api
+        # Seconds a batch waits for more lookups before it is sent
+        self.window = window
+        self._lock = threading.Lock()
+        self._pending = dict()
+        self._in_flight = dict()
+
+        self.batches = 0
+        self.lookups = 0
+
+
+    def load(self, resource, tournament_id, item_id):
+        """
+        Returns a Future of the item, resolved to None if there is no such item
+        """
+        key = (resource, tournament_id, item_id)
+        with self._lock:
+            self.lookups += 1
+            future = self._in_flight.get(key)
+            if future is not None:
+                return future
+            future = self._in_flight[key] = Future()
+
+            batch_key = (resource, tournament_id)
+            batch = self._pending.get(batch_key)
+            if batch is None:
+                batch = self._pending[batch_key] = []
+                timer = threading.Timer(self.window, self.__flush, (batch_key, batch))
+                timer.daemon = True
+                timer.start()
+            batch.append(item_id)
+            full = len(batch) >= self.__page_length(resource)
+
+        if full:
+            self.__flush(batch_key)
+        return future
+
+    def load_many(self, resource, tournament_id, item_ids):
+        """
+        Returns the items of a list of ids (None for missing ones), in order
+        """
+        futures = [self.load(resource, tournament_id, item_id) for item_id in item_ids]
+        self.__flush((resource, tournament_id))
+        return [future.result() for future in futures]
+
+    def match(self, tournament_id, match_id):
+        return self.load('match', tournament_id, match_id).result()
+
+    def team(self, tournament_id, team_id):
+        return self.load('team', tournament_id, team_id).result()
+
+
+    def __page_length(self, resource):
+        return MAX_RANGE_LENGTH.get(RESOURCES[resource][0], 50)
+
+    def __flush(self, batch_key, batch=None):
+        with self._lock:
+            if batch is not None and self._pending.get(batch_key) is not batch:
+                # The batch the timer was started for has already been sent
+                return
+            item_ids = self._pending.pop(batch_key, None)
+            if item_ids:
+                self.batches += 1
+        if not item_ids:
+            return
+
+        resource, tournament_id = batch_key
+        try:
+            found = _fetch(self._api.get, resource, tournament_id, item_ids, self.__page_length(resource))
+        except Exception as e:
+            found = e
+        with self._lock:
+            futures = [self._in_flight.pop((resource, tournament_id, item_id)) for item_id in item_ids]
+        for item_id, future in zip(item_ids, futures):
+            if isinstance(found, Exception):
+                future.set_exception(found)
+            else:
+                future.set_result(found.get(item_id))
+
+
+
+class AsyncLoader():
+    """
+    Batches by-id lookups made by an AsyncAPI in the same event loop tick.
+
+        loader = AsyncLoader(api)
+        teams = await asyncio.gather(*(loader.team(tournament.id, i) for i in ids))
+    """
+    def __init__(self, api):
+        self._api = api
+        self._pending = dict()
+        self._in_flight = dict()
+
+        self.batches = 0
+        self.lookups = 0
+
+
+    def load(self, resource, tournament_id, item_id):
+        """
+        Returns an asyncio Future of the item, resolved to None if there is no such item
+        """
+        key = (resource, tournament_id, item_id)
+        self.lookups += 1
+        future = self._in_flight.get(key)
+        if future is not None:
+            return future
+        loop = asyncio.get_running_loop()
+        future = self._in_flight[key] = loop.create_future()
+
+        batch_key = (resource, tournament_id)
+        batch = self._pending.get(batch_key)
+        if batch is None:
+            batch = self._pending[batch_key] = []
+            # Lookups made before the loop gets back to its callbacks join this batch
+            loop.call_soon(lambda: asyncio.ensure_future(self.__flush(batch_key)))
+        batch.append(item_id)
+        return future
+
+    async def match(self, tournament_id, match_id):
+        return await self.load('match', tournament_id, match_id)
+
+    async def team(self, tournament_id, team_id):
+        return await self.load('team', tournament_id, team_id)
+
+
+    async def __flush(self, batch_key):
+        item_ids = self._pending.pop(batch_key, None)
+        if not item_ids:
+            return
+        self.batches += 1
+
+        resource, tournament_id = batch_key
+        page_length = MAX_RANGE_LENGTH.get(RESOURCES[resource][0], 50)
+        try:
+            found = await _fetch_async(self._api.get, resource, tournament_id, item_ids, page_length)
+        except Exception as e:
+            found = e
+        for item_id in item_ids:
+            future = self._in_flight.pop((resource, tournament_id, item_id))
+            if future.done():
+                continue
+            if isinstance(found, Exception):
+                future.set_exception(found)
+            else:
+                future.set_result(found.get(item_id))
+
+
+
+def _chunks(item_ids, size):
+    return [item_ids[i:i + size] for i in range(0, len(item_ids), size)]
+
+
+def _fetch(get, resource, tournament_id, item_ids, page_length):
+    """
+    Returns a dict of the items found for a list of ids
+    """
+    _, page_method, by_id = RESOURCES[resource]
+    tournament = Tournament(id=tournament_id)
+    found = dict()
+    for chunk in _chunks(item_ids, page_length):
+        page = getattr(get, page_method)(tournament, (0, page_length - 1), params={'ids': ','.join(chunk)})
+        found.update((item.id, item) for item in page or ())
+    for item_id in item_ids:
+        if item_id not in found:
+            found[item_id] = getattr(get, by_id)(tournament_id, item_id)
+    return found
+
+
+async def _fetch_async(get, resource, tournament_id, item_ids, page_length):
+    _, page_method, by_id = RESOURCES[resource]
+    tournament = Tournament(id=tournament_id)
+    found = dict()
+    pages = await asyncio.gather(*(getattr(get, page_method)(tournament, (0, page_length - 1),
+                                                             params={'ids': ','.join(chunk)})
+                                   for chunk in _chunks(item_ids, page_length)))
+    for page in pages:
+        found.update((item.id, item) for item in page or ())
+    missing = [item_id for item_id in item_ids if item_id not in found]
+    items = await asyncio.gather(*(getattr(get, by_id)(tournament_id, item_id) for item_id in missing))
+    found.update(zip(missing, items))
+    return found
@@ -0,0 +1,266 @@
+import threading
+import time
+from collections import namedtuple
+from contextvars import ContextVar
+from urllib.parse import urlsplit
+
+try:
+    from opentelemetry import trace
+except ImportError:
+    trace = None
+
+# Token requests made on behalf of the request currently being sent
+_token_refreshes = ContextVar('token_refreshes', default=0)
+# Priority class of the request currently being sent and the seconds it waited for a Scheduler slot
+_queue = ContextVar('queue', default=(None, 0.0))
+
+# Upper bounds in seconds of the latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class RequestRecord(namedtuple('RequestRecord', ['method', 'endpoint', 'url', 'scope', 'status', 'started',
+                                                 'latency', 'bytes_out', 'bytes_in', 'attempts',
+                                                 'token_refreshes', 'error', 'priority', 'queue_delay'])):
+    """
+    Accounting of one request, including every retry made for it.
+
+    'endpoint' is the url template (e.g. /organizer/v2/tournaments/{tournament_id}/matches),
+    'started' the wall clock time it was sent at and 'latency' the seconds it took.
+    'status' is None and 'error' the exception when no response was received.
+    'priority' is the Scheduler class of the request (None without a scheduler)
+    and 'queue_delay' the seconds it waited for a slot, part of its latency.
+    """
+    __slots__ = ()
+
+    @property
+    def retries(self):
+        return max(0, self.attempts - 1)
+
+
+
+def endpoint_of(url):
+    """
+    Returns the path of a url or url template, used to group requests
+    """
+    return urlsplit(url).path
+
+
+def count_token_refresh():
+    """
+    Counts a token request towards the request being sent in this context
+    """
+    _token_refreshes.set(_token_refreshes.get() + 1)
+
+
+def count_queue_delay(priority, seconds):
+    """
+    Counts time spent waiting for a Scheduler slot towards the request being sent in this context
+    """
+    _, waited = _queue.get()
+    _queue.set((priority, waited + seconds))
+
+
+class Observation():
+    """
+    Context manager passing a RequestRecord of the request sent inside it to every hook.
+
+    Call done() with the response details once it was received, a request left
+    without them is reported as failed with the exception raised.
+    """
+    def __init__(self, hooks, method, scope, url, endpoint=None, data=None):
+        self.hooks = hooks
+        self.method = method
+        self.scope = scope
+        self.url = url
+        self.endpoint = endpoint_of(endpoint or url)
+        self.bytes_out = _body_size(data)
+        self.status = None
+        self.bytes_in = 0
+        self.attempts = 1
+
+    def done(self, status, bytes_in, attempts=1):
+        self.status = status
+        self.bytes_in = bytes_in
+        self.attempts = attempts
+
+    def __enter__(self):
+        self._refreshes = _token_refreshes.set(0)
+        self._queue = _queue.set((None, 0.0))
+        self._started = time.time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        latency = time.perf_counter() - self._start
+        if exc is not None:
+            self.attempts = getattr(exc, 'attempts', self.attempts)
+        record = RequestRecord(self.method, self.endpoint, self.url, self.scope, self.status, self._started,
+                               latency, self.bytes_out, self.bytes_in, self.attempts,
+                               _token_refreshes.get(), exc, *_queue.get())
+        _token_refreshes.reset(self._refreshes)
+        _queue.reset(self._queue)
+        for hook in self.hooks:
+            hook(record)
+
+
+def _body_size(data):
+    if data is None:
+        return 0
+    if isinstance(data, str):
+        return len(data.encode('utf-8'))
+    return len(data)
+
+
+
+class Metrics():
+    """
+    Prometheus style request metrics, add it to API.hooks to collect them.
+
+    Counts requests by method, endpoint and status, and keeps a latency
+    histogram, byte totals and retry and token refresh counts per endpoint,
+    and a histogram of the time spent queued per Scheduler priority class.
+    render() returns them in the Prometheus text exposition format.
+    """
+    def __init__(self, prefix='toornament', buckets=DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._requests = dict()
+        self._latency = dict()
+        self._bytes = dict()
+        self._retries = dict()
+        self._token_refreshes = dict()
+        self._queue_delay = dict()
+
+    def __call__(self, record):
+        endpoint = (record.method, record.endpoint)
+        status = 'error' if record.status is None else str(record.status)
+        with self._lock:
+            key = endpoint + (status,)
+            self._requests[key] = self._requests.get(key, 0) + 1
+
+            self.__observe(self._latency, endpoint, record.latency)
+            if record.priority is not None:
+                self.__observe(self._queue_delay, (record.priority,), record.queue_delay)
+
+            for direction, size in (('out', record.bytes_out), ('in', record.bytes_in)):
+                key = endpoint + (direction,)
+                self._bytes[key] = self._bytes.get(key, 0) + size
+            self._retries[endpoint] = self._retries.get(endpoint, 0) + record.retries
+            self._token_refreshes[endpoint] = self._token_refreshes.get(endpoint, 0) + record.token_refreshes
+
+    def requests(self, method=None, endpoint=None):
+        """
+        Returns the number of requests seen, optionally for one method and endpoint
+        """
+        with self._lock:
+            return sum(count for (m, e, _), count in self._requests.items()
+                       if method in (None, m) and endpoint in (None, e))
+
+    def reset(self):
+        with self._lock:
+            for values in (self._requests, self._latency, self._bytes, self._retries, self._token_refreshes,
+                           self._queue_delay):
+                values.clear()
+
+    def render(self):
+        """
+        Returns every metric in the Prometheus text exposition format
+        """
+        name = self.prefix
+        lines = []
+        with self._lock:
+            lines += [f"# HELP {name}_requests_total Requests sent to the toornament.com API",
+                      f"# TYPE {name}_requests_total counter"]
+            for (method, endpoint, status), count in sorted(self._requests.items()):
+                lines.append(f"{name}_requests_total{_labels(method=method, endpoint=endpoint, status=status)} {count}")
+
+            lines += self.__histogram('request_duration_seconds', "Request latency including retries",
+                                      self._latency, ('method', 'endpoint'))
+            lines += self.__histogram('queue_delay_seconds', "Time requests waited for a scheduler slot",
+                                      self._queue_delay, ('priority',))
+
+            lines += [f"# HELP {name}_request_bytes_total Body bytes sent and received",
+                      f"# TYPE {name}_request_bytes_total counter"]
+            for (method, endpoint, direction), size in sorted(self._bytes.items()):
+                lines.append(f"{name}_request_bytes_total{_labels(method=method, endpoint=endpoint, direction=direction)} {size}")
+
+            for metric, values, description in (('request_retries_total', self._retries, "Requests sent again after throttling or failures"),
+                                                ('token_refreshes_total', self._token_refreshes, "Token requests made while sending requests")):
+                lines += [f"# HELP {name}_{metric} {description}",
+                          f"# TYPE {name}_{metric} counter"]
+                for (method, endpoint), count in sorted(values.items()):
+                    lines.append(f"{name}_{metric}{_labels(method=method, endpoint=endpoint)} {count}")
+
+        return '\n'.join(lines) + '\n'
+
+    def __observe(self, histograms, key, value):
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = [[0] * len(self.buckets), 0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                histogram[0][i] += 1
+        histogram[1] += value
+        histogram[2] += 1
+
+    def __histogram(self, metric, description, histograms, label_names):
+        """
+        Returns the exposition lines of a histogram metric
+        """
+        name = f"{self.prefix}_{metric}"
+        lines = [f"# HELP {name} {description}",
+                 f"# TYPE {name} histogram"]
+        for key, (counts, total, count) in sorted(histograms.items()):
+            labels = dict(zip(label_names, key))
+            for bound, bucket in zip(self.buckets, counts):
+                lines.append(f"{name}_bucket{_labels(**labels, le=repr(float(bound)))} {bucket}")
+            lines.append(f"{name}_bucket{_labels(**labels, le='+Inf')} {count}")
+            lines.append(f"{name}_sum{_labels(**labels)} {total!r}")
+            lines.append(f"{name}_count{_labels(**labels)} {count}")
+        return lines
+
+
+def _labels(**labels):
+    escaped = (f'{key}="{_escape(value)}"' for key, value in labels.items())
+    return '{' + ','.join(escaped) + '}'
+
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+
+class OpenTelemetryHook():
+    """
+    Reports every request as an OpenTelemetry client span, add it to API.hooks
+    """
+    def __init__(self, tracer=None):
+        if trace is None:
+            raise ImportError("OpenTelemetryHook requires opentelemetry, install it with 'pip install opentelemetry-api'")
+        self.tracer = tracer or trace.get_tracer('tourny')
+
+    def __call__(self, record):
+        start = int(record.started * 1e9)
+        attributes = {'http.request.method': record.method,
+                      'url.full': record.url,
+                      'url.template': record.endpoint,
+                      'toornament.attempts': record.attempts,
+                      'toornament.token_refreshes': record.token_refreshes,
+                      'http.request.body.size': record.bytes_out,
+                      'http.response.body.size': record.bytes_in}
+        if record.scope is not None:
+            attributes['toornament.scope'] = record.scope
+        if record.status is not None:
+            attributes['http.response.status_code'] = record.status
+        if record.attempts > 1:
+            attributes['http.request.resend_count'] = record.attempts - 1
+
+        span = self.tracer.start_span(f"{record.method} {record.endpoint}", kind=trace.SpanKind.CLIENT,
+                                      start_time=start, attributes=attributes)
+        if record.error is not None:
+            span.record_exception(record.error)
+            span.set_status(trace.Status(trace.StatusCode.ERROR, type(record.error).__name__))
+        elif record.status >= 400:
+            span.set_status(trace.Status(trace.StatusCode.ERROR))
+        span.end(end_time=start + int(record.latency * 1e9))
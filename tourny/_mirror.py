@@ -0,0 +1,291 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from .TournamentItems import Tournament, Team, Match, Game
+from ._scheduler import carry_priority
+
+# Match statuses that can still change, completed matches are only fetched again on a full sync
+OPEN_STATUSES = ('pending', 'running')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tournaments (
+    id TEXT PRIMARY KEY,
+    digest BLOB NOT NULL,
+    data BLOB NOT NULL,
+    full_sync_at REAL,
+    synced_at REAL
+);
+CREATE TABLE IF NOT EXISTS participants (
+    tournament_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    name TEXT,
+    digest BLOB NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (tournament_id, id)
+);
+CREATE TABLE IF NOT EXISTS matches (
+    tournament_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    number INTEGER,
+    status TEXT,
+    stage_id TEXT,
+    group_id TEXT,
+    round_id TEXT,
+    scheduled_datetime TEXT,
+    digest BLOB NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (tournament_id, id)
+);
+CREATE INDEX IF NOT EXISTS matches_status ON matches (tournament_id, status);
+CREATE INDEX IF NOT EXISTS matches_round ON matches (tournament_id, round_id);
+CREATE TABLE IF NOT EXISTS match_participants (
+    tournament_id TEXT NOT NULL,
+    match_id TEXT NOT NULL,
+    participant_id TEXT NOT NULL,
+    PRIMARY KEY (tournament_id, match_id, participant_id)
+);
+CREATE INDEX IF NOT EXISTS match_participants_participant ON match_participants (tournament_id, participant_id);
+CREATE TABLE IF NOT EXISTS games (
+    tournament_id TEXT NOT NULL,
+    match_id TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    status TEXT,
+    digest BLOB NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (tournament_id, match_id, number)
+);
+"""
+
+SyncReport = namedtuple('SyncReport', ['tournament_id', 'full', 'participants', 'matches', 'games', 'removed'])
+SyncReport.__doc__ = "Number of objects a sync added or changed (and removed) in the mirror"
+
+
+class Mirror():
+    """
+    Local SQLite copy of tournaments, kept up to date by incremental syncs.
+
+    The first sync of a tournament downloads everything. Later syncs only ask
+    for matches that are still pending or running, look up the ones that
+    closed since by id and fetch the games of changed matches only. Rows are
+    upserted and only rewritten when their content changed.
+
+    The query methods read from the local store and never call the API.
+    """
+    def __init__(self, api, path=':memory:'):
+        self._api = api
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+    #####################################
+    #                                   #
+    #                SYNC               #
+    #                                   #
+    #####################################
+
+    def sync(self, tournament, full=False, teams=True, games=True):
+        """
+        Brings the mirror of a tournament (object or id) up to date, returns a SyncReport.
+
+        A full sync downloads every match, otherwise completed matches are
+        assumed not to change. teams and games can be left out to save requests.
+        """
+        if not isinstance(tournament, Tournament):
+            tournament = self._api.get.tournament_by_id(tournament)
+            if tournament is None:
+                raise LookupError("Tournament not found")
+        tid = tournament.id
+        full = full or self.__full_sync_at(tid) is None
+
+        if full:
+            matches = self._api.get.all_matches(tournament)
+        else:
+            matches = self._api.get.all_matches(tournament, params={'statuses': ','.join(OPEN_STATUSES)})
+            # Open matches missing from the result have closed (or were removed) since
+            fetched = {m.id for m in matches}
+            closed = [mid for mid in self.__open_match_ids(tid) if mid not in fetched]
+            matches += [m for m in self.__map(lambda mid: self._api.get.match_by_id(tid, mid), closed)
+                        if m is not None]
+        teams = self._api.get.all_teams(tournament) if teams else None
+
+        # Games are fetched before anything is written, so a failed sync leaves the mirror as it was
+        stored = dict(self.__query("SELECT id, digest FROM matches WHERE tournament_id = ?", (tid,)))
+        changed = [m for m in matches if stored.get(m.id) != _digest(self.__encode(m))]
+        match_games = []
+        if games:
+            played = [m for m in changed if getattr(m, 'status', None) not in (None, 'pending')]
+            match_games = self.__map(lambda m: (m, self._api.get.all_games(tournament, m)), played)
+
+        with self._lock, self._db:
+            self.__upsert('tournaments', ('id',), {'id': tid}, tournament)
+            changed_participants = 0
+            if teams is not None:
+                changed_participants = sum(self.__upsert('participants', ('tournament_id', 'id'),
+                                                         {'tournament_id': tid, 'id': t.id, 'name': t.name}, t)
+                                           for t in teams)
+            for match in changed:
+                self.__upsert_match(tid, match)
+
+            changed_games = 0
+            for match, current in match_games:
+                changed_games += sum(self.__upsert('games', ('tournament_id', 'match_id', 'number'),
+                                                   {'tournament_id': tid, 'match_id': match.id,
+                                                    'number': g.number, 'status': g.status}, g)
+                                     for g in current)
+                numbers = [g.number for g in current]
+                self._db.execute(f"DELETE FROM games WHERE tournament_id = ? AND match_id = ? "
+                                 f"AND number NOT IN ({', '.join('?' * len(numbers))})",
+                                 (tid, match.id, *numbers))
+
+            removed = 0
+            if full:
+                # Only a full listing tells a removed match from one that failed to load
+                fetched = {m.id for m in matches}
+                removed = self.__remove_matches(tid, [mid for mid in stored if mid not in fetched])
+
+            now = time.time()
+            self._db.execute("UPDATE tournaments SET synced_at = ?, full_sync_at = CASE WHEN ? "
+                             "THEN ? ELSE full_sync_at END WHERE id = ?", (now, full, now, tid))
+
+        return SyncReport(tid, full, changed_participants, len(changed), changed_games, removed)
+
+
+    #####################################
+    #                                   #
+    #              QUERIES              #
+    #                                   #
+    #####################################
+
+    def tournament(self, tournament_id):
+        rows = self.__query("SELECT data FROM tournaments WHERE id = ?", (tournament_id,))
+        return Tournament.from_dict(self.__decode(rows[0][0])) if rows else None
+
+    def tournaments(self):
+        return [Tournament.from_dict(self.__decode(data))
+                for data, in self.__query("SELECT data FROM tournaments ORDER BY id")]
+
+    def teams(self, tournament_id):
+        return [Team.from_dict(self.__decode(data)) for data, in
+                self.__query("SELECT data FROM participants WHERE tournament_id = ? ORDER BY name", (tournament_id,))]
+
+    def match(self, tournament_id, match_id):
+        rows = self.__query("SELECT data FROM matches WHERE tournament_id = ? AND id = ?", (tournament_id, match_id))
+        return Match.from_dict(self.__decode(rows[0][0])) if rows else None
+
+    def matches(self, tournament_id, participant_id=None, round_id=None, status=None,
+                stage_id=None, group_id=None):
+        """
+        Returns the mirrored matches of a tournament ordered by number, optionally filtered
+        """
+        sql = "SELECT m.data FROM matches m"
+        args = []
+        if participant_id is not None:
+            sql += (" JOIN match_participants p ON p.tournament_id = m.tournament_id "
+                    "AND p.match_id = m.id AND p.participant_id = ?")
+            args.append(participant_id)
+        sql += " WHERE m.tournament_id = ?"
+        args.append(tournament_id)
+        for column, value in (('round_id', round_id), ('status', status),
+                              ('stage_id', stage_id), ('group_id', group_id)):
+            if value is not None:
+                sql += f" AND m.{column} = ?"
+                args.append(value)
+        sql += " ORDER BY m.number"
+        return [Match.from_dict(self.__decode(data)) for data, in self.__query(sql, args)]
+
+    def games(self, tournament_id, match_id):
+        return [Game.from_dict(self.__decode(data)) for data, in
+                self.__query("SELECT data FROM games WHERE tournament_id = ? AND match_id = ? ORDER BY number",
+                             (tournament_id, match_id))]
+
+
+    #####################################
+    #                                   #
+    #          CLASS UTILITIES          #
+    #                                   #
+    #####################################
+
+    def __query(self, sql, args=()):
+        with self._lock:
+            return self._db.execute(sql, args).fetchall()
+
+    def __decode(self, data):
+        return self._api.codec.loads(data)
+
+    def __encode(self, item):
+        return item.dumps(codec=self._api.codec)
+
+    def __map(self, func, values):
+        """
+        Calls func for every value concurrently, bounded by the API's max_workers
+        """
+        if not values:
+            return []
+        workers = max(1, min(self._api.max_workers, len(values)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(carry_priority(func), values))
+
+    def __upsert(self, table, key, columns, item):
+        """
+        Inserts or updates the row of an item, returns whether anything changed
+        """
+        data = self.__encode(item)
+        columns = dict(columns, digest=_digest(data), data=data)
+        names = ', '.join(columns)
+        updates = ', '.join(f"{name} = excluded.{name}" for name in columns if name not in key)
+        cursor = self._db.execute(f"INSERT INTO {table} ({names}) VALUES ({', '.join('?' * len(columns))}) "
+                                  f"ON CONFLICT ({', '.join(key)}) DO UPDATE SET {updates} "
+                                  f"WHERE {table}.digest != excluded.digest", tuple(columns.values()))
+        return cursor.rowcount > 0
+
+    def __upsert_match(self, tournament_id, match):
+        columns = {'tournament_id': tournament_id, 'id': match.id, 'number': match.number,
+                   'status': getattr(match, 'status', None), 'stage_id': getattr(match, 'stage_id', None),
+                   'group_id': getattr(match, 'group_id', None), 'round_id': getattr(match, 'round_id', None),
+                   'scheduled_datetime': getattr(match, 'scheduled_datetime', None)}
+        if not self.__upsert('matches', ('tournament_id', 'id'), columns, match):
+            return
+
+        self._db.execute("DELETE FROM match_participants WHERE tournament_id = ? AND match_id = ?",
+                         (tournament_id, match.id))
+        self._db.executemany("INSERT OR IGNORE INTO match_participants VALUES (?, ?, ?)",
+                             [(tournament_id, match.id, opponent['participant']['id'])
+                              for opponent in match.opponents if opponent.get('participant')])
+
+    def __full_sync_at(self, tournament_id):
+        rows = self.__query("SELECT full_sync_at FROM tournaments WHERE id = ?", (tournament_id,))
+        return rows[0][0] if rows else None
+
+    def __open_match_ids(self, tournament_id):
+        statuses = ', '.join('?' * len(OPEN_STATUSES))
+        return [mid for mid, in self.__query(f"SELECT id FROM matches WHERE tournament_id = ? "
+                                             f"AND (status IN ({statuses}) OR status IS NULL)",
+                                             (tournament_id, *OPEN_STATUSES))]
+
+    def __remove_matches(self, tournament_id, match_ids):
+        if not match_ids:
+            return 0
+        for table, column in (('matches', 'id'), ('match_participants', 'match_id'), ('games', 'match_id')):
+            self._db.executemany(f"DELETE FROM {table} WHERE tournament_id = ? AND {column} = ?",
+                                 [(tournament_id, mid) for mid in match_ids])
+        return len(match_ids)
+
+
+def _digest(data):
+    return hashlib.blake2b(data, digest_size=16).digest()
@@ -1,26 +1,32 @@
-import json
 from .TournamentItems import Tournament, Team, Match, Game
 
 class PATCH():
     """
     Handle API PATCH requests for the toornament.com API
+
+    Only the fields changed since an object was loaded are sent, unless
+    only_changed is False. Nothing is sent for an unchanged object.
+
+    Listeners are called as listener(item, tournament=..., match=...) after a
+    successful PATCH, with the object as returned by the server when it sent
+    one back. match is only given for games.
     """
     def __init__(self, api):
         self._api = api
+        self.listeners = []
 
 
-    def tournament(self, tournament):
+    def tournament(self, tournament, only_changed=True):
         """
         Patches in a tournament object
         """
         scope = 'organizer:admin'
         url = "https://api.toornament.com/organizer/v2/tournaments/{id}"
         url_kwargs = {'id': tournament.id}
-        data = tournament.json(whitelist=tournament.patch_fields())
-        return self.__patch(data, scope, url, **url_kwargs)
+        return self.__patch(tournament, scope, url, only_changed, (tournament, None), **url_kwargs)
 
 
-    def team(self, tournament, team):
+    def team(self, tournament, team, only_changed=True):
         """
         Patches in a team object
         """
@@ -28,11 +34,10 @@ class PATCH():
         url = 'https://api.toornament.com/organizer/v2/tournaments/{tournament_id}/participants/{id}'
         url_kwargs = {'tournament_id': tournament.id,
                       'id': team.id}
-        data = team.json(whitelist=team.patch_fields())
-        return self.__patch(data, scope, url, **url_kwargs)
+        return self.__patch(team, scope, url, only_changed, (tournament, None), **url_kwargs)
 
 
-    def match(self, tournament, match):
+    def match(self, tournament, match, only_changed=True):
         """
         Patches in a match object
         """
@@ -40,11 +45,10 @@ class PATCH():
         url = 'https://api.toornament.com/organizer/v2/tournaments/{tournament_id}/matches/{id}'
         url_kwargs = {'tournament_id': tournament.id,
                       'id': match.id}
-        data = match.json(whitelist=match.patch_fields())
-        return self.__patch(data, scope, url, **url_kwargs)
+        return self.__patch(match, scope, url, only_changed, (tournament, None), **url_kwargs)
 
 
-    def game(self, tournament, match, game):
+    def game(self, tournament, match, game, only_changed=True):
         """
         Patches in a game object
         """
@@ -53,28 +57,47 @@ class PATCH():
         url_kwargs = {'tournament_id': tournament.id,
                       'match_id': match.id,
                       'number': game.number}
-        data = game.json(whitelist=game.patch_fields())
-        return self.__patch(data, scope, url, **url_kwargs)
+        return self.__patch(game, scope, url, only_changed, (tournament, match), **url_kwargs)
 
 
-    def __patch(self, data, scope, url, **url_kwargs):
+    def __patch(self, item, scope, url, only_changed=True, parents=(None, None), **url_kwargs):
         """
         Generalized function for sending PATCH requests
+
+        Returns None when there was nothing to send, otherwise the response with
+        the names of the fields that were sent in response.sent_fields.
+        """
+        fields = item.changed_fields() if only_changed else item.patch_fields()
+        if not fields:
+            return None
+        data = item.dumps(whitelist=fields, codec=self._api.codec)
+
+        endpoint, url = url, url.format(**url_kwargs)
+        response = self._api._request("PATCH", 
+                                      scope,
+                                      url,
+                                      data=data,
+                                      endpoint=endpoint)
+
+        if response.status_code in (200, 204):
+            item.mark_clean(fields)
+            # The by-id lookup of a patched object shares its url
+            if self._api.cache is not None:
+                self._api.cache.invalidate(url)
+            if self.listeners:
+                self.__notify(item, response.status_code, response.content, parents)
+
+        response.sent_fields = fields
+        return response
+
+    def __notify(self, item, status, body, parents):
+        """
+        Passes the patched object to every listener
         """
-        headers = {
-            'authorization': "{0}".format(self._api.auth_tokens[scope])
-        }
-
-        response = self._api.session.request("PATCH", 
-                                             url.format(**url_kwargs),
-                                             headers=headers,
-                                             data=data)
-
-        if response.status_code == 401:
-            self._api.get_auth_token(scope)
-            headers['authorization'] = "{0}".format(self._api.auth_tokens[scope])
-            response = self._api.session.request("PATCH", 
-                                                 url.format(**url_kwargs),
-                                                 headers=headers,
-                                                 data=data)
-        return response 
\ No newline at end of file
+        if status == 200 and body:
+            data = self._api.codec.loads(body)
+            if isinstance(data, dict):
+                item = item.__class__.from_dict(data)
+        tournament, match = parents
+        for listener in self.listeners:
+            listener(item, tournament=tournament, match=match) 
\ No newline at end of file
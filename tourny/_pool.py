@@ -0,0 +1,217 @@
+import itertools
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from .toornament_api import API
+from ._get import GET
+from ._post import POST
+from ._patch import PATCH
+from ._scheduler import carry_priority
+from ._bulk import BULK
+
+# Tournament id in the url of a request
+_TOURNAMENT_URL = re.compile(r'/tournaments/(\w+)')
+
+# Statuses an account gets for a tournament it cannot see
+FORBIDDEN_STATUS = (403, 404)
+
+class APIPool():
+    """
+    Spreads requests over several organizer accounts, each with its own API
+    key, session, tokens and rate limiter.
+
+    Requests about a tournament only go to the accounts known to own it
+    (see discover() and assign()); an unknown tournament is tried on each
+    account until one can see it, which then serves it alone until
+    discover() or assign() tell of others. Among the candidates a request
+    goes to the least loaded account, or the next one in turn with
+    strategy='round_robin'. A request throttled (429) by one account is
+    sent through the next at once; the pool only waits when every candidate
+    is throttled. Accounts that keep being throttled come last until they
+    answer normally again.
+
+    The pool has the same get, post, patch and bulk members as an API, so it
+    can be given to Mirror, Loader, Standings.attach() and the like:
+
+        pool = APIPool(['organizer_a.json', 'organizer_b.json']).discover()
+        matches = pool.get.all_matches(tournament)
+    """
+    def __init__(self, accounts, strategy='least_loaded', max_workers=8, cache=None, codec=None,
+                 hooks=None, stream=False, **settings):
+        if strategy not in ('least_loaded', 'round_robin'):
+            raise ValueError(f"Unknown pool strategy '{strategy}'")
+        if not accounts:
+            raise ValueError("A pool needs at least one account")
+        # API objects, or files of API information to build them from with 'settings'
+        self.accounts = [account if isinstance(account, API)
+                         else API(filepath=account, max_workers=max_workers, codec=codec, hooks=hooks, **settings)
+                         for account in accounts]
+        for account in self.accounts:
+            # Ready-made APIs report to the pool's hooks too
+            for hook in hooks or []:
+                if hook not in account.hooks:
+                    account.hooks.append(hook)
+        self.strategy = strategy
+
+        # Pages are fetched with every account's share of workers
+        self.max_workers = max_workers * len(self.accounts)
+        self.codec = codec or self.accounts[0].codec
+        self.cache = cache
+        self.hooks = list(hooks or [])
+        self.stream = stream
+
+        self._lock = threading.Lock()
+        self._turn = itertools.count()
+        self._owners = dict()
+        self._in_flight = {id(account): 0 for account in self.accounts}
+        # 429 responses in a row of each account
+        self._throttled = {id(account): 0 for account in self.accounts}
+
+        # Requests sent through each account, in the order of self.accounts
+        self.sent = [0] * len(self.accounts)
+
+        self.get = GET(self)
+        self.post = POST(self)
+        self.patch = PATCH(self)
+        self.bulk = BULK(self)
+
+
+    #####################################
+    #                                   #
+    #             OWNERSHIP             #
+    #                                   #
+    #####################################
+
+    def discover(self):
+        """
+        Lists the tournaments of every account to learn which account serves which
+        """
+        with ThreadPoolExecutor(max_workers=len(self.accounts)) as executor:
+            listed = list(executor.map(carry_priority(lambda account: account.get.all_tournaments()), self.accounts))
+        for account, tournaments in zip(self.accounts, listed):
+            for tournament in tournaments or ():
+                self.assign(tournament.id, account)
+        return self
+
+    def assign(self, tournament_id, *accounts):
+        """
+        Records accounts as able to serve a tournament
+        """
+        with self._lock:
+            owners = self._owners.setdefault(tournament_id, [])
+            for account in accounts:
+                if account not in owners:
+                    owners.append(account)
+
+    def owners(self, tournament_id):
+        """
+        Returns the accounts known to serve a tournament, None if it was never seen
+        """
+        with self._lock:
+            owners = self._owners.get(tournament_id)
+            return list(owners) if owners is not None else None
+
+
+    #####################################
+    #                                   #
+    #          CLASS UTILITIES          #
+    #                                   #
+    #####################################
+
+    def _request(self, method, scope, url, headers=None, endpoint=None, **kwargs):
+        """
+        Sends a request through the account best able to serve it, failing over to the others
+        """
+        match = _TOURNAMENT_URL.search(url)
+        tournament_id = match.group(1) if match else None
+        known = tournament_id is None or self.owners(tournament_id) is not None
+
+        tried = set()
+        throttled = set()
+        rounds = 0
+        response = None
+        while True:
+            account = self.__choose(tournament_id, tried)
+            if account is None:
+                # Every candidate is throttled, waiting for the first of them to be let through again
+                if not throttled or rounds >= self.__retries(throttled):
+                    return response
+                rounds += 1
+                time.sleep(self.__wait(throttled, rounds))
+                tried -= throttled
+                throttled.clear()
+                continue
+            tried.add(id(account))
+
+            try:
+                response = self.__send(account, method, scope, url, headers, endpoint, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                # A POST may have been processed, only another account's throttled retries are safe
+                if method == "POST" or self.__choose(tournament_id, tried) is None:
+                    raise
+                continue
+
+            status = response.status_code
+            if status == 429:
+                throttled.add(id(account))
+                continue
+            if tournament_id is not None and status == 403:
+                self.__revoke(tournament_id, account)
+                continue
+            if not known and status in FORBIDDEN_STATUS:
+                continue
+            if tournament_id is not None and status < 400:
+                self.assign(tournament_id, account)
+            return response
+
+    def __send(self, account, method, scope, url, headers=None, endpoint=None, **kwargs):
+        index = self.accounts.index(account)
+        with self._lock:
+            self._in_flight[id(account)] += 1
+            self.sent[index] += 1
+        try:
+            response = account._request(method, scope, url, headers, endpoint, retry_throttled=False, **kwargs)
+        finally:
+            with self._lock:
+                self._in_flight[id(account)] -= 1
+        with self._lock:
+            self._throttled[id(account)] = self._throttled[id(account)] + 1 if response.status_code == 429 else 0
+        return response
+
+    def __retries(self, throttled):
+        return max(a.rate_limiter.retries for a in self.accounts if id(a) in throttled)
+
+    def __wait(self, throttled, rounds):
+        """
+        Seconds until the first throttled account may be sent a request again
+        """
+        accounts = [a for a in self.accounts if id(a) in throttled]
+        paused = min(a.rate_limiter.paused for a in accounts)
+        return paused or min(a.rate_limiter.delay(rounds) for a in accounts)
+
+    def __choose(self, tournament_id, tried):
+        """
+        Returns the account to send the next attempt of a request through, None if none is left
+        """
+        with self._lock:
+            owners = self._owners.get(tournament_id) if tournament_id is not None else None
+            candidates = [a for a in (owners if owners else self.accounts) if id(a) not in tried]
+            if not candidates:
+                return None
+            # Starting from the next account in turn spreads ties evenly
+            turn = next(self._turn) % len(candidates)
+            candidates = candidates[turn:] + candidates[:turn]
+            if self.strategy == 'round_robin':
+                return min(candidates, key=lambda a: (a.rate_limiter.paused, self._throttled[id(a)]))
+            return min(candidates, key=lambda a: (a.rate_limiter.paused, self._throttled[id(a)],
+                                                  self._in_flight[id(a)] / max(1, a.rate_limiter.concurrency)))
+
+    def __revoke(self, tournament_id, account):
+        with self._lock:
+            owners = self._owners.get(tournament_id)
+            if owners and account in owners:
+                owners.remove(account)
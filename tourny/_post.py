@@ -1,4 +1,3 @@
-import json
 from .TournamentItems import Tournament, Team, Match, Game
 
 class POST():
@@ -15,7 +14,7 @@ class POST():
         scope = 'organizer:admin'
         url = "https://api.toornament.com/organizer/v2/tournaments"
         url_kwargs = {}
-        return self.__post(tournament.json(), scope, url, **url_kwargs)
+        return self.__post(tournament.dumps(codec=self._api.codec), scope, url, **url_kwargs)
 
     def team(self, tournament, team):
         """
@@ -24,28 +23,17 @@ class POST():
         scope = 'organizer:participant'
         url = "https://api.toornament.com/organizer/v2/tournaments/{tournament_id}/participants"
         url_kwargs = {'tournament_id': tournament.id}
-        return self.__post(team.json(), scope, url, **url_kwargs)
+        return self.__post(team.dumps(codec=self._api.codec), scope, url, **url_kwargs)
 
 
     def __post(self, data, scope, url, **url_kwargs):
         """
         Generalized function for sending POST requests
         """
-        headers = {
-            'authorization': "{0}".format(self._api.auth_tokens[scope])
-        }
-
-        response = self._api.session.request("POST", 
-                                             url.format(**url_kwargs),
-                                             headers=headers,
-                                             data=data)
-
-        if response.status_code == 401:
-            self._api.get_auth_token(scope)
-            headers['authorization'] = "{0}".format(self._api.auth_tokens[scope])
-            response = self._api.session.request("POST", 
-                                                 url.format(**url_kwargs),
-                                                 headers=headers,
-                                                 data=data)
+        response = self._api._request("POST", 
+                                      scope,
+                                      url.format(**url_kwargs),
+                                      data=data,
+                                      endpoint=url)
 
         return response                                
\ No newline at end of file
@@ -0,0 +1,137 @@
+from datetime import date
+
+# Kinds of filter values
+LIST = 'list'
+FLAG = 'flag'
+DATE = 'date'
+TEXT = 'text'
+
+# Filters every collection accepts,
+# https://developer.toornament.com/v2/doc/organizer_tournaments#get:tournaments
+FILTERS = {
+    'tournaments': {'ids': LIST, 'disciplines': LIST, 'statuses': LIST, 'countries': LIST, 'platforms': LIST,
+                    'scheduled_before': DATE, 'scheduled_after': DATE, 'is_online': FLAG, 'archived': FLAG},
+    'matches': {'ids': LIST, 'stage_ids': LIST, 'stage_numbers': LIST, 'group_ids': LIST, 'group_numbers': LIST,
+                'round_ids': LIST, 'round_numbers': LIST, 'statuses': LIST, 'participant_ids': LIST,
+                'is_scheduled': FLAG, 'scheduled_before': DATE, 'scheduled_after': DATE},
+    'games': {},
+    'participants': {'ids': LIST, 'name': TEXT, 'custom_user_identifier': TEXT},
+}
+
+# Orders every collection can be sorted in
+SORTS = {
+    'tournaments': ('created_asc', 'created_desc', 'scheduled_asc', 'scheduled_desc'),
+    'matches': ('structure', 'schedule', 'latest'),
+    'games': (),
+    'participants': ('created_asc', 'created_desc', 'alphabetic'),
+}
+
+# Values a filter is limited to
+CHOICES = {
+    ('tournaments', 'statuses'): ('pending', 'running', 'completed'),
+    ('matches', 'statuses'): ('pending', 'running', 'completed'),
+}
+
+class Query():
+    """
+    Filters and order of a collection, sent along as query parameters so only
+    the matching items are transferred.
+
+        running = api.get.query('matches', tournament).where(status='running').sort('schedule').all()
+
+    where() and sort() return a new query. Filters are checked against the
+    ones the collection accepts; a filter on a list field also takes a single
+    value under its singular name (status='running' for statuses).
+    """
+    def __init__(self, runner, request, filters=None, order=None):
+        self._runner = runner
+        self.request = request
+        self.filters = dict(filters or {})
+        self.order = order
+
+
+    def where(self, **filters):
+        """
+        Returns the query with more filters
+        """
+        unit = self.request.range_unit
+        accepted = FILTERS.get(unit, {})
+        merged = dict(self.filters)
+        for name, value in filters.items():
+            plural = next((p for p in (name + 's', name + 'es') if accepted.get(p) == LIST), None)
+            if name not in accepted and plural is not None:
+                name, value = plural, [value]
+            if name not in accepted:
+                raise TypeError(f"Unknown filter '{name}' for {unit}, expected one of {', '.join(sorted(accepted))}")
+            merged[name] = _encode(unit, name, accepted[name], value)
+        return Query(self._runner, self.request, merged, self.order)
+
+    def sort(self, order):
+        """
+        Returns the query sorted in another order
+        """
+        unit = self.request.range_unit
+        if order not in SORTS.get(unit, ()):
+            raise ValueError(f"Unknown sort '{order}' for {unit}, expected one of {', '.join(SORTS.get(unit, ()))}")
+        return Query(self._runner, self.request, self.filters, order)
+
+    @property
+    def params(self):
+        """
+        The query parameters of the query
+        """
+        params = dict(self.filters)
+        if self.order is not None:
+            params['sort'] = self.order
+        return params
+
+
+    def all(self):
+        """
+        Returns every matching item, pages are fetched concurrently
+        """
+        return self._runner._run(self, 'all')
+
+    def iter(self):
+        """
+        Yields every matching item, one page at a time
+        """
+        return self._runner._run(self, 'iter')
+
+    def page(self, range_values=None):
+        """
+        Returns one page of matching items, the first one by default
+        """
+        return self._runner._run(self, 'page', range_values)
+
+    def __repr__(self):
+        return f"Query ({self.request.range_unit}, {self.params})"
+
+
+
+def _encode(unit, name, kind, value):
+    """
+    Returns the query parameter value of a filter, checking it on the way
+    """
+    if kind == LIST:
+        values = [value] if isinstance(value, (str, int)) else list(value)
+        if not values:
+            raise ValueError(f"Filter '{name}' needs at least one value")
+        choices = CHOICES.get((unit, name))
+        for v in values:
+            if choices is not None and v not in choices:
+                raise ValueError(f"Unknown value '{v}' for '{name}', expected one of {', '.join(choices)}")
+        return ','.join(str(v) for v in values)
+    if kind == FLAG:
+        if not isinstance(value, bool):
+            raise ValueError(f"Filter '{name}' takes True or False")
+        return '1' if value else '0'
+    if kind == DATE:
+        if isinstance(value, date):
+            return value.isoformat()
+        if not isinstance(value, str):
+            raise ValueError(f"Filter '{name}' takes a date, datetime or ISO 8601 string")
+        return value
+    if not isinstance(value, str):
+        raise ValueError(f"Filter '{name}' takes a string")
+    return value
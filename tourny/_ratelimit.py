@@ -0,0 +1,200 @@
+import itertools
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+# Status codes worth sending a request again for
+TRANSIENT_STATUS = (429, 500, 502, 503, 504)
+
+class RateLimiter():
+    """
+    Client side rate limiting shared by every request made with one API key.
+
+    Requests first take a token from a bucket refilled at 'rate' per second
+    (no limit when rate is None), then a slot in a concurrency window. The
+    window grows by one slot per window of successful requests and is halved
+    whenever the server throttles (AIMD), so parallel callers settle just under
+    the server's limits instead of hitting them.
+
+    Waiting requests are let through by rank (lower first, then in arrival
+    order), so once the window is full a write can still overtake queued
+    pages. A request waiting longer than its max_wait goes first whatever its
+    rank.
+    """
+    __limiters = dict()
+    __limiters_lock = threading.Lock()
+
+    def __init__(self, rate=None, burst=None, max_concurrency=32, min_concurrency=1,
+                 retries=4, backoff=0.5, max_backoff=30.0):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate or 1.0)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        # Times a throttled or failed request is retried, with jittered exponential backoff
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self._condition = threading.Condition()
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._limit = float(max_concurrency)
+        self._in_flight = 0
+        self._tickets = itertools.count()
+        self._waiting = dict()
+
+        self.throttled = 0
+
+    @classmethod
+    def for_key(cls, key, **settings):
+        """
+        Returns the limiter shared by all clients using an API key, settings update it
+        """
+        with cls.__limiters_lock:
+            limiter = cls.__limiters.get(key)
+            if limiter is None:
+                limiter = cls.__limiters[key] = cls(**settings)
+            else:
+                limiter.configure(**settings)
+            return limiter
+
+    def configure(self, **settings):
+        with self._condition:
+            for name, value in settings.items():
+                if not hasattr(self, name) or name.startswith('_'):
+                    raise TypeError(f"Unknown rate limiter setting '{name}'")
+                setattr(self, name, value)
+            self._limit = min(self._limit, float(self.max_concurrency))
+            self._condition.notify_all()
+
+    @property
+    def concurrency(self):
+        """
+        Current size of the concurrency window
+        """
+        return int(self._limit)
+
+    @property
+    def paused(self):
+        """
+        Seconds left before requests may be sent again, 0 if they may be now
+        """
+        return max(0.0, self._paused_until - time.monotonic())
+
+    def acquire(self, rank=0, max_wait=None):
+        """
+        Blocks until a request of a rank may be sent
+        """
+        ticket = (next(self._tickets), rank, time.monotonic(), max_wait)
+        with self._condition:
+            self._waiting[ticket[0]] = ticket
+            try:
+                while True:
+                    if self.__next() is not ticket:
+                        # Only the first waiting request watches the clock, the others wait their
+                        # turn, waking up in time to be promoted if they waited too long
+                        self._condition.wait(max_wait)
+                        continue
+                    now = time.monotonic()
+                    wait = self._paused_until - now
+                    if wait <= 0 and self.rate is not None:
+                        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                        self._updated = now
+                        if self._tokens < 1:
+                            wait = (1 - self._tokens) / self.rate
+                    if wait <= 0 and self._in_flight >= int(self._limit):
+                        wait = None
+                    if wait is None or wait > 0:
+                        self._condition.wait(wait)
+                        continue
+
+                    if self.rate is not None:
+                        self._tokens -= 1
+                    self._in_flight += 1
+                    return
+            finally:
+                del self._waiting[ticket[0]]
+                self._condition.notify_all()
+
+    def release(self, throttled=False):
+        """
+        Frees the slot of a finished request, shrinking the window if it was throttled
+        """
+        with self._condition:
+            self._in_flight -= 1
+            if throttled:
+                self.throttled += 1
+                self._limit = max(float(self.min_concurrency), self._limit / 2)
+            else:
+                self._limit = min(float(self.max_concurrency), self._limit + 1 / self._limit)
+            self._condition.notify_all()
+
+    def pause(self, seconds):
+        """
+        Holds every request back for a number of seconds, e.g. as asked by Retry-After
+        """
+        with self._condition:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def delay(self, attempt, retry_after=None):
+        """
+        Seconds to wait before retry number 'attempt' (starting at 1)
+        """
+        if retry_after is not None:
+            return min(retry_after, self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+
+    def __call__(self, rank=0, max_wait=None):
+        return _Slot(self, rank, max_wait)
+
+    def __next(self):
+        """
+        Returns the waiting ticket to be let through first
+        """
+        now = time.monotonic()
+        best = None
+        best_key = None
+        for ticket in self._waiting.values():
+            number, rank, queued, max_wait = ticket
+            promoted = max_wait is not None and now - queued > max_wait
+            key = (not promoted, rank if not promoted else 0, number)
+            if best_key is None or key < best_key:
+                best, best_key = ticket, key
+        return best
+
+
+
+class _Slot():
+    """
+    Context manager holding a slot of a RateLimiter
+    """
+    def __init__(self, limiter, rank=0, max_wait=None):
+        self._limiter = limiter
+        self._rank = rank
+        self._max_wait = max_wait
+        self.throttled = False
+
+    def __enter__(self):
+        self._limiter.acquire(self._rank, self._max_wait)
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self._limiter.release(throttled=self.throttled or exc_type is not None)
+
+
+def retry_after(response):
+    """
+    Reads the Retry-After header of a response in seconds, None if missing
+    """
+    value = response.headers.get('retry-after')
+    if value is None:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
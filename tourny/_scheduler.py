@@ -0,0 +1,169 @@
+import itertools
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from ._metrics import count_queue_delay
+
+# Priority classes, most urgent first
+PRIORITIES = ('live', 'interactive', 'background')
+
+# Priority class forced by Scheduler.priority() for requests sent in this context
+_forced = ContextVar('forced_priority', default=None)
+
+def carry_priority(func):
+    """
+    Wraps a function run by a worker thread to keep the priority class forced by the caller
+    """
+    forced = _forced.get()
+    if forced is None:
+        return func
+
+    def run(*args, **kwargs):
+        token = _forced.set(forced)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _forced.reset(token)
+    return run
+
+SchedulerStats = namedtuple('SchedulerStats', ['in_flight', 'waiting', 'granted', 'promoted', 'mean_wait',
+                                               'max_wait'])
+
+class Scheduler():
+    """
+    Orders the requests of an API by priority class once they have to queue.
+
+    Writes (PATCH, POST) are 'live', lookups by id 'interactive' and pages of
+    collections 'background', unless priority() says otherwise. At most
+    max_concurrency requests are sent at once and each class at most its
+    limit, so the default limits keep slots free for live requests however
+    many pages are queued. When a slot frees up it goes to the most urgent
+    class waiting, except that a request queued longer than max_wait seconds
+    goes first whatever its class, so background work is never starved.
+
+        api = API(scheduler=Scheduler())
+        with api.scheduler.priority('background'):
+            api.get.match_by_id(tournament.id, match_id)
+    """
+    def __init__(self, max_concurrency=16, limits=None, max_wait=2.0):
+        self.max_concurrency = max_concurrency
+        # Most requests of each class sent at once
+        self.limits = {'live': max_concurrency,
+                       'interactive': max(1, max_concurrency * 3 // 4),
+                       'background': max(1, max_concurrency // 2)}
+        for name, limit in (limits or {}).items():
+            if name not in PRIORITIES:
+                raise ValueError(f"Unknown priority class '{name}', expected one of {', '.join(PRIORITIES)}")
+            self.limits[name] = limit
+        self.max_wait = max_wait
+
+        self._condition = threading.Condition()
+        self._tickets = itertools.count()
+        self._waiting = dict()
+        self._in_flight = {name: 0 for name in PRIORITIES}
+        self._granted = {name: 0 for name in PRIORITIES}
+        self._promoted = {name: 0 for name in PRIORITIES}
+        self._waited = {name: 0.0 for name in PRIORITIES}
+        self._max_waited = {name: 0.0 for name in PRIORITIES}
+
+
+    def classify(self, method, headers=None):
+        """
+        Returns the priority class of a request
+        """
+        forced = _forced.get()
+        if forced is not None:
+            return forced
+        if method != "GET":
+            return 'live'
+        if headers and any(key.lower() == 'range' for key in headers):
+            return 'background'
+        return 'interactive'
+
+    @contextmanager
+    def priority(self, name):
+        """
+        Sends the requests made inside it with a given priority class, including
+        those of the worker threads the client starts for them
+        """
+        if name not in PRIORITIES:
+            raise ValueError(f"Unknown priority class '{name}', expected one of {', '.join(PRIORITIES)}")
+        token = _forced.set(name)
+        try:
+            yield
+        finally:
+            _forced.reset(token)
+
+    @contextmanager
+    def slot(self, name):
+        """
+        Holds a slot of a priority class while a request is sent
+        """
+        self.acquire(name)
+        try:
+            yield
+        finally:
+            self.release(name)
+
+    def acquire(self, name):
+        """
+        Blocks until a request of a priority class may be sent
+        """
+        ticket = (next(self._tickets), name, time.monotonic())
+        with self._condition:
+            self._waiting[ticket[0]] = ticket
+            try:
+                while self.__next() is not ticket:
+                    # Waking up in time to promote a request that waited too long
+                    self._condition.wait(self.max_wait)
+            finally:
+                del self._waiting[ticket[0]]
+            waited = time.monotonic() - ticket[2]
+            self._in_flight[name] += 1
+            self._granted[name] += 1
+            self._waited[name] += waited
+            self._max_waited[name] = max(self._max_waited[name], waited)
+            if waited > self.max_wait:
+                self._promoted[name] += 1
+            self._condition.notify_all()
+        count_queue_delay(name, waited)
+
+    def release(self, name):
+        with self._condition:
+            self._in_flight[name] -= 1
+            self._condition.notify_all()
+
+    def stats(self):
+        """
+        Returns the SchedulerStats of every priority class
+        """
+        with self._condition:
+            waiting = [ticket[1] for ticket in self._waiting.values()]
+            return {name: SchedulerStats(self._in_flight[name], waiting.count(name), self._granted[name],
+                                         self._promoted[name],
+                                         self._waited[name] / self._granted[name] if self._granted[name] else 0.0,
+                                         self._max_waited[name])
+                    for name in PRIORITIES}
+
+
+    def __next(self):
+        """
+        Returns the waiting ticket to be granted a slot now, None if none may be
+        """
+        if sum(self._in_flight.values()) >= self.max_concurrency:
+            return None
+        now = time.monotonic()
+        best = None
+        best_key = None
+        for ticket in self._waiting.values():
+            number, name, queued = ticket
+            if self._in_flight[name] >= self.limits[name]:
+                continue
+            promoted = now - queued > self.max_wait
+            key = (not promoted, PRIORITIES.index(name) if not promoted else 0, number)
+            if best_key is None or key < best_key:
+                best, best_key = ticket, key
+        return best
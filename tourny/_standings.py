@@ -0,0 +1,310 @@
+import threading
+from collections import namedtuple
+
+from .TournamentItems import Match, Game
+
+# Counters kept for every participant, in the order of a record
+FIELDS = ('played', 'wins', 'draws', 'losses', 'forfeits', 'points', 'score_for', 'score_against',
+          'games_won', 'games_lost')
+_INDEX = {field: i for i, field in enumerate(FIELDS)}
+# Counter of each match result
+_RESULT_FIELDS = {'win': 'wins', 'draw': 'draws', 'loss': 'losses'}
+
+StandingRow = namedtuple('StandingRow', ['rank', 'participant_id', 'name', *FIELDS,
+                                         'score_difference', 'game_difference'])
+
+class Standings():
+    """
+    Group and league rankings computed locally from matches and games.
+
+    Every match (and game) adds its result to running totals per participant,
+    kept for its group and for its whole stage. Updating a match takes back
+    what its previous version added and adds the new one, so a changed result
+    only touches the participants of that match. Rankings are sorted on demand
+    and cached until one of their participants changes.
+
+    tiebreakers are record fields ('points', 'wins', 'score_difference',
+    'score_for', 'game_difference', ...) or 'head_to_head', the points earned
+    in matches between the participants still tied.
+    """
+    def __init__(self, points=None, tiebreakers=('points', 'head_to_head', 'score_difference', 'score_for'),
+                 include_running=False):
+        # Points awarded for a match result
+        self.points = {'win': 3, 'draw': 1, 'loss': 0, 'forfeit': 0}
+        self.points.update(points or {})
+        self.tiebreakers = tuple(tiebreakers)
+        # Whether matches still being played count towards the standings
+        self.include_running = include_running
+
+        self._lock = threading.RLock()
+        self._records = dict()
+        self._head_to_head = dict()
+        self._names = dict()
+        self._applied = dict()
+        self._groups = dict()
+        self._rankings = dict()
+
+
+    def attach(self, api):
+        """
+        Updates the standings with every match and game successfully patched through an API
+        """
+        api.patch.listeners.append(self.__on_patch)
+        return self
+
+    def load(self, matches, games=None):
+        """
+        Adds many matches at once, games optionally maps match ids to their games
+        """
+        with self._lock:
+            for match in matches:
+                self.update(match, games.get(match.id) if games else None)
+        return self
+
+
+    #####################################
+    #                                   #
+    #              UPDATES              #
+    #                                   #
+    #####################################
+
+    def update(self, match, games=None):
+        """
+        Applies the current state of a match, and of its games when given
+        """
+        with self._lock:
+            group = (getattr(match, 'stage_id', None), getattr(match, 'group_id', None))
+            self._groups[match.id] = group
+            self.__apply(('match', match.id), group, self.__match_changes(match))
+            for game in games or ():
+                self.update_game(match, game)
+
+    def update_game(self, match, game):
+        """
+        Applies the current state of one game of a match
+        """
+        with self._lock:
+            group = self._groups.get(match.id)
+            if group is None:
+                group = (getattr(match, 'stage_id', None), getattr(match, 'group_id', None))
+                self._groups[match.id] = group
+            self.__apply(('game', match.id, game.number), group, self.__game_changes(match, game))
+
+    def remove(self, match_id):
+        """
+        Takes back everything a match and its games added
+        """
+        with self._lock:
+            group = self._groups.pop(match_id, None)
+            for key in [k for k in self._applied if k[1] == match_id]:
+                self.__apply(key, group, ([], []))
+                del self._applied[key]
+
+
+    #####################################
+    #                                   #
+    #              RANKINGS             #
+    #                                   #
+    #####################################
+
+    def stages(self):
+        """
+        Returns the ids of the stages that have standings
+        """
+        with self._lock:
+            return sorted({key[0] for key in self._records}, key=str)
+
+    def groups(self):
+        """
+        Returns the (stage_id, group_id) pairs that have standings
+        """
+        with self._lock:
+            return sorted({key for key in self._records if key[1] is not None},
+                          key=lambda key: tuple(str(k) for k in key))
+
+    def ranking(self, stage_id=None, group_id=None):
+        """
+        Returns the StandingRows of a group, or of the whole stage (league) when group_id is None
+        """
+        key = (stage_id, group_id)
+        with self._lock:
+            ranking = self._rankings.get(key)
+            if ranking is None:
+                ranking = self._rankings[key] = self.__rank(key)
+            return ranking
+
+    def record(self, participant_id, stage_id=None, group_id=None):
+        """
+        Returns the StandingRow of one participant, None if it has no matches
+        """
+        for row in self.ranking(stage_id, group_id):
+            if row.participant_id == participant_id:
+                return row
+        return None
+
+
+    #####################################
+    #                                   #
+    #          CLASS UTILITIES          #
+    #                                   #
+    #####################################
+
+    def __on_patch(self, item, tournament=None, match=None):
+        if isinstance(item, Match):
+            self.update(item)
+        elif isinstance(item, Game) and match is not None:
+            self.update_game(match, item)
+
+    def __buckets(self, group):
+        """
+        Keys of the totals a match of a group counts towards: its group and its stage
+        """
+        stage_id, group_id = group
+        return [(stage_id, group_id), (stage_id, None)] if group_id is not None else [(stage_id, None)]
+
+    def __apply(self, key, group, changes):
+        """
+        Replaces what a match or game added before with 'changes'
+        """
+        previous_group, previous = self._applied.get(key, (group, ([], [])))
+        self.__add(previous_group, previous, -1)
+        self.__add(group, changes, 1)
+        self._applied[key] = (group, changes)
+
+    def __add(self, group, changes, sign):
+        records, head_to_head = changes
+        if not records and not head_to_head:
+            return
+        for bucket in self.__buckets(group):
+            totals = self._records.setdefault(bucket, dict())
+            for participant_id, delta in records:
+                record = totals.get(participant_id)
+                if record is None:
+                    record = totals[participant_id] = [0] * len(FIELDS)
+                for i, value in delta:
+                    record[i] += sign * value
+                if sign < 0 and not any(record):
+                    del totals[participant_id]
+            pairs = self._head_to_head.setdefault(bucket, dict())
+            for pair, value in head_to_head:
+                pairs[pair] = pairs.get(pair, 0) + sign * value
+            self._rankings.pop(bucket, None)
+
+    def __match_changes(self, match):
+        """
+        Returns the record deltas and head to head points a match adds
+        """
+        status = getattr(match, 'status', None)
+        if status != 'completed' and not (self.include_running and status == 'running'):
+            return [], []
+
+        opponents = [o for o in match.opponents if o.get('participant')]
+        records = []
+        earned = []
+        for opponent in opponents:
+            participant = opponent['participant']
+            self._names[participant['id']] = participant.get('name')
+            result = _result(opponent, opponents)
+            points = self.points['forfeit'] if opponent.get('forfeit') else self.points.get(result, 0)
+            score_for = opponent.get('score') or 0
+            score_against = sum(o.get('score') or 0 for o in opponents if o is not opponent)
+            delta = [(_INDEX['played'], 1), (_INDEX['points'], points),
+                     (_INDEX['score_for'], score_for), (_INDEX['score_against'], score_against)]
+            if result in _RESULT_FIELDS:
+                delta.append((_INDEX[_RESULT_FIELDS[result]], 1))
+            if opponent.get('forfeit'):
+                delta.append((_INDEX['forfeits'], 1))
+            records.append((participant['id'], delta))
+            earned.append((participant['id'], points))
+
+        head_to_head = [((a, b), points) for a, points in earned for b, _ in earned if a != b]
+        return records, head_to_head
+
+    def __game_changes(self, match, game):
+        """
+        Returns the games won and lost a game adds to the participants of its match
+        """
+        if getattr(game, 'status', None) != 'completed':
+            return [], []
+        participants = {o.get('number'): o['participant']['id'] for o in match.opponents
+                        if o.get('participant')}
+        opponents = [o for o in game.opponents if o.get('number') in participants]
+        records = []
+        for opponent in opponents:
+            result = _result(opponent, opponents)
+            if result in ('win', 'loss'):
+                field = 'games_won' if result == 'win' else 'games_lost'
+                records.append((participants[opponent['number']], [(_INDEX[field], 1)]))
+        return records, []
+
+    def __rank(self, bucket):
+        totals = self._records.get(bucket, {})
+        head_to_head = self._head_to_head.get(bucket, {})
+
+        def value(participant_id, field):
+            record = totals[participant_id]
+            if field == 'score_difference':
+                return record[_INDEX['score_for']] - record[_INDEX['score_against']]
+            if field == 'game_difference':
+                return record[_INDEX['games_won']] - record[_INDEX['games_lost']]
+            return record[_INDEX[field]]
+
+        def order(participants, tiebreakers):
+            # Sorts by the tiebreakers up to head_to_head, then breaks the remaining ties among themselves
+            if not tiebreakers:
+                return [participants]
+            if 'head_to_head' in tiebreakers:
+                split = tiebreakers.index('head_to_head')
+                before, after = tiebreakers[:split], tiebreakers[split + 1:]
+            else:
+                before, after = tiebreakers, ()
+            key = lambda p: tuple(-value(p, field) for field in before)
+
+            ranked = []
+            for tied in _runs(sorted(participants, key=key), key):
+                if len(tied) > 1 and 'head_to_head' in tiebreakers:
+                    points = lambda p: -sum(head_to_head.get((p, q), 0) for q in tied if q != p)
+                    for still_tied in _runs(sorted(tied, key=points), points):
+                        ranked += order(still_tied, after) if len(still_tied) > 1 and after else [still_tied]
+                else:
+                    ranked.append(tied)
+            return ranked
+
+        rows = []
+        for tied in order(list(totals), self.tiebreakers):
+            rank = len(rows) + 1
+            for participant_id in sorted(tied, key=str):
+                record = totals[participant_id]
+                rows.append(StandingRow(rank, participant_id, self._names.get(participant_id), *record,
+                                        value(participant_id, 'score_difference'),
+                                        value(participant_id, 'game_difference')))
+        return rows
+
+
+
+def _runs(ordered, key):
+    """
+    Splits a sorted list into runs of equal keys
+    """
+    runs = []
+    for item in ordered:
+        if runs and key(runs[-1][0]) == key(item):
+            runs[-1].append(item)
+        else:
+            runs.append([item])
+    return runs
+
+
+def _result(opponent, opponents):
+    """
+    Returns the result of an opponent, derived from the scores when none was reported
+    """
+    result = opponent.get('result')
+    if result is not None:
+        return result
+    score = opponent.get('score')
+    others = [o.get('score') for o in opponents if o is not opponent]
+    if score is None or not others or any(s is None for s in others):
+        return None
+    best = max(others)
+    return 'win' if score > best else 'draw' if score == best else 'loss'
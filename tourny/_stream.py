@@ -0,0 +1,88 @@
+import codecs
+import json
+
+# Bytes read from a streamed response at a time
+CHUNK_SIZE = 16384
+
+_WHITESPACE = ' \t\n\r'
+# Characters that may go on a number
+_NUMBER = '0123456789.eE+-'
+_decoder = json.JSONDecoder()
+
+class ArrayStream():
+    """
+    The elements of a JSON array response body, decoded one by one as the body is read.
+
+    The response is closed once every element was read, or by close() when
+    the rest is not needed.
+    """
+    def __init__(self, response, chunk_size=CHUNK_SIZE):
+        self._response = response
+        self.chunk_size = chunk_size
+
+    def __iter__(self):
+        try:
+            yield from iter_array(self._response.iter_content(self.chunk_size))
+        finally:
+            self.close()
+
+    def close(self):
+        self._response.close()
+
+
+
+def iter_array(chunks):
+    """
+    Yields the elements of a JSON array split over chunks of UTF-8 bytes as soon as each is complete
+    """
+    decode = codecs.getincrementaldecoder('utf-8')().decode
+    chunks = iter(chunks)
+    buffer, position = '', 0
+    exhausted = False
+    # 'start' before the opening bracket, 'first' before the first element, 'next' after one
+    state = 'start'
+
+    while True:
+        while position < len(buffer) and buffer[position] in _WHITESPACE:
+            position += 1
+
+        if position < len(buffer):
+            char = buffer[position]
+            if state == 'start':
+                if char != '[':
+                    raise ValueError(f"Expected a JSON array, found {char!r}")
+                position += 1
+                state = 'first'
+                continue
+            if char == ']' and state in ('first', 'next'):
+                return
+            if state == 'next':
+                if char != ',':
+                    raise ValueError(f"Expected ',' or ']' between array elements, found {char!r}")
+                position += 1
+                state = 'element'
+                continue
+
+            try:
+                value, end = _decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if exhausted:
+                    raise
+                end = None
+            # A number at the end of what was read so far may go on in the next chunk
+            if end is not None and (exhausted or isinstance(value, (dict, list, str))
+                                    or (end < len(buffer) and buffer[end] not in _NUMBER)):
+                position = end
+                state = 'next'
+                yield value
+                continue
+        elif exhausted:
+            raise ValueError("JSON array ended before its closing bracket")
+
+        chunk = next(chunks, None)
+        if chunk is None:
+            exhausted = True
+            text = decode(b'', final=True)
+        else:
+            text = decode(chunk)
+        buffer, position = buffer[position:] + text, 0
@@ -0,0 +1,174 @@
+import sys
+import threading
+from collections import namedtuple
+
+InternStats = namedtuple('InternStats', ['participants', 'teams', 'references', 'strings', 'duplicates',
+                                         'saved_bytes'])
+
+# Match statuses whose games are not worth fetching, they have no results yet
+NO_GAMES_STATUSES = ('pending',)
+
+class ParticipantIndex():
+    """
+    Identity map of the participants of one tournament.
+
+    Every participant dict found in match and game opponents is replaced by
+    one canonical dict per participant id, as long as they hold the same
+    data, so thousands of matches share a few hundred participant records.
+    Ids, names and result strings are de-duplicated along the way, and the
+    Team loaded for a participant id is kept so opponents can be linked to it.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._participants = dict()
+        self._teams = dict()
+        self._strings = dict()
+
+        self.references = 0
+        self.duplicates = 0
+        self.saved_bytes = 0
+
+
+    def string(self, value):
+        """
+        Returns the canonical copy of a string
+        """
+        if type(value) is not str:
+            return value
+        canonical = self._strings.setdefault(value, value)
+        if canonical is not value:
+            self.saved_bytes += sys.getsizeof(value)
+        return canonical
+
+    def participant(self, data):
+        """
+        Returns the canonical dict of a participant dict
+        """
+        with self._lock:
+            return self.__participant(data)
+
+    def intern(self, item):
+        """
+        Makes the opponents of a Match or Game share canonical participants and strings
+        """
+        opponents = getattr(item, 'opponents', None)
+        with self._lock:
+            if getattr(item, 'id', None) is not None:
+                object.__setattr__(item, 'id', self.string(item.id))
+            for i, opponent in enumerate(opponents or ()):
+                if not isinstance(opponent, dict):
+                    continue
+                interned = {self.string(key): self.string(value) for key, value in opponent.items()}
+                if isinstance(interned.get('participant'), dict):
+                    interned['participant'] = self.__participant(interned['participant'])
+                opponents[i] = interned
+        return item
+
+    def add_team(self, team):
+        """
+        Keeps the Team of a participant, sharing its id and name strings
+        """
+        with self._lock:
+            object.__setattr__(team, 'id', self.string(team.id))
+            object.__setattr__(team, 'name', self.string(team.name))
+            self._teams[team.id] = team
+        return team
+
+    def team(self, participant_id):
+        """
+        Returns the Team of a participant id, None if it was not loaded
+        """
+        return self._teams.get(participant_id)
+
+    def stats(self):
+        """
+        Returns an InternStats of what was shared so far
+        """
+        with self._lock:
+            return InternStats(len(self._participants), len(self._teams), self.references, len(self._strings),
+                               self.duplicates, self.saved_bytes)
+
+
+    def __participant(self, data):
+        self.references += 1
+        participant_id = self.string(data.get('id'))
+        canonical = self._participants.get(participant_id)
+        if canonical is None:
+            canonical = {self.string(key): self.string(value) for key, value in data.items()}
+            self._participants[participant_id] = canonical
+            return canonical
+        if canonical is data:
+            return canonical
+        if canonical != data:
+            # Another version of the participant, only its strings are shared
+            return {self.string(key): self.string(value) for key, value in data.items()}
+        self.duplicates += 1
+        self.saved_bytes += _sizeof(data)
+        return canonical
+
+
+
+class TournamentTree():
+    """
+    A tournament with its participants, matches and games, linked together.
+
+    Match opponents share the participant dicts of the ParticipantIndex in
+    'participants', and opponents() links them to the shared Team objects.
+    """
+    def __init__(self, tournament, teams, matches, games, participants):
+        self.tournament = tournament
+        # Team of every participant id, in the order they were listed
+        self.teams = teams
+        self.matches = matches
+        # Games of every match id, only for matches whose games were fetched
+        self.games = games
+        self.participants = participants
+
+        self._matches_by_id = {match.id: match for match in matches}
+
+
+    def match(self, match_id):
+        return self._matches_by_id.get(match_id)
+
+    def opponents(self, item, match=None):
+        """
+        Returns the Teams facing each other in a match, or in a game of 'match'.
+
+        Participants without a loaded Team are given as their participant dict,
+        empty slots as None.
+        """
+        by_number = dict()
+        if match is not None:
+            by_number = {o.get('number'): o.get('participant') for o in match.opponents}
+        teams = []
+        for opponent in item.opponents:
+            participant = opponent.get('participant') or by_number.get(opponent.get('number'))
+            if participant is None:
+                teams.append(None)
+            else:
+                teams.append(self.participants.team(participant.get('id')) or participant)
+        return teams
+
+    def matches_of(self, participant_id):
+        """
+        Returns the matches a participant plays in
+        """
+        return [match for match in self.matches
+                if any((o.get('participant') or {}).get('id') == participant_id for o in match.opponents)]
+
+    def __repr__(self):
+        return (f"TournamentTree ({len(self.teams)} participants, {len(self.matches)} matches, "
+                f"{sum(len(g) for g in self.games.values())} games)")
+
+
+
+def _sizeof(value):
+    """
+    Rough size in bytes of a decoded JSON value
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_sizeof(k) + _sizeof(v) for k, v in value.items())
+    elif isinstance(value, list):
+        size += sum(_sizeof(v) for v in value)
+    return size
@@ -0,0 +1,340 @@
+import hashlib
+import hmac
+import json
+import threading
+import time
+from collections import namedtuple, OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .TournamentItems import Tournament, Team, Match, Game
+
+class WebhookEvent(namedtuple('WebhookEvent', ['id', 'name', 'object_type', 'action', 'object_id',
+                                               'tournament_id', 'data', 'received_at'])):
+    """
+    A webhook notification, e.g. name 'match.updated' for object_type 'match' and action 'updated'.
+
+    'data' is the notification as it was posted.
+    """
+    __slots__ = ()
+
+    @property
+    def item(self):
+        """
+        The changed object built from the notification, None if it only holds ids
+        """
+        item_class = ITEM_CLASSES.get(self.object_type)
+        payload = self.data.get('object')
+        if item_class is None or not isinstance(payload, dict):
+            return None
+        return item_class.from_dict(payload)
+
+
+
+class TournamentEvent(WebhookEvent):
+    __slots__ = ()
+
+class MatchEvent(WebhookEvent):
+    __slots__ = ()
+
+class GameEvent(WebhookEvent):
+    __slots__ = ()
+
+class ParticipantEvent(WebhookEvent):
+    __slots__ = ()
+
+class RegistrationEvent(WebhookEvent):
+    __slots__ = ()
+
+
+# Event class of every object type, others are plain WebhookEvents
+EVENT_CLASSES = {
+    'tournament': TournamentEvent,
+    'match': MatchEvent,
+    'match_game': GameEvent,
+    'game': GameEvent,
+    'participant': ParticipantEvent,
+    'registration': RegistrationEvent,
+}
+
+ITEM_CLASSES = {
+    'tournament': Tournament,
+    'match': Match,
+    'match_game': Game,
+    'game': Game,
+    'participant': Team,
+}
+
+
+class WebhookReceiver():
+    """
+    Receives toornament.com webhook notifications and dispatches them as typed events.
+
+    Notifications are checked against an HMAC-SHA256 signature of the body
+    when a secret is given, and ones already seen (by id) are dropped.
+    handle() can be called from any web framework, or serve() runs a small
+    HTTP server in the background:
+
+        receiver = WebhookReceiver(secret=...)
+        receiver.on('match', lambda event: print(event.object_id))
+        receiver.attach(api, standings)
+        receiver.serve(port=8080)
+    """
+    def __init__(self, secret=None, signature_header='X-Webhook-Signature', max_seen=10000):
+        self.secret = secret.encode('utf-8') if isinstance(secret, str) else secret
+        self.signature_header = signature_header
+        # Number of notification ids remembered to drop duplicates
+        self.max_seen = max_seen
+
+        self._handlers = []
+        self._seen = OrderedDict()
+        # Ids being dispatched, only remembered as seen once their handlers succeeded
+        self._in_flight = set()
+        self._lock = threading.Lock()
+        self._httpd = None
+
+        self.received = 0
+        self.duplicates = 0
+        self.rejected = 0
+
+
+    def on(self, name, handler):
+        """
+        Calls handler(event) for events matching a name ('match.updated'), an
+        object type ('match') or '*' for every event
+        """
+        self._handlers.append((name, handler))
+        return handler
+
+    def attach(self, api, *targets):
+        """
+        Applies events to the API's cache and match events to targets such as Standings.
+
+        The by-id cache entry of a changed object is dropped, and for a game
+        the one of its match too; changed matches are passed to every target's
+        update(), looked up once when the notification does not hold the whole
+        match.
+        """
+        def apply(event):
+            if event.tournament_id is None:
+                return
+            if api.cache is not None:
+                for url in _object_urls(event):
+                    api.cache.invalidate(url)
+            if not targets or not isinstance(event, MatchEvent) or event.object_id is None:
+                return
+            if event.action == 'deleted':
+                for target in targets:
+                    target.remove(event.object_id)
+                return
+            payload = event.data.get('object')
+            if isinstance(payload, dict) and 'opponents' in payload and 'status' in payload:
+                match = event.item
+            else:
+                match = api.get.match_by_id(event.tournament_id, event.object_id)
+            if match is not None:
+                for target in targets:
+                    target.update(match)
+        return self.on('*', apply)
+
+
+    #####################################
+    #                                   #
+    #              RECEIVING            #
+    #                                   #
+    #####################################
+
+    def handle(self, body, headers=None):
+        """
+        Processes the raw body and headers of a posted notification.
+
+        Returns the HTTP status to answer with and the events that were dispatched.
+        """
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+        if not self.verify(body, headers.get(self.signature_header.lower())):
+            with self._lock:
+                self.rejected += 1
+            return 401, []
+
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return 400, []
+        notifications = data if isinstance(data, list) else [data]
+        if not all(isinstance(n, dict) for n in notifications):
+            return 400, []
+
+        events = []
+        for notification in notifications:
+            event = parse_event(notification)
+            key = event.id or hashlib.sha256(json.dumps(notification, sort_keys=True).encode()).hexdigest()
+            if not self.__claim(key):
+                continue
+            try:
+                self.dispatch(event)
+            except Exception:
+                # Let the sender deliver it again
+                self.__release(key)
+                return 500, events
+            self.__remember(key)
+            events.append(event)
+        return 200, events
+
+    def verify(self, body, signature):
+        """
+        Checks the signature of a body, always true without a secret
+        """
+        if self.secret is None:
+            return True
+        if not signature:
+            return False
+        if '=' in signature:
+            # e.g. 'sha256=<hex digest>'
+            signature = signature.split('=', 1)[1]
+        return hmac.compare_digest(sign(body, self.secret).encode(), signature.strip().encode('utf-8', 'replace'))
+
+    def dispatch(self, event):
+        """
+        Calls the handlers matching an event
+        """
+        with self._lock:
+            self.received += 1
+        for name, handler in self._handlers:
+            if name in ('*', event.name, event.object_type):
+                handler(event)
+
+
+    #####################################
+    #                                   #
+    #               SERVER              #
+    #                                   #
+    #####################################
+
+    def serve(self, host='127.0.0.1', port=0, path='/'):
+        """
+        Starts answering notifications posted to path on a background thread
+        """
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.receiver = self
+        self._httpd.path = path
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}{self._httpd.path}"
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def __claim(self, event_id):
+        """
+        Marks a notification as being dispatched, False if it was seen or is being dispatched already
+        """
+        with self._lock:
+            if event_id in self._seen or event_id in self._in_flight:
+                if event_id in self._seen:
+                    self._seen.move_to_end(event_id)
+                self.duplicates += 1
+                return False
+            self._in_flight.add(event_id)
+            return True
+
+    def __remember(self, event_id):
+        with self._lock:
+            self._in_flight.discard(event_id)
+            self._seen[event_id] = None
+            while len(self._seen) > self.max_seen:
+                self._seen.popitem(last=False)
+
+    def __release(self, event_id):
+        with self._lock:
+            self._in_flight.discard(event_id)
+
+
+
+def sign(body, secret):
+    """
+    Returns the hex HMAC-SHA256 signature of a body, e.g. to post fixtures to a receiver
+    """
+    if isinstance(secret, str):
+        secret = secret.encode('utf-8')
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    return hmac.new(secret, body, hashlib.sha256).hexdigest()
+
+
+def parse_event(notification):
+    """
+    Builds the typed event of a decoded notification
+    """
+    name = notification.get('name') or notification.get('event') or ''
+    object_type, _, action = name.rpartition('.')
+    if not object_type:
+        object_type, action = notification.get('object_type') or name, ''
+    obj = notification.get('object') if isinstance(notification.get('object'), dict) else {}
+
+    tournament_id = notification.get('tournament_id') or obj.get('tournament_id')
+    if tournament_id is None and notification.get('scope') == 'tournament':
+        tournament_id = notification.get('scope_id')
+    if tournament_id is None and object_type == 'tournament':
+        tournament_id = notification.get('object_id') or obj.get('id')
+
+    event_class = EVENT_CLASSES.get(object_type, WebhookEvent)
+    return event_class(notification.get('id'), name, object_type, action,
+                       notification.get('object_id') or obj.get('id'), tournament_id,
+                       notification, time.time())
+
+
+def _object_urls(event):
+    """
+    Urls of the by-id lookups of the object an event is about
+    """
+    root = f"https://api.toornament.com/organizer/v2/tournaments/{event.tournament_id}"
+    if event.object_type == 'tournament':
+        return [root]
+    if isinstance(event, GameEvent):
+        # Games are looked up by their number within a match, which changes with them
+        obj = event.data.get('object') if isinstance(event.data.get('object'), dict) else {}
+        match_id = event.data.get('match_id') or obj.get('match_id')
+        number = event.data.get('game_number') or event.data.get('number') or obj.get('number')
+        if match_id is None:
+            return []
+        match_url = f"{root}/matches/{match_id}"
+        return [match_url] if number is None else [f"{match_url}/games/{number}", match_url]
+    if event.object_id is None:
+        return []
+    if event.object_type == 'match':
+        return [f"{root}/matches/{event.object_id}"]
+    if event.object_type in ('participant', 'registration'):
+        return [f"{root}/participants/{event.object_id}"]
+    return []
+
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get('content-length') or 0)
+        body = self.rfile.read(length) if length else b''
+        if self.path.split('?')[0] != self.server.path:
+            status = 404
+        else:
+            status, _ = self.server.receiver.handle(body, dict(self.headers))
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
@@ -0,0 +1,186 @@
+import json
+from urllib.parse import quote_plus
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from .toornament_api import scopes
+from ._async import AsyncGET, AsyncPOST, AsyncPATCH
+from ._auth import AsyncTokenManager
+from ._codec import default_codec
+from ._metrics import Observation, count_token_refresh
+
+class AsyncAPI:
+    """
+    asyncio counterpart of API, all requests share one pooled aiohttp session.
+
+    Use as an async context manager, or call close() when done:
+
+        async with AsyncAPI() as api:
+            matches = await api.get.all_matches(tournament)
+    """
+    def __init__(self, filepath='apidata.json', max_workers=8, limit=100, limit_per_host=0,
+                 token_cache=None, token_scopes=None, codec=None, hooks=None):
+        if aiohttp is None:
+            raise ImportError("AsyncAPI requires aiohttp, install it with 'pip install aiohttp'")
+
+        self.__key = None
+        self.__client_id = None
+        self.__client_secret = None
+
+        # token_cache is an optional file tokens are persisted to between processes,
+        # token_scopes are scopes that should be requested together in one token call
+        self.tokens = AsyncTokenManager(self.__request_token, cache_file=token_cache, bundle=token_scopes)
+
+        # Upper bound on concurrent requests made when fetching every page of a collection
+        self.max_workers = max_workers
+        # Connection pool size, in total and per host (0 means no per host limit)
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+
+        # Encodes request and decodes response bodies, JSONCodec or OrjsonCodec
+        self.codec = codec or default_codec()
+
+        # Callables given a RequestRecord after every request, e.g. Metrics or OpenTelemetryHook
+        self.hooks = list(hooks or [])
+
+        self.session = None
+        self.get = AsyncGET(self)
+        self.post = AsyncPOST(self)
+        self.patch = AsyncPATCH(self)
+
+        try:
+            with open(filepath) as loadfile:
+                api_data = json.load(loadfile)
+
+            self.set_key(api_data['api_key'])
+            self.set_client_id(api_data['client_id'])
+            self.set_client_secret(api_data['client_secret'])
+        except FileNotFoundError:
+            raise UserWarning(f"File for API information not found ({filepath}), please manually add API info")
+
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+    #####################################
+    #                                   #
+    #              API SETUP            #
+    #                                   #
+    #####################################
+
+    def set_key(self, key):
+        self.__key = key
+
+
+    def set_client_id(self, client_id):
+        self.__client_id = client_id
+        self.tokens.cache_key = client_id
+
+
+    def set_client_secret(self, client_secret):
+        self.__client_secret = client_secret
+
+
+    async def close(self):
+        """
+        Closes the pooled connections
+        """
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+
+    @property
+    def auth_tokens(self):
+        """
+        The current token for every scope (None if there is none)
+        """
+        tokens = {scope: None for scope in scopes}
+        tokens.update(self.tokens.tokens())
+        return tokens
+
+
+    # Gets the appropriate authentication token from the server,
+    # 'scope' may also be a list of scopes to get a single token for
+    async def get_auth_token(self, scope):
+        requested = [scope] if isinstance(scope, str) else list(scope)
+        unknown = [s for s in requested if s not in scopes]
+        if unknown:
+            raise ValueError(f"Unknown scope(s) {', '.join(unknown)}, expected some of {', '.join(scopes)}")
+        return await self.tokens.refresh(requested)
+
+
+    #####################################
+    #                                   #
+    #          CLASS UTILITIES          #
+    #                                   #
+    #####################################
+
+    async def request(self, method, scope, url, headers=None, endpoint=None, **kwargs):
+        """
+        Sends an authorized request, refreshing the token once if it was rejected.
+
+        Returns the status code, the raw body and the response headers.
+        'endpoint' is the url template the request is reported under to the hooks.
+        """
+        with Observation(self.hooks, method, scope, url, endpoint, kwargs.get('data')) as observation:
+            status, body, response_headers = await self.__authorized_request(method, scope, url, headers, **kwargs)
+            observation.done(status, len(body))
+        return status, body, response_headers
+
+    async def __authorized_request(self, method, scope, url, headers=None, **kwargs):
+        headers = dict(headers or {})
+        headers['X-Api-Key'] = self.__key
+        token = await self.tokens.token(scope)
+
+        for _ in range(2):
+            headers['authorization'] = f"{token}"
+            session = self.__get_session()
+            async with session.request(method, url, headers=headers, **kwargs) as response:
+                body = await response.read()
+                status = response.status
+                response_headers = response.headers
+            if status != 401:
+                break
+            token = await self.tokens.token(scope, rejected=token)
+
+        return status, body, response_headers
+
+    async def __request_token(self, requested):
+        """
+        Requests a single token for every scope in 'requested'
+        """
+        url = "https://api.toornament.com/oauth/v2/token"
+
+        payload = f"grant_type=client_credentials&client_id={self.__client_id}&client_secret={self.__client_secret}&scope={quote_plus(' '.join(requested))}"
+
+        headers = {
+            'content-type': "application/x-www-form-urlencoded",
+            }
+
+        count_token_refresh()
+        with Observation(self.hooks, "POST", None, url, data=payload) as observation:
+            session = self.__get_session()
+            async with session.request("POST", url, data=payload, headers=headers) as response:
+                body = await response.read()
+                status = response.status
+            observation.done(status, len(body))
+
+        data = None
+        if status == 200:
+            data = self.codec.loads(body)
+
+        return status, data
+
+    def __get_session(self):
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host)
+            self.session = aiohttp.ClientSession(connector=connector)
+        return self.session
@@ -0,0 +1,275 @@
+"""
+Record and replay of the HTTP traffic of an API, for offline runs and
+reproducible benchmarks.
+
+    with Cassette('export.cassette', mode='record').mount(api):
+        api.get.all_matches(tournament)
+
+    with Cassette('export.cassette', mode='replay').mount(api):
+        api.get.all_matches(tournament)   # no network, recorded latency
+
+Responses are kept with their status, headers (Content-Range, ETag, ...) and
+body in a gzipped JSON lines file. Requests are matched on their method, url,
+query and Range header; repeated requests get their responses in the order
+they were recorded. Token requests are recorded without their body and
+token responses with a placeholder in place of the token, so no client
+secret or live token ends up in the file.
+"""
+import base64
+import gzip
+import hashlib
+import io
+import json
+import random
+import threading
+import time
+from datetime import timedelta
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+API_ROOT = "https://api.toornament.com"
+
+# Stands in for the tokens of recorded token responses, replay never checks them
+RECORDED_TOKEN = "recorded-token"
+
+# Response headers not worth keeping
+DROPPED_HEADERS = ('date', 'server', 'connection', 'keep-alive', 'set-cookie', 'transfer-encoding',
+                   'content-encoding')
+
+class CassetteMiss(requests.RequestException):
+    """
+    Raised in replay mode for a request that was never recorded
+    """
+
+
+
+class Cassette():
+    """
+    Records the responses an API's session receives, or serves them back without a network.
+
+    mode        'record' (start empty), 'append' (replay what is there, record
+                what is not) or 'replay' (never touch the network)
+    latency     'recorded' to sleep as long as the recorded response took,
+                None for none, seconds or a (low, high) range of seconds
+    match_body  also match requests on their body, e.g. to tell PATCHes apart
+    """
+    def __init__(self, path, mode='replay', latency='recorded', match_body=False):
+        if mode not in ('record', 'append', 'replay'):
+            raise ValueError(f"Unknown cassette mode '{mode}'")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.match_body = match_body
+
+        self._lock = threading.Lock()
+        self._interactions = dict()
+        self._played = dict()
+        self._recorded = []
+        self._adapter = None
+
+        self.hits = 0
+        self.recorded = 0
+        if mode != 'record':
+            self.load()
+
+
+    def mount(self, api, root=API_ROOT):
+        """
+        Routes every request 'api' makes to root through the cassette
+        """
+        self._adapter = _CassetteAdapter(self, api.session.get_adapter(root + '/'))
+        api.session.mount(root, self._adapter)
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.mode != 'replay':
+            self.save()
+
+
+    #####################################
+    #                                   #
+    #              STORAGE              #
+    #                                   #
+    #####################################
+
+    def load(self):
+        """
+        Reads the recorded interactions, an absent file holds none
+        """
+        try:
+            with gzip.open(self.path, 'rt', encoding='utf-8') as loadfile:
+                lines = loadfile.readlines()
+        except FileNotFoundError:
+            if self.mode == 'replay':
+                raise
+            return
+        with self._lock:
+            for line in lines:
+                interaction = json.loads(line)
+                self._interactions.setdefault(interaction['key'], []).append(interaction)
+                self._recorded.append(interaction)
+
+    def save(self):
+        """
+        Writes every interaction recorded so far
+        """
+        with self._lock:
+            lines = [json.dumps(interaction, separators=(',', ':')) + '\n' for interaction in self._recorded]
+        with gzip.open(self.path, 'wt', encoding='utf-8') as savefile:
+            savefile.writelines(lines)
+
+
+    #####################################
+    #                                   #
+    #          CLASS UTILITIES          #
+    #                                   #
+    #####################################
+
+    def key(self, request):
+        """
+        Returns the string requests are matched on
+        """
+        url = urlsplit(request.url)
+        query = urlencode(sorted(parse_qsl(url.query, keep_blank_values=True)))
+        parts = [request.method, f"{url.scheme}://{url.netloc}{url.path}", query,
+                 request.headers.get('range', '')]
+        if self.match_body and not _is_token_request(request):
+            body = request.body or b''
+            if isinstance(body, str):
+                body = body.encode('utf-8')
+            parts.append(hashlib.sha256(body).hexdigest()[:16])
+        return ' '.join(parts)
+
+    def play(self, key):
+        """
+        Returns the next recorded interaction for a request key, None if there is none
+        """
+        with self._lock:
+            recorded = self._interactions.get(key)
+            if not recorded:
+                return None
+            index = self._played.get(key, 0)
+            self._played[key] = index + 1
+            self.hits += 1
+            # Once every recording was played, keep answering with the last one
+            return recorded[min(index, len(recorded) - 1)]
+
+    def record(self, key, response, elapsed):
+        """
+        Keeps the response received for a request key
+        """
+        body = response.content
+        if urlsplit(key.split(' ')[1]).path == '/oauth/v2/token':
+            body = _redact_token(body)
+        try:
+            text, encoding = body.decode('utf-8'), 'text'
+        except UnicodeDecodeError:
+            text, encoding = base64.b64encode(body).decode('ascii'), 'base64'
+        interaction = {'key': key,
+                       'status': response.status_code,
+                       'reason': response.reason,
+                       'headers': {name: (str(len(body)) if name.lower() == 'content-length' else value)
+                                   for name, value in response.headers.items()
+                                   if name.lower() not in DROPPED_HEADERS},
+                       'body': text,
+                       'encoding': encoding,
+                       'elapsed': round(elapsed, 6)}
+        with self._lock:
+            self._interactions.setdefault(interaction['key'], []).append(interaction)
+            self._recorded.append(interaction)
+            self.recorded += 1
+
+    def delay(self, interaction):
+        """
+        Seconds to wait before answering with a recorded interaction
+        """
+        if self.latency is None:
+            return 0.0
+        if self.latency == 'recorded':
+            return interaction['elapsed']
+        if isinstance(self.latency, (tuple, list)):
+            return random.uniform(*self.latency)
+        return float(self.latency)
+
+
+
+class _CassetteAdapter(BaseAdapter):
+    """
+    Transport adapter answering from a cassette, and recording through another adapter
+    """
+    def __init__(self, cassette, adapter):
+        super().__init__()
+        self._cassette = cassette
+        self._adapter = adapter
+
+    def send(self, request, **kwargs):
+        cassette = self._cassette
+        # Computed before sending, the wrapped adapter may rewrite the request
+        key = cassette.key(request)
+        if cassette.mode != 'record':
+            interaction = cassette.play(key)
+            if interaction is not None:
+                delay = cassette.delay(interaction)
+                if delay > 0:
+                    time.sleep(delay)
+                return _response(request, interaction)
+            if cassette.mode == 'replay':
+                raise CassetteMiss(f"No recorded response for {request.method} {request.url}", request=request)
+
+        start = time.perf_counter()
+        response = self._adapter.send(request, **kwargs)
+        # Read the body now so the recorded time includes it
+        response.content
+        cassette.record(key, response, time.perf_counter() - start)
+        return response
+
+    def close(self):
+        self._adapter.close()
+
+
+
+def _is_token_request(request):
+    return urlsplit(request.url).path == '/oauth/v2/token'
+
+
+def _redact_token(body):
+    """
+    Returns the body of a token response with its tokens replaced by a placeholder
+    """
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return body
+    if not isinstance(data, dict):
+        return body
+    for name in ('access_token', 'refresh_token'):
+        if name in data:
+            data[name] = RECORDED_TOKEN
+    return json.dumps(data).encode('utf-8')
+
+
+def _response(request, interaction):
+    """
+    Builds a requests Response from a recorded interaction
+    """
+    response = requests.Response()
+    response.status_code = interaction['status']
+    response.reason = interaction.get('reason')
+    response.headers = CaseInsensitiveDict(interaction['headers'])
+    body = interaction['body']
+    response._content = base64.b64decode(body) if interaction['encoding'] == 'base64' else body.encode('utf-8')
+    # Read already, as far as iter_content() and close() are concerned
+    response._content_consumed = True
+    response.raw = io.BytesIO(response._content)
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.url = request.url
+    response.request = request
+    response.elapsed = timedelta(seconds=interaction['elapsed'])
+    return response
@@ -0,0 +1,389 @@
+"""
+Command line access to the toornament.com API.
+
+    python -m tourny export matches --tournament 123 --status running --format csv
+    python -m tourny report 123 456 2-1
+    python -m tourny standings 123 --stage 789
+    python -m tourny daemon start
+
+Every command is run by the daemon when one is listening on the socket, so
+repeated calls share its warm connections, tokens and response cache, and
+otherwise by this process. Nothing but the standard library is imported on
+the way to the daemon.
+"""
+import argparse
+import csv
+import getpass
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+DEFAULT_SOCKET = os.path.join(os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir(),
+                              f"tourny-{getpass.getuser()}.sock")
+
+# Seconds a client waits for the daemon to answer a command
+DAEMON_TIMEOUT = 300
+
+class CommandError(Exception):
+    """
+    A command that could not be carried out, reported without a traceback
+    """
+
+
+
+#####################################
+#                                   #
+#              COMMANDS             #
+#                                   #
+#####################################
+
+def export(api, args):
+    """
+    Returns tournaments, or the matches or teams of a tournament, as JSON or CSV
+    """
+    from .TournamentItems import Tournament
+
+    if args.status and args.collection == 'teams':
+        raise CommandError("--status filters tournaments and matches, not teams")
+    if args.collection == 'tournaments':
+        query = api.get.query('tournaments')
+    else:
+        if args.tournament is None:
+            raise CommandError(f"Exporting {args.collection} needs --tournament")
+        query = api.get.query(args.collection, Tournament(id=args.tournament))
+    if args.status:
+        query = query.where(statuses=args.status)
+    items = query.all()
+
+    rows = [item.to_dict() for item in items]
+    if args.format == 'json':
+        return json.dumps(rows, indent=2, default=str) + '\n'
+    return _csv([_flatten(row) for row in rows])
+
+
+def report(api, args):
+    """
+    Reports the scores of a match, in the order of its opponents, and marks the winner
+    """
+    match = api.get.match_by_id(args.tournament, args.match)
+    if match is None:
+        raise CommandError(f"No match {args.match} in tournament {args.tournament}")
+    try:
+        scores = [int(score) for score in args.scores.split('-')]
+    except ValueError:
+        raise CommandError(f"Scores look like 2-1, not '{args.scores}'")
+    opponents = sorted(match.opponents, key=lambda o: o.get('number') or 0)
+    if len(scores) != len(opponents):
+        raise CommandError(f"Match {args.match} has {len(opponents)} opponents, got {len(scores)} scores")
+
+    best = max(scores)
+    for opponent, score in zip(opponents, scores):
+        opponent['score'] = score
+        if args.results:
+            opponent['result'] = ('draw' if scores.count(best) > 1 else 'win') if score == best else 'loss'
+
+    from .TournamentItems import Tournament
+    response = api.patch.match(Tournament(id=args.tournament), match)
+    if response is not None and response.status_code not in (200, 204):
+        raise CommandError(f"The API refused the result ({response.status_code}): {response.text.strip()}")
+    return f"Match {args.match}: {' - '.join(str(s) for s in scores)}\n"
+
+
+def standings(api, args):
+    """
+    Returns the standings of a group, or of a whole stage, computed from the tournament's matches
+    """
+    from .TournamentItems import Tournament
+    from ._standings import Standings
+
+    query = api.get.query('matches', Tournament(id=args.tournament))
+    if args.stage is not None:
+        query = query.where(stage_ids=args.stage)
+    table = Standings().load(query.all())
+    stage = args.stage
+    if stage is None:
+        stages = table.stages()
+        if len(stages) > 1:
+            raise CommandError(f"Tournament {args.tournament} has several stages, pick one with --stage "
+                               f"({', '.join(str(s) for s in stages)})")
+        stage = next(iter(stages), None)
+
+    rows = table.ranking(stage, args.group)
+    if args.format == 'json':
+        return json.dumps([row._asdict() for row in rows], indent=2) + '\n'
+    columns = ('rank', 'name', 'played', 'wins', 'draws', 'losses', 'points', 'score_difference')
+    lines = [[str(getattr(row, c)) for c in columns] for row in rows]
+    widths = [max([len(c)] + [len(line[i]) for line in lines]) for i, c in enumerate(columns)]
+    text = ['  '.join(c.ljust(w) for c, w in zip(columns, widths)).rstrip()]
+    text += ['  '.join(v.ljust(w) for v, w in zip(line, widths)).rstrip() for line in lines]
+    return '\n'.join(text) + '\n'
+
+
+COMMANDS = {'export': export, 'report': report, 'standings': standings}
+
+
+#####################################
+#                                   #
+#               DAEMON              #
+#                                   #
+#####################################
+
+class Daemon():
+    """
+    Runs commands sent over a Unix socket with long-lived APIs, one per API information file
+    """
+    def __init__(self, path=DEFAULT_SOCKET):
+        self.path = path
+        self._apis = dict()
+        self._server = None
+        self.started = time.time()
+        self.commands = 0
+
+    def api(self, apidata, token_cache=None):
+        """
+        Returns the warm API of an API information file, building it on first use
+        """
+        api = self._apis.get(apidata)
+        if api is None:
+            from .toornament_api import API
+            from ._cache import ResponseCache
+            api = self._apis[apidata] = API(filepath=apidata, token_cache=token_cache, cache=ResponseCache())
+        return api
+
+    def run(self):
+        """
+        Answers commands until shut down
+        """
+        import socketserver
+        import threading
+
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                request = json.loads(self.rfile.readline() or b'{}')
+                reply = daemon.handle(request)
+                self.wfile.write(json.dumps(reply).encode('utf-8') + b'\n')
+                if request.get('command') == 'shutdown':
+                    threading.Thread(target=daemon._server.shutdown, daemon=True).start()
+
+        if os.path.exists(self.path):
+            if _connect(self.path) is not None:
+                raise CommandError(f"A daemon is already listening on {self.path}")
+            os.remove(self.path)
+
+        # Only this user may talk to a process holding their credentials
+        umask = os.umask(0o177)
+        try:
+            self._server = socketserver.ThreadingUnixStreamServer(self.path, Handler)
+        finally:
+            os.umask(umask)
+        self._server.daemon_threads = True
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def handle(self, request):
+        """
+        Returns the reply to a decoded request
+        """
+        command = request.get('command')
+        if command == 'shutdown':
+            return {'status': 0, 'output': "Daemon stopped\n"}
+        if command == 'status':
+            return {'status': 0, 'output': (f"Daemon {os.getpid()} on {self.path}, up {time.time() - self.started:.0f} s, "
+                                            f"{self.commands} commands, {len(self._apis)} accounts\n")}
+        if command not in COMMANDS:
+            return {'status': 2, 'error': f"Unknown command '{command}'"}
+
+        self.commands += 1
+        args = argparse.Namespace(**request.get('args', {}))
+        try:
+            api = self.api(args.apidata, args.token_cache)
+            return {'status': 0, 'output': COMMANDS[command](api, args)}
+        except CommandError as e:
+            return {'status': 1, 'error': str(e)}
+        except Exception as e:
+            return {'status': 1, 'error': f"{type(e).__name__}: {e}"}
+
+
+
+def start_daemon(path=DEFAULT_SOCKET, timeout=10.0):
+    """
+    Starts a daemon in the background and waits until it listens
+    """
+    if _connect(path) is not None:
+        return f"A daemon is already listening on {path}\n"
+    with open(os.devnull, 'rb') as devnull_in, open(os.devnull, 'wb') as devnull_out:
+        subprocess.Popen([sys.executable, '-m', 'tourny', '--socket', path, 'daemon', 'run'],
+                         stdin=devnull_in, stdout=devnull_out, stderr=devnull_out, start_new_session=True)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        connection = _connect(path)
+        if connection is not None:
+            connection.close()
+            return f"Daemon listening on {path}\n"
+        time.sleep(0.05)
+    raise CommandError(f"The daemon did not start listening on {path}")
+
+
+def send(path, request):
+    """
+    Sends a request to the daemon, returns its reply or None when no daemon is listening
+    """
+    connection = _connect(path)
+    if connection is None:
+        return None
+    with connection:
+        connection.settimeout(DAEMON_TIMEOUT)
+        connection.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        with connection.makefile('rb') as reply:
+            return json.loads(reply.readline())
+
+
+def _connect(path):
+    if not hasattr(socket, 'AF_UNIX') or not os.path.exists(path):
+        return None
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(path)
+    except OSError:
+        connection.close()
+        return None
+    return connection
+
+
+#####################################
+#                                   #
+#          CLASS UTILITIES          #
+#                                   #
+#####################################
+
+def _flatten(row):
+    """
+    Returns a CSV row of an item, opponents spread over numbered columns and other nested values as JSON
+    """
+    flat = dict()
+    for key, value in row.items():
+        if key == 'opponents' and isinstance(value, list):
+            for opponent in value:
+                prefix = f"opponent{opponent.get('number')}_"
+                participant = opponent.get('participant') or {}
+                flat[prefix + 'id'] = participant.get('id')
+                flat[prefix + 'name'] = participant.get('name')
+                flat[prefix + 'score'] = opponent.get('score')
+                flat[prefix + 'result'] = opponent.get('result')
+        elif isinstance(value, (dict, list)):
+            flat[key] = json.dumps(value, default=str)
+        else:
+            flat[key] = value
+    return flat
+
+
+def _csv(rows):
+    columns = []
+    for row in rows:
+        columns += [key for key in row if key not in columns]
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=columns, lineterminator='\n')
+    writer.writeheader()
+    writer.writerows(rows)
+    return output.getvalue()
+
+
+def _parser():
+    parser = argparse.ArgumentParser(prog='tourny', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--apidata', default='apidata.json', help="file with the API key and client credentials")
+    parser.add_argument('--token-cache', help="file tokens are kept in between runs without a daemon")
+    parser.add_argument('--socket', default=DEFAULT_SOCKET, help="socket of the daemon")
+    parser.add_argument('--no-daemon', action='store_true', help="run the command in this process")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = commands.add_parser('export', help="export tournaments, matches or teams")
+    export_parser.add_argument('collection', choices=('tournaments', 'matches', 'teams'))
+    export_parser.add_argument('--tournament', help="tournament id, for matches and teams")
+    export_parser.add_argument('--status', action='append', choices=('pending', 'running', 'completed'),
+                               help="only tournaments or matches with this status, may be repeated")
+    export_parser.add_argument('--format', choices=('json', 'csv'), default='json')
+    export_parser.add_argument('--output', help="file to write to instead of the standard output")
+
+    report_parser = commands.add_parser('report', help="report the result of a match")
+    report_parser.add_argument('tournament')
+    report_parser.add_argument('match')
+    report_parser.add_argument('scores', help="scores in the order of the opponents, e.g. 2-1")
+    report_parser.add_argument('--scores-only', dest='results', action='store_false',
+                               help="leave the results (win, draw, loss) as they are")
+
+    standings_parser = commands.add_parser('standings', help="show the standings of a group or stage")
+    standings_parser.add_argument('tournament')
+    standings_parser.add_argument('--stage')
+    standings_parser.add_argument('--group')
+    standings_parser.add_argument('--format', choices=('table', 'json'), default='table')
+
+    daemon_parser = commands.add_parser('daemon', help="manage the background daemon")
+    daemon_parser.add_argument('action', choices=('start', 'stop', 'status', 'run'))
+    return parser
+
+
+def main(argv=None):
+    args = _parser().parse_args(argv)
+    args.apidata = os.path.abspath(args.apidata)
+    if args.token_cache is not None:
+        args.token_cache = os.path.abspath(args.token_cache)
+    output = getattr(args, 'output', None)
+
+    try:
+        if args.command == 'daemon':
+            text = _daemon_command(args)
+        else:
+            text = _run(args)
+    except CommandError as e:
+        print(f"tourny: {e}", file=sys.stderr)
+        return 1
+
+    if output:
+        with open(output, 'w', newline='') as savefile:
+            savefile.write(text)
+    else:
+        sys.stdout.write(text)
+    return 0
+
+
+def _run(args):
+    """
+    Runs a command through the daemon when one is listening, otherwise here
+    """
+    request_args = {key: value for key, value in vars(args).items() if key not in ('socket', 'no_daemon', 'output')}
+    if not args.no_daemon:
+        reply = send(args.socket, {'command': args.command, 'args': request_args})
+        if reply is not None:
+            if reply.get('status'):
+                raise CommandError(reply.get('error'))
+            return reply['output']
+
+    from .toornament_api import API
+    try:
+        api = API(filepath=args.apidata, token_cache=args.token_cache)
+    except UserWarning as e:
+        raise CommandError(str(e))
+    return COMMANDS[args.command](api, args)
+
+
+def _daemon_command(args):
+    if args.action == 'run':
+        Daemon(args.socket).run()
+        return ''
+    if args.action == 'start':
+        return start_daemon(args.socket)
+    reply = send(args.socket, {'command': 'shutdown' if args.action == 'stop' else 'status'})
+    if reply is None:
+        return f"No daemon is listening on {args.socket}\n"
+    return reply['output']
@@ -0,0 +1,203 @@
+"""
+Columnar export of matches and games for analytics.
+
+Tables are NumPy structured arrays with one row per opponent of a match (or
+game), so scores can be aggregated without touching Python objects. Next to
+its id, every participant gets an integer code ('participant', -1 if there
+is none) numbered within the table, which the aggregations group by:
+
+    table = match_table(api.get.iter_matches(tournament))
+    top = leaderboard(table, top_n=10)
+"""
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+# Codes of the 'status' and 'result' columns, the index of a name is its code
+STATUSES = (None, 'pending', 'running', 'completed')
+RESULTS = (None, 'win', 'draw', 'loss')
+
+NONE, WIN, DRAW, LOSS = range(4)
+
+_STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+_RESULT_CODES = {result: code for code, result in enumerate(RESULTS)}
+
+def match_table(matches):
+    """
+    Returns a structured array with a row per opponent of every match.
+
+    matches may be Match objects or decoded JSON dicts, e.g. streamed from
+    iter_matches. Missing scores are NaN and missing timestamps NaT.
+    """
+    columns = _columns()
+    for match in matches:
+        get = _getter(match)
+        _add_rows(columns, get('id'), 0, get('number'), get('status'), get('opponents') or (),
+                  get('scheduled_datetime'), get('played_at'))
+    return _table(columns)
+
+
+def game_table(matches, games):
+    """
+    Returns a structured array with a row per opponent of every game.
+
+    games maps a match id to the games of that match; participants are taken
+    from the opponents of the match with the same number.
+    """
+    columns = _columns()
+    for match in matches:
+        get = _getter(match)
+        participants = {o.get('number'): o.get('participant') for o in get('opponents') or ()}
+        for game in games.get(get('id'), ()):
+            game_get = _getter(game)
+            opponents = [dict(o, participant=participants.get(o.get('number')))
+                         for o in game_get('opponents') or ()]
+            _add_rows(columns, get('id'), game_get('number'), get('number'), game_get('status'), opponents,
+                      get('scheduled_datetime'), get('played_at'))
+    return _table(columns)
+
+
+def to_arrow(table):
+    """
+    Converts a table into a pyarrow Table
+    """
+    if pyarrow is None:
+        raise ImportError("to_arrow requires pyarrow, install it with 'pip install pyarrow'")
+    return pyarrow.table({name: table[name] for name in table.dtype.names})
+
+
+def participant_totals(table):
+    """
+    Returns a structured array of match counts, wins, draws, losses, summed
+    scores and win rate per participant, ordered by participant id
+    """
+    _require_numpy()
+    keep = table['participant'] >= 0
+    ids, index = _group(table['participant'][keep], table['participant_id'][keep])
+    count = len(ids)
+    result = table['result'][keep]
+
+    totals = np.zeros(count, dtype=[('participant_id', ids.dtype), ('matches', 'i8'), ('played', 'i8'),
+                                    ('wins', 'i8'), ('draws', 'i8'), ('losses', 'i8'),
+                                    ('score', 'f8'), ('win_rate', 'f8')])
+    totals['participant_id'] = ids
+    totals['matches'] = np.bincount(index, minlength=count)
+    totals['wins'] = np.bincount(index, weights=result == WIN, minlength=count)
+    totals['draws'] = np.bincount(index, weights=result == DRAW, minlength=count)
+    totals['losses'] = np.bincount(index, weights=result == LOSS, minlength=count)
+    totals['played'] = totals['wins'] + totals['draws'] + totals['losses']
+    totals['score'] = np.bincount(index, weights=np.nan_to_num(table['score'][keep]), minlength=count)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        totals['win_rate'] = np.where(totals['played'] > 0, totals['wins'] / totals['played'], 0.0)
+    return totals
+
+
+def leaderboard(table, top_n=10, by='wins'):
+    """
+    Returns the top_n rows of participant_totals ordered by a column, ties broken by score
+    """
+    totals = participant_totals(table)
+    order = np.lexsort((-totals['score'], -totals[by]))
+    return totals[order[:top_n]]
+
+
+def _group(codes, participant_ids):
+    """
+    Returns the sorted participant ids and the index into them of every row
+    """
+    size = codes.max() + 1 if len(codes) else 0
+    # One row per code is enough to name it, when each code stands for a single id
+    row_of = np.full(size, -1)
+    row_of[codes] = np.arange(len(codes))
+    if (row_of >= 0).all():
+        ids = participant_ids[row_of]
+        if np.array_equal(ids[codes], participant_ids):
+            order = np.argsort(ids)
+            rank = np.empty_like(order)
+            rank[order] = np.arange(size)
+            return ids[order], rank[codes]
+    # Codes of concatenated tables do not line up, group by the ids instead
+    return np.unique(participant_ids, return_inverse=True)
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("Columnar export requires numpy, install it with 'pip install numpy'")
+
+
+def _getter(item):
+    if isinstance(item, dict):
+        return item.get
+    return lambda key: getattr(item, key, None)
+
+
+def _columns():
+    _require_numpy()
+    return {'match_id': [], 'game_number': [], 'number': [], 'status': [], 'position': [],
+            'participant': [], 'participant_id': [], 'score': [], 'result': [], 'forfeit': [],
+            'scheduled': [], 'played': [], '_codes': {}}
+
+
+def _add_rows(columns, match_id, game_number, number, status, opponents, scheduled, played):
+    status = _STATUS_CODES.get(status, NONE)
+    scheduled = _timestamp(scheduled)
+    played = _timestamp(played)
+    codes = columns['_codes']
+    for opponent in opponents:
+        participant = opponent.get('participant')
+        participant_id = (participant.get('id') or '') if participant else ''
+        score = opponent.get('score')
+        columns['match_id'].append(match_id or '')
+        columns['game_number'].append(game_number or 0)
+        columns['number'].append(number or 0)
+        columns['status'].append(status)
+        columns['position'].append(opponent.get('position') or opponent.get('number') or 0)
+        columns['participant'].append(codes.setdefault(participant_id, len(codes)) if participant_id else -1)
+        columns['participant_id'].append(participant_id)
+        columns['score'].append(float('nan') if score is None else score)
+        columns['result'].append(_RESULT_CODES.get(opponent.get('result'), NONE))
+        columns['forfeit'].append(bool(opponent.get('forfeit')))
+        columns['scheduled'].append(scheduled)
+        columns['played'].append(played)
+
+
+def _table(columns):
+    width = lambda values: max((len(v) for v in values), default=1) or 1
+    dtype = [('match_id', f"U{width(columns['match_id'])}"), ('game_number', 'i4'), ('number', 'i4'),
+             ('status', 'i1'), ('position', 'i2'), ('participant', 'i4'),
+             ('participant_id', f"U{width(columns['participant_id'])}"),
+             ('score', 'f8'), ('result', 'i1'), ('forfeit', '?'),
+             ('scheduled', 'datetime64[s]'), ('played', 'datetime64[s]')]
+    table = np.empty(len(columns['match_id']), dtype=dtype)
+    for name, _ in dtype:
+        table[name] = columns[name]
+    return table
+
+
+_timestamps = {}
+
+def _timestamp(value):
+    """
+    Converts an ISO 8601 date with offset into a UTC datetime64, NaT if missing
+    """
+    if not value:
+        return np.datetime64('NaT', 's')
+    converted = _timestamps.get(value)
+    if converted is None:
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            return np.datetime64('NaT', 's')
+        seconds = int(parsed.timestamp()) if parsed.tzinfo is not None else None
+        converted = np.datetime64(seconds, 's') if seconds is not None else np.datetime64(parsed, 's')
+        if len(_timestamps) < 65536:
+            _timestamps[value] = converted
+    return converted
@@ -0,0 +1,378 @@
+"""
+Local stand-in for the parts of the toornament.com organizer v2 API used by
+this wrapper, for benchmarks and offline development.
+
+    with MockServer(matches=10000, latency=0.02) as server:
+        api = API()
+        server.mount(api)
+        matches = api.get.all_matches(server.tournament)
+"""
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from requests.adapters import HTTPAdapter
+
+from .TournamentItems import Tournament
+from ._get import MAX_RANGE_LENGTH
+
+API_ROOT = "https://api.toornament.com"
+
+# Routes of the organizer API, each named after its range unit or resource
+ROUTES = [
+    ('GET', r'/organizer/v2/tournaments', 'tournaments'),
+    ('POST', r'/organizer/v2/tournaments', 'tournament'),
+    ('GET', r'/organizer/v2/tournaments/(?P<tournament_id>\w+)', 'tournament'),
+    ('PATCH', r'/organizer/v2/tournaments/(?P<tournament_id>\w+)', 'tournament'),
+    ('GET', r'/organizer/v2/tournaments/(?P<tournament_id>\w+)/participants', 'participants'),
+    ('POST', r'/organizer/v2/tournaments/(?P<tournament_id>\w+)/participants', 'participant'),
+    ('GET', r'/organizer/v2/tournaments/(?P<tournament_id>\w+)/participants/(?P<id>\w+)', 'participant'),
+    ('PATCH', r'/organizer/v2/tournaments/(?P<tournament_id>\w+)/participants/(?P<id>\w+)', 'participant'),
+    ('GET', r'/organizer/v2/tournaments/(?P<tournament_id>\w+)/matches', 'matches'),
+    ('GET', r'/organizer/v2/tournaments/(?P<tournament_id>\w+)/matches/(?P<id>\w+)', 'match'),
+    ('PATCH', r'/organizer/v2/tournaments/(?P<tournament_id>\w+)/matches/(?P<id>\w+)', 'match'),
+    ('GET', r'/organizer/v2/tournaments/(?P<tournament_id>\w+)/matches/(?P<match_id>\w+)/games', 'games'),
+    ('GET', r'/organizer/v2/tournaments/(?P<tournament_id>\w+)/matches/(?P<match_id>\w+)/games/(?P<number>\d+)', 'game'),
+    ('PATCH', r'/organizer/v2/tournaments/(?P<tournament_id>\w+)/matches/(?P<match_id>\w+)/games/(?P<number>\d+)', 'game'),
+]
+ROUTES = [(method, re.compile(pattern + '$'), name) for method, pattern, name in ROUTES]
+
+
+class MockServer():
+    """
+    Threaded HTTP server holding one generated tournament in memory.
+
+    latency         seconds added to every response, or a (low, high) range
+    error_rate      share of requests answered with 500
+    throttle_rate   share of requests answered with 429 and Retry-After
+    rate_limit      requests per second and API key above which requests get a 429
+    page_limits     largest range accepted per unit, defaults to MAX_RANGE_LENGTH
+    token_lifetime  seconds an issued token stays valid
+    """
+    def __init__(self, teams=64, matches=1000, games_per_match=3, latency=0.0, error_rate=0.0,
+                 throttle_rate=0.0, rate_limit=None, page_limits=None, token_lifetime=3600,
+                 host='127.0.0.1', port=0, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.rate_limit = rate_limit
+        self.page_limits = dict(MAX_RANGE_LENGTH)
+        self.page_limits.update(page_limits or {})
+        self.token_lifetime = token_lifetime
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tokens = dict()
+        self._windows = dict()
+        self.requests = dict()
+
+        self.tournaments = dict()
+        self.participants = dict()
+        self.matches = dict()
+        self.games = dict()
+        self.__generate(teams, matches, games_per_match)
+
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.mock = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def tournament(self):
+        """
+        The generated tournament, as a Tournament object
+        """
+        return Tournament.from_dict(next(iter(self.tournaments.values())))
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def mount(self, api):
+        """
+        Sends every request 'api' makes to toornament.com to this server instead
+        """
+        api.session.mount(API_ROOT, _RedirectAdapter(API_ROOT, self.url, pool_maxsize=64))
+        return api
+
+    def request_count(self):
+        with self._lock:
+            return sum(self.requests.values())
+
+
+    #####################################
+    #                                   #
+    #             HANDLING              #
+    #                                   #
+    #####################################
+
+    def handle(self, method, path, headers, body):
+        """
+        Returns the status, headers and JSON body answering a request
+        """
+        path, _, query = path.partition('?')
+        params = parse_qs(query)
+
+        if path == '/oauth/v2/token' and method == 'POST':
+            return self.__token(body)
+
+        for route_method, pattern, name in ROUTES:
+            match = pattern.match(path)
+            if match is not None and route_method == method:
+                break
+        else:
+            return 404, {}, {'message': 'Not found'}
+
+        with self._lock:
+            self.requests[(method, name)] = self.requests.get((method, name), 0) + 1
+
+        throttled = self.__throttled(headers.get('x-api-key'))
+        if throttled:
+            return 429, {'Retry-After': '1'}, {'message': 'Too many requests'}
+        if self.error_rate and self._random.random() < self.error_rate:
+            return 500, {}, {'message': 'Internal error'}
+        if not self.__authorized(headers.get('authorization')):
+            return 401, {}, {'message': 'Invalid token'}
+
+        kwargs = match.groupdict()
+        if method == 'GET' and name in self.page_limits:
+            return self.__range(name, self.__collection(name, params, **kwargs), headers.get('range'))
+        if method == 'GET':
+            return self.__by_id(self.__find(name, **kwargs), headers)
+        if method == 'PATCH':
+            item = self.__find(name, **kwargs)
+            if item is None:
+                return 404, {}, {'message': 'Not found'}
+            item.update(json.loads(body or b'{}'))
+            return 200, {}, item
+        return self.__create(name, json.loads(body or b'{}'), **kwargs)
+
+    def __throttled(self, api_key):
+        if self.throttle_rate and self._random.random() < self.throttle_rate:
+            return True
+        if self.rate_limit is None:
+            return False
+        with self._lock:
+            second = int(time.monotonic())
+            start, count = self._windows.get(api_key, (0, 0))
+            if start != second:
+                start, count = second, 0
+            self._windows[api_key] = (start, count + 1)
+            return count >= self.rate_limit
+
+    def __authorized(self, token):
+        with self._lock:
+            expires_at = self._tokens.get(token)
+        return expires_at is not None and expires_at > time.monotonic()
+
+    def __token(self, body):
+        form = parse_qs(body.decode('utf-8'))
+        token = f"mock-{self._random.getrandbits(64):016x}"
+        with self._lock:
+            self._tokens[token] = time.monotonic() + self.token_lifetime
+            self.requests[('POST', 'token')] = self.requests.get(('POST', 'token'), 0) + 1
+        return 200, {}, {'access_token': token,
+                         'token_type': 'bearer',
+                         'expires_in': self.token_lifetime,
+                         'scope': form.get('scope', [''])[0]}
+
+    def __range(self, unit, items, range_header):
+        match = re.match(r'(\w+)=(\d+)-(\d+)$', range_header or '')
+        if match is None or match.group(1) != unit:
+            return 400, {}, {'message': f"A range of {unit} is required"}
+        first, last = int(match.group(2)), int(match.group(3))
+        if last < first or last - first + 1 > self.page_limits[unit]:
+            return 416, {}, {'message': 'Invalid range'}
+        if first >= len(items) and items:
+            return 416, {'Content-Range': f"{unit} */{len(items)}"}, []
+
+        page = items[first:last + 1]
+        content_range = f"{unit} {first}-{first + len(page) - 1}/{len(items)}" if page else f"{unit} */0"
+        return 206, {'Content-Range': content_range}, page
+
+    def __by_id(self, item, headers):
+        if item is None:
+            return 404, {}, {'message': 'Not found'}
+        etag = f'"{hash(json.dumps(item, sort_keys=True)) & 0xffffffff:08x}"'
+        if headers.get('if-none-match') == etag:
+            return 304, {'ETag': etag}, None
+        return 200, {'ETag': etag}, item
+
+    def __collection(self, name, params, tournament_id=None, match_id=None):
+        if name == 'tournaments':
+            items = list(self.tournaments.values())
+        elif name == 'participants':
+            items = list(self.participants.get(tournament_id, {}).values())
+        elif name == 'matches':
+            items = list(self.matches.get(tournament_id, {}).values())
+            if 'statuses' in params:
+                statuses = set(','.join(params['statuses']).split(','))
+                items = [m for m in items if m['status'] in statuses]
+            for field in ('stage_id', 'group_id', 'round_id'):
+                if field + 's' in params:
+                    values = set(','.join(params[field + 's']).split(','))
+                    items = [m for m in items if m[field] in values]
+            if 'participant_ids' in params:
+                ids = set(','.join(params['participant_ids']).split(','))
+                items = [m for m in items if any((o.get('participant') or {}).get('id') in ids
+                                                 for o in m['opponents'])]
+        else:
+            return list(self.games.get((tournament_id, match_id), {}).values())
+        if 'ids' in params:
+            ids = set(','.join(params['ids']).split(','))
+            items = [item for item in items if item['id'] in ids]
+        return items
+
+    def __find(self, name, tournament_id=None, id=None, match_id=None, number=None):
+        if name == 'tournament':
+            return self.tournaments.get(tournament_id)
+        if name == 'participant':
+            return self.participants.get(tournament_id, {}).get(id)
+        if name == 'match':
+            return self.matches.get(tournament_id, {}).get(id)
+        return self.games.get((tournament_id, match_id), {}).get(int(number))
+
+    def __create(self, name, data, tournament_id=None):
+        with self._lock:
+            data['id'] = self.__next_id()
+            if name == 'tournament':
+                self.tournaments[data['id']] = data
+                self.participants[data['id']] = dict()
+                self.matches[data['id']] = dict()
+            else:
+                self.participants.setdefault(tournament_id, dict())[data['id']] = data
+        return 201, {}, data
+
+
+    #####################################
+    #                                   #
+    #              FIXTURES             #
+    #                                   #
+    #####################################
+
+    def __next_id(self):
+        self._last_id = getattr(self, '_last_id', 100000000000000000) + 1
+        return str(self._last_id)
+
+    def __generate(self, team_count, match_count, games_per_match):
+        rand = self._random
+        tournament_id = self.__next_id()
+        self.tournaments[tournament_id] = {
+            'id': tournament_id, 'name': 'Mock Cup', 'full_name': 'Mock Cup 2020',
+            'status': 'running', 'discipline': 'counterstrike_go', 'timezone': 'Europe/Paris',
+            'size': team_count, 'participant_type': 'team', 'platforms': ['pc'], 'online': True,
+        }
+
+        teams = dict()
+        for number in range(team_count):
+            team_id = self.__next_id()
+            teams[team_id] = {
+                'id': team_id, 'name': f"Team {number}", 'email': None, 'checked_in': True,
+                'custom_fields': {'country': rand.choice(['FR', 'DE', 'SE', 'US', 'BR'])},
+                'lineup': [{'name': f"Player {number}-{p}", 'custom_fields': {}} for p in range(5)],
+            }
+        self.participants[tournament_id] = teams
+
+        team_ids = list(teams)
+        matches = dict()
+        games = dict()
+        for number in range(1, match_count + 1):
+            match_id = self.__next_id()
+            status = rand.choice(['completed', 'completed', 'running', 'pending'])
+            sides = rand.sample(team_ids, 2) if len(team_ids) >= 2 else team_ids
+            opponents = []
+            for position, team_id in enumerate(sides, 1):
+                score = rand.randint(0, 16) if status != 'pending' else None
+                opponents.append({
+                    'number': position, 'position': position, 'result': None, 'rank': None,
+                    'forfeit': False, 'score': score,
+                    'participant': {'id': team_id, 'name': teams[team_id]['name'],
+                                    'custom_fields': teams[team_id]['custom_fields']},
+                })
+            if status == 'completed' and len(opponents) == 2:
+                first, second = opponents
+                first['result'], second['result'] = (('win', 'loss') if first['score'] >= second['score']
+                                                     else ('loss', 'win'))
+            matches[match_id] = {
+                'id': match_id, 'stage_id': '1', 'group_id': str(1 + number % 8),
+                'round_id': str(1 + number % 16), 'number': number, 'type': 'duel', 'status': status,
+                'scheduled_datetime': '2020-05-31T18:00:00+02:00', 'played_at': None,
+                'public_note': None, 'private_note': None, 'report_closed': status == 'completed',
+                'opponents': opponents,
+            }
+            if status != 'pending':
+                games[(tournament_id, match_id)] = {
+                    n: {'number': n, 'status': status, 'properties': {},
+                        'opponents': [{'number': o['number'], 'position': o['position'],
+                                       'result': o['result'], 'forfeit': False,
+                                       'score': rand.randint(0, 16)} for o in opponents]}
+                    for n in range(1, games_per_match + 1)}
+        self.matches[tournament_id] = matches
+        self.games.update(games)
+
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def __respond(self):
+        mock = self.server.mock
+        length = int(self.headers.get('content-length') or 0)
+        body = self.rfile.read(length) if length else b''
+
+        latency = mock.latency
+        if isinstance(latency, (tuple, list)):
+            latency = mock._random.uniform(*latency)
+        if latency:
+            time.sleep(latency)
+
+        status, headers, data = mock.handle(self.command, self.path, self.headers, body)
+        content = json.dumps(data).encode('utf-8') if data is not None else b''
+
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = do_POST = do_PATCH = __respond
+
+
+
+class _RedirectAdapter(HTTPAdapter):
+    """
+    Transport adapter sending requests for one root url to another
+    """
+    def __init__(self, root, target, **kwargs):
+        super().__init__(**kwargs)
+        self._root = root
+        self._target = target
+
+    def send(self, request, **kwargs):
+        request.url = self._target + request.url[len(self._root):]
+        return super().send(request, **kwargs)
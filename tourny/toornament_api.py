@@ -1,11 +1,20 @@
+import contextlib
 import json
+import time
 import requests
 from urllib.parse import quote_plus
 
 from .TournamentItems import Tournament, Team, Match, Game
+from ._auth import TokenManager
+from ._codec import default_codec
+from ._ratelimit import RateLimiter, TRANSIENT_STATUS, retry_after
+from ._hedge import lost
+from ._scheduler import PRIORITIES
+from ._metrics import Observation, count_token_refresh, endpoint_of
 from ._get import GET
 from ._post import POST
 from ._patch import PATCH
+from ._bulk import BULK
 
 # Types of scopes available for the API,
 # https://developer.toornament.com/v2/security/scopes
@@ -20,21 +29,57 @@ scopes = [ "participant:manage_registrations",
            "organizer:permission",
            "organizer:delete" ]
 
+# Seconds to wait for a connection and then for each read of a response
+DEFAULT_TIMEOUT = (3.05, 30)
+
 class API:
-    def __init__(self, filepath='apidata.json'):
+    def __init__(self, filepath='apidata.json', max_workers=8, token_cache=None, token_scopes=None,
+                 cache=None, codec=None, rate_limiter=None, hooks=None, timeout=DEFAULT_TIMEOUT,
+                 timeouts=None, hedging=None, scheduler=None, stream=False):
         # TODO
         # Lets pretend these are encrypted for now.
         self.__key = None
         self.__client_id = None
         self.__client_secret = None
-        self.auth_tokens = dict()
-        for scope in scopes:
-            self.auth_tokens[scope] = None
+
+        # token_cache is an optional file tokens are persisted to between processes,
+        # token_scopes are scopes that should be requested together in one token call
+        self.tokens = TokenManager(self.__request_token, cache_file=token_cache, bundle=token_scopes)
         
+        # Upper bound on concurrent requests made when fetching every page of a collection
+        self.max_workers = max_workers
+
+        # Encodes request and decodes response bodies, JSONCodec or OrjsonCodec
+        self.codec = codec or default_codec()
+
+        # Shared by every client using the same API key unless one is given
+        self.rate_limiter = rate_limiter
+
+        # Optional ResponseCache for by-id lookups
+        self.cache = cache
+
+        # Callables given a RequestRecord after every request, e.g. Metrics or OpenTelemetryHook
+        self.hooks = list(hooks or [])
+
+        # (connect, read) timeout of every request, timeouts overrides it per endpoint, e.g.
+        # {'/organizer/v2/tournaments/{tournament_id}/matches': (3.05, 5)}
+        self.timeout = timeout
+        self.timeouts = {endpoint_of(endpoint): value for endpoint, value in (timeouts or {}).items()}
+
+        # Optional Hedging, sending a duplicate of GET requests slower than usual
+        self.hedging = hedging
+
+        # Optional Scheduler, letting writes overtake queued pages of collections
+        self.scheduler = scheduler
+
+        # Whether pages of collections are decoded item by item while they are read
+        self.stream = stream
+
         self.session = requests.Session()
         self.get = GET(self)
         self.post = POST(self)
         self.patch = PATCH(self)
+        self.bulk = BULK(self)
 
         try:
             with open(filepath) as loadfile:
@@ -56,51 +101,171 @@ class API:
     def set_key(self, key):
         self.__key = key
         self.session.headers.update({'X-Api-Key': self.__key})
+        if self.rate_limiter is None:
+            self.rate_limiter = RateLimiter.for_key(key)
 
 
     def set_client_id(self, client_id):
         self.__client_id = client_id
+        self.tokens.cache_key = client_id
 
 
     def set_client_secret(self, client_secret):
         self.__client_secret = client_secret
 
 
-    # Gets the appropriate authentication token from the server
+    @property
+    def auth_tokens(self):
+        """
+        The current token for every scope (None if there is none)
+        """
+        tokens = {scope: None for scope in scopes}
+        tokens.update(self.tokens.tokens())
+        return tokens
+
+
+    # Gets the appropriate authentication token from the server,
+    # 'scope' may also be a list of scopes to get a single token for
     def get_auth_token(self, scope):
-        if scope not in scopes:
-            # Maybe raise error? for now pass
-            # TODO
-            pass
-        else:
-            url = "https://api.toornament.com/oauth/v2/token"
-
-            payload = f"grant_type=client_credentials&client_id={self.__client_id}&client_secret={self.__client_secret}&scope={quote_plus(scope)}"
-            
-            headers = {
-                'content-type': "application/x-www-form-urlencoded",
-                }
-
-            response = self.session.request("POST", url, data=payload, headers=headers)
-            
-            if response.status_code == 200:
-                data = json.loads(response.text)
-                self.auth_tokens[data['scope']] = data['access_token']
-            
-            return response.status_code
+        requested = [scope] if isinstance(scope, str) else list(scope)
+        unknown = [s for s in requested if s not in scopes]
+        if unknown:
+            raise ValueError(f"Unknown scope(s) {', '.join(unknown)}, expected some of {', '.join(scopes)}")
+        return self.tokens.refresh(requested)
 
-        
+
+    #####################################
+    #                                   #
+    #          CLASS UTILITIES          #
+    #                                   #
+    #####################################
+
+    def _request(self, method, scope, url, headers=None, endpoint=None, retry_throttled=True, **kwargs):
+        """
+        Sends a request authorized for a scope through the rate limiter.
+
+        Throttled (429) requests are retried after Retry-After, server errors and
+        connection failures with jittered exponential backoff. POST requests are
+        only retried when throttled, as they may have been processed otherwise.
+        With retry_throttled=False a 429 pauses the rate limiter and is returned
+        at once, for callers with somewhere else to send the request.
+        The number of attempts made is kept in response.attempts.
+
+        'endpoint' is the url template the request is reported under to the hooks,
+        and the one its timeout and hedging delay are looked up for.
+        """
+        path = endpoint_of(endpoint or url)
+        kwargs.setdefault('timeout', self.timeouts.get(path, self.timeout))
+
+        if not self.hooks:
+            return self.__hedged_request(path, method, scope, url, headers, retry_throttled, **kwargs)
+
+        with Observation(self.hooks, method, scope, url, endpoint, kwargs.get('data')) as observation:
+            response = self.__hedged_request(path, method, scope, url, headers, retry_throttled, **kwargs)
+            observation.done(response.status_code, _body_length(response, kwargs.get('stream')),
+                             response.attempts)
+        return response
 
 
+    def __hedged_request(self, path, method, scope, url, headers=None, retry_throttled=True, **kwargs):
+        """
+        Sends a request, hedged when it is a GET and hedging is on
+        """
+        if self.hedging is None or method != "GET":
+            return self.__retried_request(method, scope, url, headers, retry_throttled, **kwargs)
+        return self.hedging.run(path, lambda: self.__retried_request(method, scope, url, headers, retry_throttled,
+                                                                     **kwargs))
 
 
+    def __retried_request(self, method, scope, url, headers=None, retry_throttled=True, **kwargs):
+        """
+        Sends a request through the rate limiter, retrying transient failures
+        """
+        limiter = self.rate_limiter or RateLimiter.for_key(self.__key)
+        scheduler = self.scheduler
+        priority = scheduler.classify(method, headers) if scheduler is not None else None
+        # Writes overtake queued pages in the limiter too, not only in the scheduler
+        rank = PRIORITIES.index(priority) if priority is not None else 0
+        max_wait = scheduler.max_wait if scheduler is not None else None
+        attempt = 0
+        while True:
+            attempt += 1
+            queued = scheduler.slot(priority) if scheduler is not None else contextlib.nullcontext()
+            with queued, limiter(rank, max_wait) as slot:
+                try:
+                    response = self.__authorized_request(method, scope, url, headers, **kwargs)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    if method == "POST" or attempt > limiter.retries or lost():
+                        e.attempts = attempt
+                        raise
+                    response = None
+                slot.throttled = response is None or response.status_code in TRANSIENT_STATUS
 
+            wait = retry_after(response) if response is not None else None
+            if wait is not None and response.status_code == 429:
+                # The whole key is throttled, not just this request
+                limiter.pause(min(wait, limiter.max_backoff))
 
+            if response is not None:
+                status = response.status_code
+                if (status not in TRANSIENT_STATUS or attempt > limiter.retries
+                        or (method == "POST" and status != 429) or (status == 429 and not retry_throttled)
+                        or lost()):
+                    response.attempts = attempt
+                    return response
+                # A streamed response holds its connection until closed
+                response.close()
 
+            time.sleep(limiter.delay(attempt, wait))
 
 
+    def __authorized_request(self, method, scope, url, headers=None, **kwargs):
+        """
+        Sends a request authorized for a scope, retrying once with a new token if it was rejected
+        """
+        headers = dict(headers or {})
+        token = self.tokens.token(scope)
+        headers['authorization'] = f"{token}"
 
+        response = self.session.request(method, url, headers=headers, **kwargs)
 
+        if response.status_code == 401:
+            token = self.tokens.token(scope, rejected=token)
+            headers['authorization'] = f"{token}"
+            response = self.session.request(method, url, headers=headers, **kwargs)
+
+        return response
+
+
+    def __request_token(self, requested):
+        """
+        Requests a single token for every scope in 'requested'
+        """
+        url = "https://api.toornament.com/oauth/v2/token"
+
+        payload = f"grant_type=client_credentials&client_id={self.__client_id}&client_secret={self.__client_secret}&scope={quote_plus(' '.join(requested))}"
+        
+        headers = {
+            'content-type': "application/x-www-form-urlencoded",
+            }
+
+        count_token_refresh()
+        with Observation(self.hooks, "POST", None, url, data=payload) as observation:
+            response = self.session.request("POST", url, data=payload, headers=headers, timeout=self.timeout)
+            observation.done(response.status_code, len(response.content))
+
+        data = None
+        if response.status_code == 200:
+            data = self.codec.loads(response.content)
+        
+        return response.status_code, data
 
 
 
+def _body_length(response, stream=False):
+    """
+    Size of a response body, from its Content-Length when it is streamed and not read yet
+    """
+    if stream:
+        return int(response.headers.get('content-length') or 0)
+    return len(response.content)